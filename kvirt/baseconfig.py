@@ -19,7 +19,7 @@ from kvirt.defaults import (NETS, POOL, CPUMODEL, NUMCPUS, MEMORY, DISKS,
                             TPM, JENKINSMODE, RNG, ZEROTIER_NETS, ZEROTIER_KUBELET, VMPORT, VMUSER, VMRULES,
                             VMRULES_STRICT, CACHE, SECURITYGROUPS, LOCAL_OPENSHIFT_APPS, OPENSHIFT_TAG, ROOTPASSWORD,
                             WAIT, WAITCOMMAND, WAITTIMEOUT, TEMPKEY, BMC_USER, BMC_PASSWORD, BMC_MODEL, KSUSHYSERVICE,
-                            WEBSERVICE)
+                            WEBSERVICE, CACHE_TTL, CONCURRENCY, SSHPERSIST, FAILFAST)
 from ipaddress import ip_address, ip_network
 from random import choice
 from kvirt import common
@@ -33,7 +33,6 @@ from kvirt.cluster import openshift
 import os
 from shutil import copytree, rmtree, which, copy2
 import yaml
-from jinja2 import Environment, FileSystemLoader
 from jinja2 import StrictUndefined as strictundefined
 from jinja2.runtime import Undefined as defaultundefined
 from jinja2.exceptions import TemplateSyntaxError, TemplateError, TemplateNotFound
@@ -229,6 +228,10 @@ class Kbaseconfig:
         defaults['bmc_user'] = default.get('bmc_user', BMC_USER)
         defaults['bmc_password'] = default.get('bmc_password', BMC_PASSWORD)
         defaults['bmc_model'] = default.get('bmc_model', BMC_MODEL)
+        defaults['cache_ttl'] = default.get('cache_ttl', CACHE_TTL)
+        defaults['concurrency'] = default.get('concurrency', CONCURRENCY)
+        defaults['failfast'] = default.get('failfast', FAILFAST)
+        defaults['sshpersist'] = default.get('sshpersist', SSHPERSIST)
         currentplanfile = f"{os.environ.get('HOME')}/.kcli/plan"
         if os.path.exists(currentplanfile):
             self.currentplan = open(currentplanfile).read().strip()
@@ -254,6 +257,7 @@ class Kbaseconfig:
                 if wrongprofiles:
                     error(f"Incorrect type in profiles {','.join(wrongprofiles)} in .kcli/profiles.yml")
                     sys.exit(1)
+        self._profiles_index = None
         flavorsfile = default.get('flavors', f"{os.environ.get('HOME')}/.kcli/flavors.yml")
         flavorsfile = os.path.expanduser(flavorsfile)
         if not os.path.exists(flavorsfile):
@@ -465,6 +469,10 @@ class Kbaseconfig:
         self.bmc_user = options.get('bmc_user', self.default['bmc_user'])
         self.bmc_password = options.get('bmc_password', self.default['bmc_password'])
         self.bmc_model = options.get('bmc_model', self.default['bmc_model'])
+        self.cache_ttl = options.get('cache_ttl', self.default['cache_ttl'])
+        self.concurrency = options.get('concurrency', self.default['concurrency'])
+        self.failfast = options.get('failfast', self.default['failfast'])
+        self.sshpersist = options.get('sshpersist', self.default['sshpersist'])
         self.overrides = {}
 
     def switch_host(self, client):
@@ -804,12 +812,7 @@ class Kbaseconfig:
         basedir = os.path.dirname(inputfile) if os.path.dirname(inputfile) != '' else default_dir
         basefile = None
         undefined = strictundefined if not ignore else defaultundefined
-        env = Environment(loader=FileSystemLoader(basedir), undefined=undefined, extensions=['jinja2.ext.do'],
-                          trim_blocks=True, lstrip_blocks=True)
-        for func in extra_funcs:
-            env.globals[func.__name__] = func
-        for jinjafilter in jinjafilters.jinjafilters:
-            env.filters[jinjafilter] = jinjafilters.jinjafilters[jinjafilter]
+        env = common.jinja_env(basedir, undefined=undefined)
         try:
             templ = env.get_template(os.path.basename(inputfile))
         except TemplateNotFound:
@@ -865,8 +868,10 @@ class Kbaseconfig:
         with open(inputfile, 'r') as entries:
             overrides.update(self.overrides)
             overrides.update({'plan': plan})
+            context = {func.__name__: func for func in extra_funcs}
+            context.update(overrides)
             try:
-                entries = templ.render(overrides)
+                entries = templ.render(context)
             except TemplateError as e:
                 error(f"Error rendering inputfile {inputfile}. Got: {e.message}")
                 sys.exit(1)
@@ -895,6 +900,11 @@ class Kbaseconfig:
 
         :return:
         """
+        return [entry for entries in self.profile_index().values() for entry in entries]
+
+    def profile_index(self):
+        if self._profiles_index is not None:
+            return self._profiles_index
         default_disksize = '10'
         default = self.default
         results = []
@@ -973,7 +983,10 @@ class Kbaseconfig:
                 profile = profile.replace(f'{self.client}_', '')
             results.append([profile, flavor, pool, diskinfo, image, netinfo, cloudinit, nested,
                             reservedns, reservehost])
-        return sorted(results, key=lambda x: x[0])
+        self._profiles_index = {}
+        for entry in sorted(results, key=lambda x: x[0]):
+            self._profiles_index.setdefault(entry[0], []).append(entry)
+        return self._profiles_index
 
     def list_clusterprofiles(self):
         return self.clusterprofiles
@@ -1092,12 +1105,15 @@ class Kbaseconfig:
         return {'result': 'success'}
 
     def create_profile(self, profile, overrides={}, quiet=False):
+        self._profiles_index = None
         return self._create_yaml_file(profile, self.profiles, 'profile', overrides=overrides, quiet=quiet)
 
     def delete_profile(self, profile, quiet=False):
+        self._profiles_index = None
         return self._delete_yaml_object(profile, self.profiles, 'profile', quiet=quiet)
 
     def update_profile(self, profile, overrides={}, quiet=False):
+        self._profiles_index = None
         return self._update_yaml_file(profile, self.profiles, 'profile', overrides=overrides, quiet=quiet)
 
     def create_clusterprofile(self, clusterprofile, overrides={}, quiet=False):
@@ -1171,10 +1187,7 @@ class Kbaseconfig:
         parameters.update(common.get_parameters(inputfile, planfile=True))
         parameters.update(overrides)
         jenkinsdir = os.path.dirname(common.__file__)
-        env = Environment(loader=FileSystemLoader(jenkinsdir), extensions=['jinja2.ext.do'], trim_blocks=True,
-                          lstrip_blocks=True)
-        for jinjafilter in jinjafilters.jinjafilters:
-            env.filters[jinjafilter] = jinjafilters.jinjafilters[jinjafilter]
+        env = common.jinja_env(jenkinsdir, undefined=defaultundefined)
         try:
             templ = env.get_template(os.path.basename("Jenkinsfile.j2"))
         except TemplateSyntaxError as e:
@@ -1224,10 +1237,7 @@ class Kbaseconfig:
                 runscript = str(overrides['runscript']).lower()
                 del overrides['runscript']
         workflowdir = os.path.dirname(common.__file__)
-        env = Environment(loader=FileSystemLoader(workflowdir), extensions=['jinja2.ext.do'], trim_blocks=True,
-                          lstrip_blocks=True)
-        for jinjafilter in jinjafilters.jinjafilters:
-            env.filters[jinjafilter] = jinjafilters.jinjafilters[jinjafilter]
+        env = common.jinja_env(workflowdir, undefined=defaultundefined)
         try:
             workflowfile = "workflow_script.yml.j2" if script else "workflow.yml.j2"
             templ = env.get_template(os.path.basename(workflowfile))
@@ -1276,10 +1286,7 @@ class Kbaseconfig:
                 kubetype = overrides['kubetype']
                 del overrides['kubetype']
         workflowdir = os.path.dirname(common.__file__)
-        env = Environment(loader=FileSystemLoader(workflowdir), extensions=['jinja2.ext.do'], trim_blocks=True,
-                          lstrip_blocks=True)
-        for jinjafilter in jinjafilters.jinjafilters:
-            env.filters[jinjafilter] = jinjafilters.jinjafilters[jinjafilter]
+        env = common.jinja_env(workflowdir, undefined=defaultundefined)
         try:
             workflowfile = "pipeline_kube.yml.j2" if kube else "pipeline.yml.j2"
             templ = env.get_template(os.path.basename(workflowfile))
@@ -1438,10 +1445,7 @@ class Kbaseconfig:
             os.symlink(jinjadir, 'filter_plugins')
         if env is None:
             playbookdir = os.path.dirname(common.__file__)
-            env = Environment(loader=FileSystemLoader(playbookdir), extensions=['jinja2.ext.do'],
-                              trim_blocks=True, lstrip_blocks=True)
-            for jinjafilter in jinjafilters.jinjafilters:
-                env.filters[jinjafilter] = jinjafilters.jinjafilters[jinjafilter]
+            env = common.jinja_env(playbookdir, undefined=defaultundefined)
         dirs = []
         if 'scripts' not in profile:
             profile['scripts'] = []
@@ -1487,10 +1491,7 @@ class Kbaseconfig:
 
     def create_playbook(self, inputfile, overrides={}, store=False):
         playbookdir = os.path.dirname(common.__file__)
-        env = Environment(loader=FileSystemLoader(playbookdir), extensions=['jinja2.ext.do'],
-                          trim_blocks=True, lstrip_blocks=True)
-        for jinjafilter in jinjafilters.jinjafilters:
-            env.filters[jinjafilter] = jinjafilters.jinjafilters[jinjafilter]
+        env = common.jinja_env(playbookdir, undefined=defaultundefined)
         inputfile = os.path.expanduser(inputfile) if inputfile is not None else 'kcli_plan.yml'
         basedir = os.path.dirname(inputfile)
         if basedir == "":
@@ -1688,7 +1689,7 @@ class Kbaseconfig:
                 remotedir = f"/tmp/{os.path.basename(tmpdir)}"
                 scpcmd = scp(hostname, ip=ip, user=user, source=tmpdir, destination=remotedir, download=False,
                              insecure=True, tunnel=tunnel, tunnelhost=tunnelhost, tunnelport=tunnelport,
-                             tunneluser=tunneluser, vmport=vmport)
+                             tunneluser=tunneluser, vmport=vmport, persist=self.sshpersist)
                 os.system(scpcmd)
                 cmd = [f"cd {remotedir}"]
                 for script in finalscripts:
@@ -1697,7 +1698,7 @@ class Kbaseconfig:
                 cmd = ';'.join(cmd)
                 pprint(f"Running script {script} on {hostname}")
                 sshcommand = ssh(hostname, ip=ip, user=user, cmd=cmd, tunnel=tunnel, tunnelhost=tunnelhost,
-                                 tunnelport=tunnelport, tunneluser=tunneluser, vmport=vmport)
+                                 tunnelport=tunnelport, tunneluser=tunneluser, vmport=vmport, persist=self.sshpersist)
                 os.system(sshcommand)
             else:
                 os.chdir(destdir)
@@ -5,7 +5,6 @@
 from copy import deepcopy
 from filecmp import cmp
 from getpass import getuser
-from kvirt.config import Kconfig
 from kvirt.examples import plandatacreate, vmdatacreate, hostcreate, _list, plancreate, planinfo, productinfo, start
 from kvirt.examples import repocreate, isocreate, networkupdate
 from kvirt.examples import kubegenericcreate, kubek3screate, kubeopenshiftcreate, kubemicroshiftcreate
@@ -14,10 +13,7 @@ from kvirt.examples import disconnectedcreate, appopenshiftcreate, plantemplatec
 from kvirt.examples import workflowcreate, kubegenericscale, kubek3sscale, kubeopenshiftscale
 from kvirt.examples import changelog, starthosts, stophosts, infohosts, ocdownload, openshiftdownload
 from kvirt.examples import networkcreate, securitygroupcreate, profilecreate, vmupdate, vmlist
-from kvirt.baseconfig import Kbaseconfig
-from kvirt.containerconfig import Kcontainerconfig
 from kvirt.defaults import IMAGES, VERSION, LOCAL_OPENSHIFT_APPS, SSH_PUB_LOCATIONS, PLANTYPES
-from prettytable import PrettyTable
 import argcomplete
 import argparse
 from argparse import RawDescriptionHelpFormatter as rawhelp
@@ -39,6 +35,97 @@ from urllib.parse import urlparse
 from urllib.request import urlopen
 import yaml
 
+COMPLETION_CACHE = os.path.expanduser('~/.kcli/completion.json')
+
+
+def kconfig(*args, **kwargs):
+    from kvirt.config import Kconfig
+    return Kconfig(*args, **kwargs)
+
+
+def kbaseconfig(*args, **kwargs):
+    from kvirt.baseconfig import Kbaseconfig
+    return Kbaseconfig(*args, **kwargs)
+
+
+def kcontainerconfig(*args, **kwargs):
+    from kvirt.containerconfig import Kcontainerconfig
+    return Kcontainerconfig(*args, **kwargs)
+
+
+def prettytable(*args, **kwargs):
+    from prettytable import PrettyTable
+    return PrettyTable(*args, **kwargs)
+
+
+def completion_key():
+    return f"{VERSION}-{os.path.getmtime(__file__)}"
+
+
+def completion_tree(parser):
+    tree = {'options': {}, 'commands': {}}
+    for action in parser._actions:
+        if isinstance(action, argparse._SubParsersAction):
+            for name, subparser in action.choices.items():
+                tree['commands'][name] = completion_tree(subparser)
+        for option in action.option_strings:
+            tree['options'][option] = action.nargs != 0
+    return tree
+
+
+def save_completion_tree(parser):
+    if not os.path.isdir(os.path.dirname(COMPLETION_CACHE)):
+        return
+    try:
+        if os.path.exists(COMPLETION_CACHE):
+            with open(COMPLETION_CACHE) as f:
+                if json.load(f).get('key') == completion_key():
+                    return
+        with NamedTemporaryFile('w', dir=os.path.dirname(COMPLETION_CACHE), delete=False) as f:
+            json.dump({'key': completion_key(), 'tree': completion_tree(parser)}, f)
+        os.replace(f.name, COMPLETION_CACHE)
+    except (OSError, ValueError):
+        pass
+
+
+def cached_completion():
+    if os.environ.get('_ARGCOMPLETE_SHELL', 'bash') != 'bash' or not os.path.exists(COMPLETION_CACHE):
+        return False
+    try:
+        with open(COMPLETION_CACHE) as f:
+            data = json.load(f)
+    except ValueError:
+        return False
+    if data.get('key') != completion_key():
+        return False
+    line = os.environ.get('COMP_LINE', '')
+    line = line[:int(os.environ.get('COMP_POINT', len(line)))]
+    words = line.split()
+    current = '' if not words or line.endswith(' ') else words.pop()
+    if not re.match(r'^[\w.-]*$', current):
+        return False
+    node, skip = data['tree'], False
+    for word in words[1:]:
+        if skip:
+            skip = False
+        elif word.startswith('-'):
+            skip = node['options'].get(word, False)
+        elif word in node['commands']:
+            node = node['commands'][word]
+        else:
+            return False
+    if skip:
+        return False
+    candidates = node['options'] if current.startswith('-') else node['commands']
+    if not current.startswith('-') and not candidates:
+        return False
+    completions = sorted(c for c in candidates if c.startswith(current))
+    if len(completions) == 1:
+        completions[0] += ' '
+    with os.fdopen(8, 'w') as f:
+        f.write(os.environ.get('_ARGCOMPLETE_IFS', '\013').join(completions))
+    return True
+
 
 def handle_parameters(parameters, paramfiles, cluster=False):
     if paramfiles is None:
@@ -74,7 +161,7 @@ def cache_vms(baseconfig, region, zone, namespace):
             _list = yaml.safe_load(vms)
         pprint("Using cache information...")
     else:
-        config = Kconfig(client=baseconfig.client, debug=baseconfig.debug, region=region, zone=zone,
+        config = kconfig(client=baseconfig.client, debug=baseconfig.debug, region=region, zone=zone,
                          namespace=namespace)
         _list = config.k.list()
         with open(cache_file, 'w') as c:
@@ -178,7 +265,7 @@ def delete_cache(args):
     yes_top = args.yes_top
     if not yes and not yes_top:
         common.confirm("Are you sure?")
-    baseconfig = Kbaseconfig(client=args.client, debug=args.debug)
+    baseconfig = kbaseconfig(client=args.client, debug=args.debug)
     cache_file = f"{os.environ['HOME']}/.kcli/{baseconfig.client}_vms.yml"
     if os.path.exists(cache_file):
         pprint(f"Deleting cache on {baseconfig.client}")
@@ -189,7 +276,7 @@ def delete_cache(args):
 
 def start_baremetal_hosts(args):
     overrides = common.get_overrides(param=args.param)
-    baseconfig = Kbaseconfig(client=args.client, debug=args.debug, offline=True)
+    baseconfig = kbaseconfig(client=args.client, debug=args.debug, offline=True)
     iso_url = overrides.get('iso_url')
     baremetal_hosts = overrides.get('baremetal_hosts', [])
     bmc_url = overrides.get('bmc_url') or overrides.get('url')
@@ -212,7 +299,7 @@ def start_baremetal_hosts(args):
 
 def stop_baremetal_hosts(args):
     overrides = common.get_overrides(param=args.param)
-    baseconfig = Kbaseconfig(client=args.client, debug=args.debug, offline=True)
+    baseconfig = kbaseconfig(client=args.client, debug=args.debug, offline=True)
     baremetal_hosts = overrides.get('baremetal_hosts', [])
     bmc_url = overrides.get('bmc_url') or overrides.get('url')
     bmc_model = overrides.get('bmc_model') or overrides.get('model') or baseconfig.bmc_model or 'dell'
@@ -234,7 +321,7 @@ def stop_baremetal_hosts(args):
 
 def start_vm(args):
     """Start vms"""
-    config = Kconfig(client=args.client, debug=args.debug, region=args.region, zone=args.zone, namespace=args.namespace)
+    config = kconfig(client=args.client, debug=args.debug, region=args.region, zone=args.zone, namespace=args.namespace)
     names = [common.get_lastvm(config.client)] if not args.names else args.names
     k = config.k
     codes = []
@@ -248,9 +335,9 @@ def start_vm(args):
 
 def start_container(args):
     """Start containers"""
-    config = Kconfig(client=args.client, debug=args.debug, region=args.region, zone=args.zone, namespace=args.namespace)
+    config = kconfig(client=args.client, debug=args.debug, region=args.region, zone=args.zone, namespace=args.namespace)
     names = [common.get_lastvm(config.client)] if not args.names else args.names
-    cont = Kcontainerconfig(config, client=args.containerclient).cont
+    cont = kcontainerconfig(config, client=args.containerclient).cont
     for name in names:
         pprint(f"Starting container {name}...")
         cont.start_container(name)
@@ -259,7 +346,7 @@ def start_container(args):
 def stop_vm(args):
     """Stop vms"""
     soft = args.soft
-    config = Kconfig(client=args.client, debug=args.debug, region=args.region, zone=args.zone, namespace=args.namespace)
+    config = kconfig(client=args.client, debug=args.debug, region=args.region, zone=args.zone, namespace=args.namespace)
     names = [common.get_lastvm(config.client)] if not args.names else args.names
     if config.extraclients:
         ks = config.extraclients
@@ -279,7 +366,7 @@ def stop_vm(args):
 
 def stop_container(args):
     """Stop containers"""
-    config = Kconfig(client=args.client, debug=args.debug, region=args.region, zone=args.zone, namespace=args.namespace)
+    config = kconfig(client=args.client, debug=args.debug, region=args.region, zone=args.zone, namespace=args.namespace)
     names = [common.get_lastvm(config.client)] if not args.names else args.names
     if config.extraclients:
         ks = config.extraclients
@@ -287,7 +374,7 @@ def stop_container(args):
     else:
         ks = {config.client: config.k}
     for cli in ks:
-        cont = Kcontainerconfig(config, client=args.containerclient).cont
+        cont = kcontainerconfig(config, client=args.containerclient).cont
         for name in names:
             pprint(f"Stopping container {name} in {cli}...")
             cont.stop_container(name)
@@ -295,7 +382,7 @@ def stop_container(args):
 
 def restart_vm(args):
     """Restart vms"""
-    config = Kconfig(client=args.client, debug=args.debug, region=args.region, zone=args.zone, namespace=args.namespace)
+    config = kconfig(client=args.client, debug=args.debug, region=args.region, zone=args.zone, namespace=args.namespace)
     names = [common.get_lastvm(config.client)] if not args.names else args.names
     k = config.k
     codes = []
@@ -309,9 +396,9 @@ def restart_vm(args):
 
 def restart_container(args):
     """Restart containers"""
-    config = Kconfig(client=args.client, debug=args.debug, region=args.region, zone=args.zone, namespace=args.namespace)
+    config = kconfig(client=args.client, debug=args.debug, region=args.region, zone=args.zone, namespace=args.namespace)
     names = [common.get_lastvm(config.client)] if not args.names else args.names
-    cont = Kcontainerconfig(config, client=args.containerclient).cont
+    cont = kcontainerconfig(config, client=args.containerclient).cont
     for name in names:
         pprint(f"Restarting container {name}...")
         cont.stop_container(name)
@@ -322,7 +409,7 @@ def console_vm(args):
     """Vnc/Serial/Web Vm console"""
     serial = args.serial
     web = args.web
-    config = Kconfig(client=args.client, debug=args.debug, region=args.region, zone=args.zone, namespace=args.namespace)
+    config = kconfig(client=args.client, debug=args.debug, region=args.region, zone=args.zone, namespace=args.namespace)
     name = common.get_lastvm(config.client) if not args.name else args.name
     k = config.k
     tunnel = config.tunnel
@@ -339,9 +426,9 @@ def console_vm(args):
 
 def console_container(args):
     """Container console"""
-    config = Kconfig(client=args.client, debug=args.debug, region=args.region, zone=args.zone, namespace=args.namespace)
+    config = kconfig(client=args.client, debug=args.debug, region=args.region, zone=args.zone, namespace=args.namespace)
     name = common.get_lastvm(config.client) if not args.name else args.name
-    cont = Kcontainerconfig(config, client=args.containerclient).cont
+    cont = kcontainerconfig(config, client=args.containerclient).cont
     cont.console_container(name)
 
 
@@ -351,7 +438,7 @@ def delete_vm(args):
     yes_top = args.yes_top
     snapshots = args.snapshots
     count = args.count
-    config = Kconfig(client=args.client, debug=args.debug, region=args.region, zone=args.zone, namespace=args.namespace)
+    config = kconfig(client=args.client, debug=args.debug, region=args.region, zone=args.zone, namespace=args.namespace)
     if config.extraclients:
         allclients = config.extraclients.copy()
         allclients.update({config.client: config.k})
@@ -385,7 +472,8 @@ def delete_vm(args):
                     cmd = "subscription-manager unregister"
                     sshcmd = ssh(name, ip=ip, user='root', tunnel=config.tunnel,
                                  tunnelhost=config.tunnelhost, tunnelport=config.tunnelport,
-                                 tunneluser=config.tunneluser, insecure=True, cmd=cmd, vmport=vmport)
+                                 tunneluser=config.tunneluser, insecure=True, cmd=cmd, vmport=vmport,
+                                 persist=config.sshpersist)
                     os.system(sshcmd)
                 else:
                     warning(f"vm {name} doesnt appear as a rhel box. Skipping unregistration")
@@ -413,7 +501,7 @@ def delete_vm(args):
                 if dnsclient in dnsclients:
                     z = dnsclients[dnsclient]
                 else:
-                    z = Kconfig(client=dnsclient).k
+                    z = kconfig(client=dnsclient).k
                     dnsclients[dnsclient] = z
                 z.delete_dns(name, domain)
             match = re.match(r'(.*)-(ctlplane|worker)-[0-9]', name)
@@ -440,7 +528,7 @@ def delete_container(args):
     """Delete container"""
     yes = args.yes
     yes_top = args.yes_top
-    config = Kconfig(client=args.client, debug=args.debug, region=args.region, zone=args.zone, namespace=args.namespace)
+    config = kconfig(client=args.client, debug=args.debug, region=args.region, zone=args.zone, namespace=args.namespace)
     if config.extraclients:
         allclients = config.extraclients.copy()
         allclients.update({config.client: config.k})
@@ -452,7 +540,7 @@ def delete_container(args):
         if not yes and not yes_top:
             common.confirm("Are you sure?")
         codes = [0]
-        cont = Kcontainerconfig(config, client=args.containerclient).cont
+        cont = kcontainerconfig(config, client=args.containerclient).cont
         for name in names:
             pprint(f"Deleting container {name} on {cli}")
             cont.delete_container(name)
@@ -469,7 +557,7 @@ def download_image(args):
     arch = args.arch
     rhcos_installer = args.installer
     kvm_openstack = not args.qemu
-    config = Kconfig(client=args.client, debug=args.debug, region=args.region, zone=args.zone, namespace=args.namespace)
+    config = kconfig(client=args.client, debug=args.debug, region=args.region, zone=args.zone, namespace=args.namespace)
     result = config.handle_host(pool=pool, image=image, download=True, cmd=cmd, url=url, size=size, arch=arch,
                                 kvm_openstack=kvm_openstack, rhcos_installer=rhcos_installer)
     if result['result'] == 'success':
@@ -483,7 +571,7 @@ def download_iso(args):
     pool = args.pool
     url = args.url
     iso = args.iso if args.iso is not None else os.path.basename(url)
-    config = Kconfig(client=args.client, debug=args.debug, region=args.region, zone=args.zone, namespace=args.namespace)
+    config = kconfig(client=args.client, debug=args.debug, region=args.region, zone=args.zone, namespace=args.namespace)
     result = config.handle_host(pool=pool, image=iso, download=True, url=url)
     if result['result'] == 'success':
         sys.exit(0)
@@ -496,7 +584,7 @@ def delete_image(args):
     yes_top = args.yes_top
     images = args.images
     pool = args.pool
-    config = Kconfig(client=args.client, debug=args.debug, region=args.region, zone=args.zone, namespace=args.namespace)
+    config = kconfig(client=args.client, debug=args.debug, region=args.region, zone=args.zone, namespace=args.namespace)
     if config.extraclients:
         allclients = config.extraclients.copy()
         allclients.update({config.client: config.k})
@@ -535,7 +623,7 @@ def delete_image(args):
 
 def download_kubeconfig(args):
     kube = args.kube
-    config = Kconfig(client=args.client, debug=args.debug, region=args.region, zone=args.zone, namespace=args.namespace)
+    config = kconfig(client=args.client, debug=args.debug, region=args.region, zone=args.zone, namespace=args.namespace)
     if config.type != 'web':
         error("Downloading kubeconfig is only available for web provider")
         sys.exit(1)
@@ -553,7 +641,7 @@ def create_clusterprofile(args):
     """Create Clusterprofile"""
     clusterprofile = args.clusterprofile
     overrides = handle_parameters(args.param, args.paramfile)
-    baseconfig = Kbaseconfig(client=args.client, debug=args.debug, quiet=True)
+    baseconfig = kbaseconfig(client=args.client, debug=args.debug, quiet=True)
     result = baseconfig.create_clusterprofile(clusterprofile, overrides=overrides)
     code = common.handle_response(result, clusterprofile, element='Clusterprofile', action='created',
                                   client=baseconfig.client)
@@ -564,7 +652,7 @@ def create_confpool(args):
     """Create Confpool"""
     confpool = args.confpool
     overrides = handle_parameters(args.param, args.paramfile)
-    baseconfig = Kbaseconfig(client=args.client, debug=args.debug, quiet=True)
+    baseconfig = kbaseconfig(client=args.client, debug=args.debug, quiet=True)
     result = baseconfig.create_confpool(confpool, overrides=overrides)
     code = common.handle_response(result, confpool, element='Confpool', action='created', client=baseconfig.client)
     sys.exit(code)
@@ -577,7 +665,7 @@ def create_profile(args):
     overrides = common.get_overrides(param=args.param)
     if image is not None:
         overrides['image'] = image
-    baseconfig = Kbaseconfig(client=args.client, debug=args.debug, quiet=True)
+    baseconfig = kbaseconfig(client=args.client, debug=args.debug, quiet=True)
     result = baseconfig.create_profile(profile, overrides=overrides)
     code = common.handle_response(result, profile, element='Profile', action='created', client=baseconfig.client)
     sys.exit(code)
@@ -590,7 +678,7 @@ def delete_clusterprofile(args):
     if not yes and not yes_top:
         common.confirm("Are you sure?")
     clusterprofile = args.clusterprofile
-    baseconfig = Kbaseconfig(client=args.client, debug=args.debug, quiet=True)
+    baseconfig = kbaseconfig(client=args.client, debug=args.debug, quiet=True)
     pprint(f"Deleting Clusterprofile {clusterprofile} on {baseconfig.client}")
     result = baseconfig.delete_clusterprofile(clusterprofile)
     code = common.handle_response(result, clusterprofile, element='Clusterprofile', action='deleted',
@@ -605,7 +693,7 @@ def delete_confpool(args):
     if not yes and not yes_top:
         common.confirm("Are you sure?")
     confpool = args.confpool
-    baseconfig = Kbaseconfig(client=args.client, debug=args.debug, quiet=True)
+    baseconfig = kbaseconfig(client=args.client, debug=args.debug, quiet=True)
     pprint(f"Deleting Confpool {confpool} on {baseconfig.client}")
     result = baseconfig.delete_confpool(confpool)
     code = common.handle_response(result, confpool, element='Confpool', action='deleted', client=baseconfig.client)
@@ -619,7 +707,7 @@ def delete_profile(args):
     if not yes and not yes_top:
         common.confirm("Are you sure?")
     profile = args.profile
-    baseconfig = Kbaseconfig(client=args.client, debug=args.debug, quiet=True)
+    baseconfig = kbaseconfig(client=args.client, debug=args.debug, quiet=True)
     pprint(f"Deleting on {baseconfig.client}")
     result = baseconfig.delete_profile(profile)
     code = common.handle_response(result, profile, element='Profile', action='deleted', client=baseconfig.client)
@@ -630,7 +718,7 @@ def update_clusterprofile(args):
     """Update clusterprofile"""
     clusterprofile = args.clusterprofile
     overrides = handle_parameters(args.param, args.paramfile)
-    baseconfig = Kbaseconfig(client=args.client, debug=args.debug, quiet=True)
+    baseconfig = kbaseconfig(client=args.client, debug=args.debug, quiet=True)
     result = baseconfig.update_clusterprofile(clusterprofile, overrides=overrides)
     code = common.handle_response(result, clusterprofile, element='Clusterprofile', action='updated',
                                   client=baseconfig.client)
@@ -641,7 +729,7 @@ def update_confpool(args):
     """Update confpool"""
     confpool = args.confpool
     overrides = handle_parameters(args.param, args.paramfile)
-    baseconfig = Kbaseconfig(client=args.client, debug=args.debug, quiet=True)
+    baseconfig = kbaseconfig(client=args.client, debug=args.debug, quiet=True)
     result = baseconfig.update_confpool(confpool, overrides=overrides)
     code = common.handle_response(result, confpool, element='Confpool', action='updated', client=baseconfig.client)
     sys.exit(code)
@@ -651,7 +739,7 @@ def update_profile(args):
     """Update profile"""
     profile = args.profile
     overrides = common.get_overrides(param=args.param)
-    baseconfig = Kbaseconfig(client=args.client, debug=args.debug, quiet=True)
+    baseconfig = kbaseconfig(client=args.client, debug=args.debug, quiet=True)
     result = baseconfig.update_profile(profile, overrides=overrides)
     code = common.handle_response(result, profile, element='Profile', action='updated', client=baseconfig.client)
     sys.exit(code)
@@ -661,13 +749,13 @@ def info_vm(args):
     """Get info on vm"""
     fields = args.fields.split(',') if args.fields is not None else []
     values = args.values
-    config = Kbaseconfig(client=args.client, debug=args.debug, quiet=True)
+    config = kbaseconfig(client=args.client, debug=args.debug, quiet=True)
     if config.cache:
         names = [common.get_lastvm(config.client)] if not args.names else args.names
         _list = cache_vms(config, args.region, args.zone, args.namespace)
         vms = {vm['name']: vm for vm in _list}
     else:
-        config = Kconfig(client=args.client, debug=args.debug, region=args.region, zone=args.zone,
+        config = kconfig(client=args.client, debug=args.debug, region=args.region, zone=args.zone,
                          namespace=args.namespace)
         names = [common.get_lastvm(config.client)] if not args.names else args.names
     for name in names:
@@ -683,7 +771,7 @@ def info_vm(args):
 def enable_host(args):
     """Enable host"""
     host = args.name
-    baseconfig = Kbaseconfig(client=args.client, debug=args.debug)
+    baseconfig = kbaseconfig(client=args.client, debug=args.debug)
     result = baseconfig.enable_host(host)
     if result['result'] == 'success':
         sys.exit(0)
@@ -694,7 +782,7 @@ def enable_host(args):
 def disable_host(args):
     """Disable host"""
     host = args.name
-    baseconfig = Kbaseconfig(client=args.client, debug=args.debug)
+    baseconfig = kbaseconfig(client=args.client, debug=args.debug)
     result = baseconfig.disable_host(host)
     if result['result'] == 'success':
         sys.exit(0)
@@ -714,7 +802,7 @@ def delete_host(args):
 def sync_host(args):
     """Sync host"""
     hosts = args.names
-    config = Kconfig(client=args.client, debug=args.debug, region=args.region, zone=args.zone, namespace=args.namespace)
+    config = kconfig(client=args.client, debug=args.debug, region=args.region, zone=args.zone, namespace=args.namespace)
     result = config.handle_host(sync=hosts)
     sys.exit(0 if result['result'] == 'success' else 1)
 
@@ -722,7 +810,7 @@ def sync_host(args):
 def sync_config(args):
     """Sync config"""
     network = args.net
-    baseconfig = Kbaseconfig(client=args.client, debug=args.debug)
+    baseconfig = kbaseconfig(client=args.client, debug=args.debug)
     result = baseconfig.import_in_kube(network=network, secure=args.secure)
     sys.exit(0 if result['result'] == 'success' else 1)
 
@@ -743,7 +831,7 @@ def _list_output(_list, output):
 
 
 def _parse_vms_list(_list):
-    vmstable = PrettyTable(["Name", "Status", "Ips", "Source", "Plan", "Profile"])
+    vmstable = prettytable(["Name", "Status", "Ips", "Source", "Plan", "Profile"])
     for vm in _list:
         name = vm.get('name')
         status = vm.get('status')
@@ -765,16 +853,16 @@ def list_vm(args):
         warning(f"Ignoring wrong filters. key should be part of {filter_keys}")
         overrides = {key: overrides[key] for key in filter_keys if key in overrides}
     if args.client is not None and args.client == 'all':
-        baseconfig = Kbaseconfig(client=args.client, debug=args.debug, quiet=True)
+        baseconfig = kbaseconfig(client=args.client, debug=args.debug, quiet=True)
         args.client = ','.join(baseconfig.clients)
     if args.client is not None and ',' in args.client:
-        vmstable = PrettyTable(["Name", "Host", "Status", "Ips", "Source", "Plan", "Profile"])
+        vmstable = prettytable(["Name", "Host", "Status", "Ips", "Source", "Plan", "Profile"])
         for client in args.client.split(','):
-            config = Kbaseconfig(client=client, debug=args.debug, quiet=True)
+            config = kbaseconfig(client=client, debug=args.debug, quiet=True)
             if config.cache:
                 _list = cache_vms(config, args.region, args.zone, args.namespace)
             else:
-                config = Kconfig(client=client, debug=args.debug, region=args.region,
+                config = kconfig(client=client, debug=args.debug, region=args.region,
                                  zone=args.zone, namespace=args.namespace)
                 _list = config.k.list()
             if output is not None:
@@ -801,12 +889,12 @@ def list_vm(args):
                     vmstable.add_row(vminfo)
         print(vmstable)
     else:
-        vmstable = PrettyTable(["Name", "Status", "Ip", "Source", "Plan", "Profile"])
-        config = Kbaseconfig(client=args.client, debug=args.debug, quiet=True)
+        vmstable = prettytable(["Name", "Status", "Ip", "Source", "Plan", "Profile"])
+        config = kbaseconfig(client=args.client, debug=args.debug, quiet=True)
         if config.cache:
             _list = cache_vms(config, args.region, args.zone, args.namespace)
         else:
-            config = Kconfig(client=args.client, debug=args.debug, region=args.region,
+            config = kconfig(client=args.client, debug=args.debug, region=args.region,
                              zone=args.zone, namespace=args.namespace)
             _list = config.k.list()
         if output is not None:
@@ -836,12 +924,12 @@ def list_vm(args):
 
 def list_clusterprofile(args):
     """List clusterprofiles"""
-    baseconfig = Kbaseconfig(client=args.client, debug=args.debug)
+    baseconfig = kbaseconfig(client=args.client, debug=args.debug)
     clusterprofiles = baseconfig.list_clusterprofiles()
     output = args.global_output or args.output
     if output is not None:
         _list_output(clusterprofiles, output)
-    clusterprofilestable = PrettyTable(["Clusterprofile"])
+    clusterprofilestable = prettytable(["Clusterprofile"])
     for clusterprofile in sorted(clusterprofiles):
         clusterprofilestable.add_row([clusterprofile])
     clusterprofilestable.align["Clusterprofile"] = "l"
@@ -850,12 +938,12 @@ def list_clusterprofile(args):
 
 def list_confpool(args):
     """List confpools"""
-    baseconfig = Kbaseconfig(client=args.client, debug=args.debug)
+    baseconfig = kbaseconfig(client=args.client, debug=args.debug)
     confpools = baseconfig.list_confpools()
     output = args.global_output or args.output
     if output is not None:
         _list_output(confpools, output)
-    confpoolstable = PrettyTable(["Confpool"])
+    confpoolstable = prettytable(["Confpool"])
     for confpool in sorted(confpools):
         confpoolstable.add_row([confpool])
     confpoolstable.align["Confpool"] = "l"
@@ -865,14 +953,14 @@ def list_confpool(args):
 def list_container(args):
     """List containers"""
     filters = args.filters
-    config = Kconfig(client=args.client, debug=args.debug, region=args.region, zone=args.zone, namespace=args.namespace)
-    cont = Kcontainerconfig(config, client=args.containerclient).cont
+    config = kconfig(client=args.client, debug=args.debug, region=args.region, zone=args.zone, namespace=args.namespace)
+    cont = kcontainerconfig(config, client=args.containerclient).cont
     containers = cont.list_containers()
     output = args.global_output or args.output
     if output is not None:
         _list_output(containers, output)
     pprint("Listing containers...")
-    containerstable = PrettyTable(["Name", "Status", "Image", "Plan", "Command", "Ports", "Deploy"])
+    containerstable = prettytable(["Name", "Status", "Image", "Plan", "Command", "Ports", "Deploy"])
     for container in containers:
         if filters:
             status = container[1]
@@ -886,18 +974,18 @@ def list_container(args):
 def profilelist_container(args):
     """List container profiles"""
     short = args.short
-    baseconfig = Kbaseconfig(client=args.client, debug=args.debug)
+    baseconfig = kbaseconfig(client=args.client, debug=args.debug)
     profiles = baseconfig.list_containerprofiles()
     output = args.global_output or args.output
     if output is not None:
         _list_output(profiles, output)
     if short:
-        profilestable = PrettyTable(["Profile"])
+        profilestable = prettytable(["Profile"])
         for profile in sorted(profiles):
             profilename = profile[0]
             profilestable.add_row([profilename])
     else:
-        profilestable = PrettyTable(["Profile", "Image", "Nets", "Ports", "Volumes", "Cmd"])
+        profilestable = prettytable(["Profile", "Image", "Nets", "Ports", "Volumes", "Cmd"])
         for profile in sorted(profiles):
             profilestable.add_row(profile)
     profilestable.align["Profile"] = "l"
@@ -906,17 +994,17 @@ def profilelist_container(args):
 
 def list_containerimage(args):
     """List container images"""
-    config = Kconfig(client=args.client, debug=args.debug, region=args.region, zone=args.zone, namespace=args.namespace)
+    config = kconfig(client=args.client, debug=args.debug, region=args.region, zone=args.zone, namespace=args.namespace)
     if config.type != 'kvm':
         error("Operation not supported on this kind of client.Leaving...")
         sys.exit(1)
-    cont = Kcontainerconfig(config, client=args.containerclient).cont
+    cont = kcontainerconfig(config, client=args.containerclient).cont
     images = cont.list_images()
     output = args.global_output or args.output
     if output is not None:
         _list_output(images, output)
     common.pprint("Listing images...")
-    imagestable = PrettyTable(["Name"])
+    imagestable = prettytable(["Name"])
     for image in images:
         imagestable.add_row([image])
     print(imagestable)
@@ -924,9 +1012,9 @@ def list_containerimage(args):
 
 def list_host(args):
     """List hosts"""
-    clientstable = PrettyTable(["Client", "Type", "Enabled", "Current"])
+    clientstable = prettytable(["Client", "Type", "Enabled", "Current"])
     clientstable.align["Client"] = "l"
-    baseconfig = Kbaseconfig(client=args.client, debug=args.debug)
+    baseconfig = kbaseconfig(client=args.client, debug=args.debug)
     clients = baseconfig.clients
     output = args.global_output or args.output
     if output is not None:
@@ -944,7 +1032,7 @@ def list_host(args):
 def list_kubeconfig(args):
     homedir = os.path.expanduser("~")
     clustersdir = f"{homedir}/.kcli/clusters"
-    kubeconfigstable = PrettyTable(["Kubeconfig", "Current"])
+    kubeconfigstable = prettytable(["Kubeconfig", "Current"])
     existing = os.path.exists(f"{homedir}/.kube/config")
     for entry in glob(f'{clustersdir}/*/auth/kubeconfig'):
         cluster = entry.replace(f'{clustersdir}/', '').replace('/auth/kubeconfig', '')
@@ -957,17 +1045,17 @@ def list_kubeconfig(args):
 def list_lb(args):
     """List lbs"""
     short = args.short
-    config = Kconfig(client=args.client, debug=args.debug, region=args.region, zone=args.zone, namespace=args.namespace)
+    config = kconfig(client=args.client, debug=args.debug, region=args.region, zone=args.zone, namespace=args.namespace)
     lbs = config.list_loadbalancers()
     output = args.global_output or args.output
     if output is not None:
         _list_output(lbs, output)
     if short:
-        loadbalancerstable = PrettyTable(["Loadbalancer"])
+        loadbalancerstable = prettytable(["Loadbalancer"])
         for lb in sorted(lbs):
             loadbalancerstable.add_row([lb])
     else:
-        loadbalancerstable = PrettyTable(["LoadBalancer", "IPAddress", "IPProtocol", "Ports", "Target"])
+        loadbalancerstable = prettytable(["LoadBalancer", "IPAddress", "IPProtocol", "Ports", "Target"])
         for lb in sorted(lbs):
             loadbalancerstable.add_row(lb)
     loadbalancerstable.align["Loadbalancer"] = "l"
@@ -975,7 +1063,7 @@ def list_lb(args):
 
 
 def info_clusterprofile(args):
-    baseconfig = Kbaseconfig(client=args.client, debug=args.debug)
+    baseconfig = kbaseconfig(client=args.client, debug=args.debug)
     clusterprofile = args.clusterprofile
     if clusterprofile not in baseconfig.clusterprofiles:
         error(f"Clusterprofile {clusterprofile} not found")
@@ -988,7 +1076,7 @@ def info_clusterprofile(args):
 
 
 def info_confpool(args):
-    baseconfig = Kbaseconfig(client=args.client, debug=args.debug)
+    baseconfig = kbaseconfig(client=args.client, debug=args.debug)
     confpool = args.confpool
     if confpool not in baseconfig.confpools:
         error(f"Confpool {confpool} not found")
@@ -1002,7 +1090,7 @@ def info_confpool(args):
 
 def info_profile(args):
     profile = args.profile
-    baseconfig = Kbaseconfig(client=args.client, debug=args.debug)
+    baseconfig = kbaseconfig(client=args.client, debug=args.debug)
     profiles = baseconfig.list_profiles()
     for entry in profiles:
         if entry[0] == profile:
@@ -1026,18 +1114,18 @@ def info_profile(args):
 def list_profile(args):
     """List profiles"""
     short = args.short
-    baseconfig = Kbaseconfig(client=args.client, debug=args.debug)
+    baseconfig = kbaseconfig(client=args.client, debug=args.debug)
     profiles = baseconfig.list_profiles()
     output = args.global_output or args.output
     if output is not None:
         _list_output(profiles, output)
     if short:
-        profilestable = PrettyTable(["Profile"])
+        profilestable = prettytable(["Profile"])
         for profile in sorted(profiles):
             profilename = profile[0]
             profilestable.add_row([profilename])
     else:
-        profilestable = PrettyTable(["Profile", "Flavor",
+        profilestable = prettytable(["Profile", "Flavor",
                                      "Pool", "Disks", "Image",
                                      "Nets", "Cloudinit", "Nested",
                                      "Reservedns", "Reservehost"])
@@ -1051,19 +1139,19 @@ def list_dns(args):
     """List dns"""
     short = args.short
     domain = args.domain
-    config = Kconfig(client=args.client, debug=args.debug, region=args.region, zone=args.zone, namespace=args.namespace)
+    config = kconfig(client=args.client, debug=args.debug, region=args.region, zone=args.zone, namespace=args.namespace)
     k = config.k
     entries = k.list_dns(domain)
     output = args.global_output or args.output
     if output is not None:
         _list_output(entries, output)
     if short:
-        dnstable = PrettyTable(["Entry"])
+        dnstable = prettytable(["Entry"])
         for entry in sorted(entries):
             entryname = entry[0]
             dnstable.add_row([entryname])
     else:
-        dnstable = PrettyTable(["Entry", "Type", "TTL", "Data"])
+        dnstable = prettytable(["Entry", "Type", "TTL", "Data"])
         for entry in sorted(entries):
             dnstable.add_row(entry)
     dnstable.align["Flavor"] = "l"
@@ -1073,19 +1161,19 @@ def list_dns(args):
 def list_flavors(args):
     """List flavors"""
     short = args.short
-    config = Kconfig(client=args.client, debug=args.debug, region=args.region, zone=args.zone, namespace=args.namespace)
+    config = kconfig(client=args.client, debug=args.debug, region=args.region, zone=args.zone, namespace=args.namespace)
     k = config.k
     flavors = k.list_flavors()
     output = args.global_output or args.output
     if output is not None:
         _list_output(flavors, output)
     if short:
-        flavorstable = PrettyTable(["Flavor"])
+        flavorstable = prettytable(["Flavor"])
         for flavor in sorted(flavors):
             flavorname = flavor[0]
             flavorstable.add_row([flavorname])
     else:
-        flavorstable = PrettyTable(["Flavor", "Numcpus", "Memory"])
+        flavorstable = prettytable(["Flavor", "Numcpus", "Memory"])
         for flavor in sorted(flavors):
             flavorstable.add_row(flavor)
     flavorstable.align["Flavor"] = "l"
@@ -1107,7 +1195,7 @@ def list_available_images(args):
     headers = ["Images"]
     if full:
         headers.append("URL")
-    imagestable = PrettyTable(headers)
+    imagestable = prettytable(headers)
     imagestable.align["Images"] = "l"
     for key in IMAGES:
         data = [key]
@@ -1119,14 +1207,14 @@ def list_available_images(args):
 
 def list_image(args):
     """List images"""
-    config = Kconfig(client=args.client, debug=args.debug, region=args.region, zone=args.zone, namespace=args.namespace)
+    config = kconfig(client=args.client, debug=args.debug, region=args.region, zone=args.zone, namespace=args.namespace)
     if config.client != 'all':
         k = config.k
     images = k.volumes()
     output = args.global_output or args.output
     if output is not None:
         _list_output(images, output)
-    imagestable = PrettyTable(["Images"])
+    imagestable = prettytable(["Images"])
     imagestable.align["Images"] = "l"
     for image in images:
         imagestable.add_row([image])
@@ -1135,14 +1223,14 @@ def list_image(args):
 
 def list_iso(args):
     """List isos"""
-    config = Kconfig(client=args.client, debug=args.debug, region=args.region, zone=args.zone, namespace=args.namespace)
+    config = kconfig(client=args.client, debug=args.debug, region=args.region, zone=args.zone, namespace=args.namespace)
     if config.client != 'all':
         k = config.k
     isos = k.volumes(iso=True)
     output = args.global_output or args.output
     if output is not None:
         _list_output(isos, output)
-    isostable = PrettyTable(["Iso"])
+    isostable = prettytable(["Iso"])
     isostable.align["Iso"] = "l"
     for iso in isos:
         isostable.add_row([iso])
@@ -1152,7 +1240,7 @@ def list_iso(args):
 def list_networks(args):
     """List networks"""
     short = args.short
-    config = Kconfig(client=args.client, debug=args.debug, region=args.region, zone=args.zone, namespace=args.namespace)
+    config = kconfig(client=args.client, debug=args.debug, region=args.region, zone=args.zone, namespace=args.namespace)
     if config.client != 'all':
         k = config.k
     networks = k.list_networks()
@@ -1161,11 +1249,11 @@ def list_networks(args):
         _list_output(networks, output)
     pprint("Listing Networks...")
     if short:
-        networkstable = PrettyTable(["Network"])
+        networkstable = prettytable(["Network"])
         for network in sorted(networks):
             networkstable.add_row([network])
     else:
-        networkstable = PrettyTable(["Network", "Type", "Cidr", "Dhcp", "Domain", "Mode"])
+        networkstable = prettytable(["Network", "Type", "Cidr", "Dhcp", "Domain", "Mode"])
         for network in sorted(networks):
             networktype = networks[network]['type']
             cidr = networks[network]['cidr']
@@ -1182,16 +1270,16 @@ def list_networks(args):
 
 def list_plan(args):
     """List plans"""
-    config = Kconfig(client=args.client, debug=args.debug, region=args.region, zone=args.zone, namespace=args.namespace)
+    config = kconfig(client=args.client, debug=args.debug, region=args.region, zone=args.zone, namespace=args.namespace)
     if config.extraclients:
         allclients = config.extraclients.copy()
         allclients.update({config.client: config.k})
         output = args.global_output or args.output
         if output is not None:
             _list_output(allclients, output)
-        planstable = PrettyTable(["Plan", "Host", "Vms"])
+        planstable = prettytable(["Plan", "Host", "Vms"])
         for cli in sorted(allclients):
-            currentconfig = Kconfig(client=cli, debug=args.debug, region=args.region, zone=args.zone,
+            currentconfig = kconfig(client=cli, debug=args.debug, region=args.region, zone=args.zone,
                                     namespace=args.namespace)
             for plan in currentconfig.list_plans():
                 planname = plan[0]
@@ -1202,7 +1290,7 @@ def list_plan(args):
         output = args.global_output or args.output
         if output is not None:
             _list_output(plans, output)
-        planstable = PrettyTable(["Plan", "Vms"])
+        planstable = prettytable(["Plan", "Vms"])
         for plan in plans:
             planname = plan[0]
             planvms = plan[1]
@@ -1211,7 +1299,7 @@ def list_plan(args):
 
 
 def list_plantypes(args):
-    plantypestable = PrettyTable(["PlanTypes"])
+    plantypestable = prettytable(["PlanTypes"])
     for _type in sorted(PLANTYPES):
         plantypestable.add_row([_type])
     print(plantypestable)
@@ -1219,7 +1307,7 @@ def list_plantypes(args):
 
 def list_subnets(args):
     short = args.short
-    config = Kconfig(client=args.client, debug=args.debug, region=args.region, zone=args.zone, namespace=args.namespace)
+    config = kconfig(client=args.client, debug=args.debug, region=args.region, zone=args.zone, namespace=args.namespace)
     if config.client != 'all':
         k = config.k
     subnets = k.list_subnets()
@@ -1228,11 +1316,11 @@ def list_subnets(args):
         _list_output(subnets, output)
     pprint("Listing Subnets...")
     if short:
-        subnetstable = PrettyTable(["Subnets"])
+        subnetstable = prettytable(["Subnets"])
         for subnet in sorted(subnets):
             subnetstable.add_row([subnet])
     else:
-        subnetstable = PrettyTable(["Subnet", "Az", "Cidr", "Network"])
+        subnetstable = prettytable(["Subnet", "Az", "Cidr", "Network"])
         for subnet in sorted(subnets):
             cidr = subnets[subnet]['cidr']
             az = subnets[subnet]['az']
@@ -1264,7 +1352,7 @@ def create_app_generic(args):
         warning("KUBECONFIG not set...Using .kube/config instead")
     elif not os.path.isabs(os.environ['KUBECONFIG']):
         os.environ['KUBECONFIG'] = f"{os.getcwd()}/{os.environ['KUBECONFIG']}"
-    baseconfig = Kbaseconfig(client=args.client, debug=args.debug, offline=True)
+    baseconfig = kbaseconfig(client=args.client, debug=args.debug, offline=True)
     available_apps = baseconfig.list_apps_generic(quiet=True)
     for app in apps:
         if app not in available_apps:
@@ -1294,7 +1382,7 @@ def create_app_openshift(args):
         warning("KUBECONFIG not set...Using .kube/config instead")
     elif not os.path.isabs(os.environ['KUBECONFIG']):
         os.environ['KUBECONFIG'] = f"{os.getcwd()}/{os.environ['KUBECONFIG']}"
-    baseconfig = Kbaseconfig(client=args.client, debug=args.debug, offline=True)
+    baseconfig = kbaseconfig(client=args.client, debug=args.debug, offline=True)
     for app in apps:
         if app in LOCAL_OPENSHIFT_APPS:
             name = app
@@ -1336,7 +1424,7 @@ def delete_app_generic(args):
         warning("KUBECONFIG not set...Using .kube/config instead")
     elif not os.path.isabs(os.environ['KUBECONFIG']):
         os.environ['KUBECONFIG'] = f"{os.getcwd()}/{os.environ['KUBECONFIG']}"
-    baseconfig = Kbaseconfig(client=args.client, debug=args.debug, offline=True)
+    baseconfig = kbaseconfig(client=args.client, debug=args.debug, offline=True)
     available_apps = baseconfig.list_apps_generic(quiet=True)
     for app in apps:
         if app not in available_apps:
@@ -1361,7 +1449,7 @@ def delete_app_openshift(args):
         warning("KUBECONFIG not set...Using .kube/config instead")
     elif not os.path.isabs(os.environ['KUBECONFIG']):
         os.environ['KUBECONFIG'] = f"{os.getcwd()}/{os.environ['KUBECONFIG']}"
-    baseconfig = Kbaseconfig(client=args.client, debug=args.debug, offline=True)
+    baseconfig = kbaseconfig(client=args.client, debug=args.debug, offline=True)
     for app in apps:
         if app in LOCAL_OPENSHIFT_APPS:
             name = app
@@ -1381,12 +1469,12 @@ def delete_app_openshift(args):
 
 def list_apps_generic(args):
     """List generic kube apps"""
-    baseconfig = Kbaseconfig(client=args.client, debug=args.debug, offline=True)
+    baseconfig = kbaseconfig(client=args.client, debug=args.debug, offline=True)
     apps = baseconfig.list_apps_generic(quiet=True)
     output = args.global_output or args.output
     if output is not None:
         _list_output(apps, output)
-    appstable = PrettyTable(["Name"])
+    appstable = prettytable(["Name"])
     for app in apps:
         appstable.add_row([app])
     print(appstable)
@@ -1401,12 +1489,12 @@ def list_apps_openshift(args):
         warning("KUBECONFIG not set...Using .kube/config instead")
     elif not os.path.isabs(os.environ['KUBECONFIG']):
         os.environ['KUBECONFIG'] = f"{os.getcwd()}/{os.environ['KUBECONFIG']}"
-    baseconfig = Kbaseconfig(client=args.client, debug=args.debug, offline=True)
+    baseconfig = kbaseconfig(client=args.client, debug=args.debug, offline=True)
     apps = baseconfig.list_apps_openshift(quiet=True, installed=args.installed)
     output = args.global_output or args.output
     if output is not None:
         _list_output(apps, output)
-    appstable = PrettyTable(["Name"])
+    appstable = prettytable(["Name"])
     for app in apps:
         appstable.add_row([app])
     print(appstable)
@@ -1414,13 +1502,13 @@ def list_apps_openshift(args):
 
 def list_cluster(args):
     """List clusters"""
-    config = Kconfig(client=args.client, debug=args.debug, region=args.region, zone=args.zone, namespace=args.namespace)
+    config = kconfig(client=args.client, debug=args.debug, region=args.region, zone=args.zone, namespace=args.namespace)
     if config.extraclients:
-        kubestable = PrettyTable(["Cluster", "Type", "Plan", "Host", "Vms"])
+        kubestable = prettytable(["Cluster", "Type", "Plan", "Host", "Vms"])
         allclients = config.extraclients.copy()
         allclients.update({config.client: config.k})
         for cli in sorted(allclients):
-            currentconfig = Kconfig(client=cli, debug=args.debug, region=args.region, zone=args.zone,
+            currentconfig = kconfig(client=cli, debug=args.debug, region=args.region, zone=args.zone,
                                     namespace=args.namespace)
             kubes = currentconfig.list_kubes()
             output = args.global_output or args.output
@@ -1433,7 +1521,7 @@ def list_cluster(args):
                 kubevms = kube['vms']
                 kubestable.add_row([kubename, kubetype, kubeplan, cli, kubevms])
     else:
-        kubestable = PrettyTable(["Cluster", "Type", "Plan", "Vms"])
+        kubestable = prettytable(["Cluster", "Type", "Plan", "Vms"])
         kubes = config.list_kubes()
         output = args.global_output or args.output
         if output is not None:
@@ -1450,18 +1538,18 @@ def list_cluster(args):
 def list_pool(args):
     """List pools"""
     short = args.short
-    config = Kconfig(client=args.client, debug=args.debug, region=args.region, zone=args.zone, namespace=args.namespace)
+    config = kconfig(client=args.client, debug=args.debug, region=args.region, zone=args.zone, namespace=args.namespace)
     k = config.k
     pools = k.list_pools()
     output = args.global_output or args.output
     if output is not None:
         _list_output(pools, output)
     if short:
-        poolstable = PrettyTable(["Pool"])
+        poolstable = prettytable(["Pool"])
         for pool in sorted(pools):
             poolstable.add_row([pool])
     else:
-        poolstable = PrettyTable(["Pool", "Path"])
+        poolstable = prettytable(["Pool", "Path"])
         for pool in sorted(pools):
             poolpath = k.get_pool_path(pool)
             poolstable.add_row([pool, poolpath])
@@ -1474,10 +1562,10 @@ def list_product(args):
     group = args.group
     repo = args.repo
     search = args.search
-    baseconfig = Kbaseconfig(client=args.client, debug=args.debug)
+    baseconfig = kbaseconfig(client=args.client, debug=args.debug)
     if search is not None:
-        baseconfig = Kbaseconfig(client=args.client, debug=args.debug)
-        productstable = PrettyTable(["Repo", "Product", "Group", "Description", "Numvms", "Memory"])
+        baseconfig = kbaseconfig(client=args.client, debug=args.debug)
+        productstable = prettytable(["Repo", "Product", "Group", "Description", "Numvms", "Memory"])
         productstable.align["Repo"] = "l"
         productsinfo = baseconfig.list_products(repo=repo)
         output = args.global_output or args.output
@@ -1497,7 +1585,7 @@ def list_product(args):
             group = prod.get('group', 'N/A')
             productstable.add_row([repo, name, group, description, numvms, memory])
     else:
-        productstable = PrettyTable(["Repo", "Product", "Group", "Description", "Numvms", "Memory"])
+        productstable = prettytable(["Repo", "Product", "Group", "Description", "Numvms", "Memory"])
         productstable.align["Repo"] = "l"
         productsinfo = baseconfig.list_products(group=group, repo=repo)
         output = args.global_output or args.output
@@ -1516,8 +1604,8 @@ def list_product(args):
 
 def list_repo(args):
     """List repos"""
-    baseconfig = Kbaseconfig(client=args.client, debug=args.debug)
-    repostable = PrettyTable(["Repo", "Url"])
+    baseconfig = kbaseconfig(client=args.client, debug=args.debug)
+    repostable = prettytable(["Repo", "Url"])
     repostable.align["Repo"] = "l"
     reposinfo = baseconfig.list_repos()
     output = args.global_output or args.output
@@ -1531,10 +1619,10 @@ def list_repo(args):
 
 def list_vmdisk(args):
     """List vm disks"""
-    config = Kconfig(client=args.client, debug=args.debug, region=args.region, zone=args.zone, namespace=args.namespace)
+    config = kconfig(client=args.client, debug=args.debug, region=args.region, zone=args.zone, namespace=args.namespace)
     k = config.k
     pprint("Listing disks...")
-    diskstable = PrettyTable(["Name", "Pool", "Path"])
+    diskstable = prettytable(["Name", "Pool", "Path"])
     diskstable.align["Name"] = "l"
     disks = k.list_disks()
     output = args.global_output or args.output
@@ -1554,7 +1642,7 @@ def create_openshift_iso(args):
     overrides = handle_parameters(args.param, args.paramfile)
     client = overrides.get('client') or args.client
     offline = client == 'fake' or common.need_fake()
-    config = Kconfig(client=client, debug=args.debug, region=args.region, zone=args.zone, namespace=args.namespace,
+    config = kconfig(client=client, debug=args.debug, region=args.region, zone=args.zone, namespace=args.namespace,
                      offline=offline)
     config.create_openshift_iso(cluster, overrides=overrides, ignitionfile=ignitionfile, direct=direct)
 
@@ -1567,7 +1655,7 @@ def create_openshift_disconnected(args):
     overrides = handle_parameters(args.param, args.paramfile)
     if 'cluster' not in overrides:
         overrides['cluster'] = plan
-    config = Kconfig(client=args.client, debug=args.debug, region=args.region, zone=args.zone, namespace=args.namespace)
+    config = kconfig(client=args.client, debug=args.debug, region=args.region, zone=args.zone, namespace=args.namespace)
     config.create_openshift_disconnected(plan, overrides=overrides)
 
 
@@ -1590,7 +1678,7 @@ def create_vm(args):
     customprofile = {}
     client = overrides.get('client', args.client)
     confpool = overrides.get('namepool') or overrides.get('confpool')
-    config = Kconfig(client=client, debug=args.debug, region=args.region, zone=args.zone, namespace=args.namespace)
+    config = kconfig(client=client, debug=args.debug, region=args.region, zone=args.zone, namespace=args.namespace)
     for key in overrides:
         if key in vars(config) and vars(config)[key] is not None and type(overrides[key]) != type(vars(config)[key]):
             key_type = str(type(vars(config)[key]))
@@ -1699,7 +1787,7 @@ def clone_vm(args):
     full = args.full
     start = args.start
     pprint(f"Cloning vm {name} from vm {base}...")
-    config = Kconfig(client=args.client, debug=args.debug, region=args.region, zone=args.zone, namespace=args.namespace)
+    config = kconfig(client=args.client, debug=args.debug, region=args.region, zone=args.zone, namespace=args.namespace)
     k = config.k
     result = k.clone(base, name, full=full, start=start)
     if result['result'] == 'success' and os.access(os.path.expanduser('~/.kcli'), os.W_OK):
@@ -1709,7 +1797,7 @@ def clone_vm(args):
 def update_vm(args):
     """Update ip, memory or numcpus"""
     overrides = handle_parameters(args.param, args.paramfile)
-    config = Kconfig(client=args.client, debug=args.debug, region=args.region, zone=args.zone, namespace=args.namespace)
+    config = kconfig(client=args.client, debug=args.debug, region=args.region, zone=args.zone, namespace=args.namespace)
     names = [common.get_lastvm(config.client)] if not args.names else args.names
     for name in names:
         config.update_vm(name, overrides)
@@ -1728,7 +1816,7 @@ def create_vmdisk(args):
         error("Incorrect disk interface. Choose between virtio, scsi or ide...")
         sys.exit(1)
     pool = args.pool
-    config = Kconfig(client=args.client, debug=args.debug, region=args.region, zone=args.zone, namespace=args.namespace)
+    config = kconfig(client=args.client, debug=args.debug, region=args.region, zone=args.zone, namespace=args.namespace)
     k = config.k
     if size is None:
         error("Missing size. Leaving...")
@@ -1757,7 +1845,7 @@ def delete_vmdisk(args):
     disknames = args.disknames
     novm = args.novm
     pool = args.pool
-    config = Kconfig(client=args.client, debug=args.debug, region=args.region, zone=args.zone, namespace=args.namespace)
+    config = kconfig(client=args.client, debug=args.debug, region=args.region, zone=args.zone, namespace=args.namespace)
     k = config.k
     for diskname in disknames:
         pprint(f"Deleting disk {diskname}")
@@ -1773,7 +1861,7 @@ def create_dns(args):
     alias = args.alias
     if alias is None:
         alias = []
-    config = Kconfig(client=args.client, debug=args.debug, region=args.region, zone=args.zone, namespace=args.namespace)
+    config = kconfig(client=args.client, debug=args.debug, region=args.region, zone=args.zone, namespace=args.namespace)
     k = config.k
     name = names[0]
     if len(names) > 1:
@@ -1793,7 +1881,7 @@ def delete_dns(args):
     net = args.net
     allentries = args.all
     domain = args.domain if args.domain is not None else net
-    config = Kconfig(client=args.client, debug=args.debug, region=args.region, zone=args.zone, namespace=args.namespace)
+    config = kconfig(client=args.client, debug=args.debug, region=args.region, zone=args.zone, namespace=args.namespace)
     k = config.k
     for name in names:
         pprint(f"Deleting Dns entry for {name}")
@@ -1803,7 +1891,7 @@ def delete_dns(args):
 def export_vm(args):
     """Export a vm"""
     image = args.image
-    config = Kconfig(client=args.client, debug=args.debug, region=args.region, zone=args.zone, namespace=args.namespace)
+    config = kconfig(client=args.client, debug=args.debug, region=args.region, zone=args.zone, namespace=args.namespace)
     names = [common.get_lastvm(config.client)] if not args.names else args.names
     k = config.k
     codes = []
@@ -1835,7 +1923,7 @@ def create_lb(args):
     good_ports = args.ports[1:-1] if args.ports.startswith('[') and args.ports.endswith(']') else args.ports
     ports = [p.strip() for p in good_ports.split(',')]
     name = nameutils.get_random_name().replace('_', '-') if args.name is None else args.name
-    config = Kconfig(client=args.client, debug=args.debug, region=args.region, zone=args.zone, namespace=args.namespace)
+    config = kconfig(client=args.client, debug=args.debug, region=args.region, zone=args.zone, namespace=args.namespace)
     config.create_loadbalancer(name, ports=ports, checkpath=checkpath, vms=vms, domain=domain, checkport=checkport,
                                internal=internal, subnetid=subnetid)
 
@@ -1846,7 +1934,7 @@ def delete_lb(args):
     yes_top = args.yes_top
     if not yes and not yes_top:
         common.confirm("Are you sure?")
-    config = Kconfig(client=args.client, debug=args.debug, region=args.region, zone=args.zone, namespace=args.namespace)
+    config = kconfig(client=args.client, debug=args.debug, region=args.region, zone=args.zone, namespace=args.namespace)
     config.delete_loadbalancer(args.name)
 
 
@@ -1862,7 +1950,7 @@ def create_kube(args):
         sys.exit(1)
     client = overrides.get('client', args.client)
     offline = kubetype == 'openshift' and 'sno' in overrides and (client == 'fake' or common.need_fake())
-    config = Kconfig(client=client, debug=args.debug, region=args.region, zone=args.zone, namespace=args.namespace,
+    config = kconfig(client=client, debug=args.debug, region=args.region, zone=args.zone, namespace=args.namespace,
                      offline=offline)
     if overrides.get('force', args.force):
         overrides['kubetype'] = kubetype
@@ -1926,7 +2014,7 @@ def delete_kube(args):
     if not yes and not yes_top:
         common.confirm("Are you sure?")
     overrides = handle_parameters(args.param, args.paramfile)
-    config = Kconfig(client=args.client, debug=args.debug, region=args.region, zone=args.zone, namespace=args.namespace)
+    config = kconfig(client=args.client, debug=args.debug, region=args.region, zone=args.zone, namespace=args.namespace)
     for cluster in clusters:
         config.delete_kube(cluster, overrides=overrides)
 
@@ -1936,7 +2024,7 @@ def scale_kube(args):
     kubetype = args.type
     overrides = handle_parameters(args.param, args.paramfile)
     cluster = overrides.get('cluster', args.cluster)
-    config = Kconfig(client=args.client, debug=args.debug, region=args.region, zone=args.zone, namespace=args.namespace)
+    config = kconfig(client=args.client, debug=args.debug, region=args.region, zone=args.zone, namespace=args.namespace)
     if args.ctlplanes is not None:
         overrides['ctlplanes'] = args.ctlplanes
     if args.workers is not None:
@@ -2022,7 +2110,7 @@ def update_kube(args):
     data['basedir'] = '/workdir' if container_mode() else '.'
     if plan is None:
         plan = cluster
-    config = Kconfig(client=args.client, debug=args.debug, region=args.region, zone=args.zone, namespace=args.namespace)
+    config = kconfig(client=args.client, debug=args.debug, region=args.region, zone=args.zone, namespace=args.namespace)
     config.update_kube(plan, _type, overrides=data)
 
 
@@ -2030,7 +2118,7 @@ def create_vmnic(args):
     """Add nic to vm"""
     name = args.name
     network = args.network
-    config = Kconfig(client=args.client, debug=args.debug, region=args.region, zone=args.zone, namespace=args.namespace)
+    config = kconfig(client=args.client, debug=args.debug, region=args.region, zone=args.zone, namespace=args.namespace)
     k = config.k
     if network is None:
         error("Missing network. Leaving...")
@@ -2047,7 +2135,7 @@ def delete_vmnic(args):
         common.confirm("Are you sure?")
     name = args.name
     interface = args.interface
-    config = Kconfig(client=args.client, debug=args.debug, region=args.region, zone=args.zone, namespace=args.namespace)
+    config = kconfig(client=args.client, debug=args.debug, region=args.region, zone=args.zone, namespace=args.namespace)
     k = config.k
     pprint(f"Deleting nic from vm {name}...")
     k.delete_nic(name, interface)
@@ -2059,7 +2147,7 @@ def create_pool(args):
     pooltype = args.pooltype
     path = args.path
     thinpool = args.thinpool
-    config = Kconfig(client=args.client, debug=args.debug, region=args.region, zone=args.zone, namespace=args.namespace)
+    config = kconfig(client=args.client, debug=args.debug, region=args.region, zone=args.zone, namespace=args.namespace)
     k = config.k
     if path is None:
         error("Missing path. Leaving...")
@@ -2076,7 +2164,7 @@ def delete_pool(args):
         common.confirm("Are you sure?")
     pool = args.pool
     full = args.full
-    config = Kconfig(client=args.client, debug=args.debug, region=args.region, zone=args.zone, namespace=args.namespace)
+    config = kconfig(client=args.client, debug=args.debug, region=args.region, zone=args.zone, namespace=args.namespace)
     k = config.k
     pprint(f"Deleting pool {pool}...")
     result = k.delete_pool(name=pool, full=full)
@@ -2106,7 +2194,7 @@ def create_plan(args):
             else:
                 pprint("Current kcli version compatible with this plan")
     client = overrides.get('client', args.client)
-    config = Kconfig(client=client, debug=args.debug, region=args.region, zone=args.zone, namespace=args.namespace)
+    config = kconfig(client=client, debug=args.debug, region=args.region, zone=args.zone, namespace=args.namespace)
     _type = config.ini[config.client].get('type', 'kvm')
     overrides.update({'type': _type})
     plan = overrides.get('plan', args.plan)
@@ -2136,7 +2224,7 @@ def create_playbook(args):
     inputfile = overrides.get('inputfile') or args.inputfile or 'kcli_plan.yml'
     if container_mode():
         inputfile = f"/workdir/{inputfile}"
-    baseconfig = Kbaseconfig(client=args.client, debug=args.debug)
+    baseconfig = kbaseconfig(client=args.client, debug=args.debug)
     _type = baseconfig.ini[baseconfig.client].get('type', 'kvm')
     overrides.update({'type': _type})
     baseconfig.create_playbook(inputfile, overrides=overrides, store=store)
@@ -2153,7 +2241,7 @@ def update_plan(args):
     inputfile = overrides.get('inputfile') or args.inputfile or 'kcli_plan.yml'
     if container_mode():
         inputfile = f"/workdir/{inputfile}"
-    config = Kconfig(client=args.client, debug=args.debug, region=args.region, zone=args.zone, namespace=args.namespace)
+    config = kconfig(client=args.client, debug=args.debug, region=args.region, zone=args.zone, namespace=args.namespace)
     if autostart or noautostart:
         if config.type != 'kvm':
             error("Changing autostart of vms only apply to kvm")
@@ -2162,7 +2250,10 @@ def update_plan(args):
         elif noautostart:
             config.noautostart_plan(plan)
         return
-    config.plan(plan, url=url, path=path, container=container, inputfile=inputfile, overrides=overrides, update=True)
+    result = config.plan(plan, url=url, path=path, container=container, inputfile=inputfile, overrides=overrides,
+                         update=True, dry=args.dry)
+    if args.dry and result is not None and (result.get('changes') or result.get('newvms')):
+        sys.exit(1)
 
 
 def delete_plan(args):
@@ -2173,7 +2264,7 @@ def delete_plan(args):
         common.confirm("Are you sure?")
     plans = args.plans
     codes = []
-    config = Kconfig(client=args.client, debug=args.debug, region=args.region, zone=args.zone, namespace=args.namespace)
+    config = kconfig(client=args.client, debug=args.debug, region=args.region, zone=args.zone, namespace=args.namespace)
     for plan in plans:
         result = config.delete_plan(plan, unregister=config.rhnunregister)
         if 'result' in result and result['result'] == 'success':
@@ -2201,7 +2292,7 @@ def expose_cluster(args):
     with NamedTemporaryFile(mode='w+t') as temp:
         yaml.dump(data, temp)
         inputfile = temp.name
-        config = Kconfig(client=args.client, debug=args.debug, region=args.region, zone=args.zone,
+        config = kconfig(client=args.client, debug=args.debug, region=args.region, zone=args.zone,
                          namespace=args.namespace)
         config.expose_plan(plan, inputfile=inputfile, overrides=overrides, port=port, pfmode=args.pfmode, cluster=True)
 
@@ -2216,7 +2307,7 @@ def expose_plan(args):
     inputfile = overrides.get('inputfile') or args.inputfile or 'kcli_plan.yml'
     if container_mode():
         inputfile = f"/workdir/{inputfile}"
-    config = Kconfig(client=args.client, debug=args.debug, region=args.region, zone=args.zone, namespace=args.namespace)
+    config = kconfig(client=args.client, debug=args.debug, region=args.region, zone=args.zone, namespace=args.namespace)
     config.expose_plan(plan, inputfile=inputfile, overrides=overrides, port=port, pfmode=args.pfmode)
 
 
@@ -2224,7 +2315,7 @@ def start_plan(args):
     """Start plan"""
     plans = args.plans
     codes = []
-    config = Kconfig(client=args.client, debug=args.debug, region=args.region, zone=args.zone, namespace=args.namespace)
+    config = kconfig(client=args.client, debug=args.debug, region=args.region, zone=args.zone, namespace=args.namespace)
     for plan in plans:
         result = config.start_plan(plan)
         if 'result' in result and result['result'] == 'success':
@@ -2239,7 +2330,7 @@ def stop_plan(args):
     plans = args.plans
     codes = []
     soft = args.soft
-    config = Kconfig(client=args.client, debug=args.debug, region=args.region, zone=args.zone, namespace=args.namespace)
+    config = kconfig(client=args.client, debug=args.debug, region=args.region, zone=args.zone, namespace=args.namespace)
     for plan in plans:
         result = config.stop_plan(plan, soft=soft)
         if 'result' in result and result['result'] == 'success':
@@ -2254,7 +2345,7 @@ def restart_plan(args):
     soft = args.soft
     plans = args.plans
     codes = []
-    config = Kconfig(client=args.client, debug=args.debug, region=args.region, zone=args.zone, namespace=args.namespace)
+    config = kconfig(client=args.client, debug=args.debug, region=args.region, zone=args.zone, namespace=args.namespace)
     for plan in plans:
         result1 = config.stop_plan(plan, soft=soft)
         result2 = config.start_plan(plan)
@@ -2267,17 +2358,17 @@ def restart_plan(args):
 
 
 def info_generic_app(args):
-    baseconfig = Kbaseconfig(client=args.client, debug=args.debug, offline=True)
+    baseconfig = kbaseconfig(client=args.client, debug=args.debug, offline=True)
     baseconfig.info_app_generic(args.app)
 
 
 def info_openshift_disconnected(args):
-    baseconfig = Kbaseconfig(client=args.client, debug=args.debug, offline=True)
+    baseconfig = kbaseconfig(client=args.client, debug=args.debug, offline=True)
     baseconfig.info_openshift_disconnected()
 
 
 def info_openshift_app(args):
-    baseconfig = Kbaseconfig(client=args.client, debug=args.debug, offline=True)
+    baseconfig = kbaseconfig(client=args.client, debug=args.debug, offline=True)
     baseconfig.info_app_openshift(args.app)
 
 
@@ -2291,7 +2382,7 @@ def info_plan(args):
     if container_mode():
         inputfile = f"/workdir/{inputfile}"
     if args.plan is not None:
-        config = Kconfig(client=args.client, debug=args.debug, region=args.region, zone=args.zone,
+        config = kconfig(client=args.client, debug=args.debug, region=args.region, zone=args.zone,
                          namespace=args.namespace)
         _list = config.info_specific_plan(args.plan)
         if output is not None:
@@ -2299,10 +2390,10 @@ def info_plan(args):
         else:
             _parse_vms_list(_list)
     elif url is None:
-        baseconfig = Kbaseconfig(client=args.client, debug=args.debug)
+        baseconfig = kbaseconfig(client=args.client, debug=args.debug)
         baseconfig.info_plan(inputfile, quiet=quiet, doc=doc)
     else:
-        config = Kconfig(client=args.client, debug=args.debug, region=args.region, zone=args.zone,
+        config = kconfig(client=args.client, debug=args.debug, region=args.region, zone=args.zone,
                          namespace=args.namespace)
         config.plan('info', url=url, path=path, inputfile=inputfile, info=True, quiet=quiet, doc=doc)
 
@@ -2314,7 +2405,7 @@ def info_kube(args):
     kubetype = args.kubetype
     output = args.global_output or args.output
     openshift = kubetype == 'openshift'
-    baseconfig = Kbaseconfig(client=args.client, debug=args.debug, offline=True)
+    baseconfig = kbaseconfig(client=args.client, debug=args.debug, offline=True)
     if args.cluster is not None:
         status = baseconfig.info_specific_kube(args.cluster, openshift)
         if status is None or not status:
@@ -2323,7 +2414,7 @@ def info_kube(args):
             _list_output(status, output)
         else:
             pprint(f"Providing information about cluster {args.cluster}")
-            kubetable = PrettyTable(["Name", "Status", "Role", "Age", "Version", "Ip"])
+            kubetable = prettytable(["Name", "Status", "Role", "Age", "Version", "Ip"])
             kubetable.title = f"{status['version'].strip()}"
             for node in status['nodes']:
                 kubetable.add_row(node)
@@ -2344,7 +2435,7 @@ def info_kube(args):
 
 def info_web_kube(args):
     output = args.global_output or args.output
-    config = Kconfig(client=args.client, debug=args.debug, region=args.region, zone=args.zone, namespace=args.namespace)
+    config = kconfig(client=args.client, debug=args.debug, region=args.region, zone=args.zone, namespace=args.namespace)
     status = config.k.info_specific_kube(args.cluster)
     if status is None or not status:
         return
@@ -2352,7 +2443,7 @@ def info_web_kube(args):
         _list_output(status, output)
     else:
         pprint(f"Providing information about cluster {args.cluster}")
-        kubetable = PrettyTable(["Name", "Status", "Role", "Age", "Version", "Ip"])
+        kubetable = prettytable(["Name", "Status", "Role", "Age", "Version", "Ip"])
         kubetable.title = f"{status['version'].strip()}"
         for node in status['nodes']:
             kubetable.add_row(node)
@@ -2389,7 +2480,7 @@ def info_network(args):
     """Info network """
     name = args.name
     pprint(f"Providing information about network {name}...")
-    config = Kconfig(client=args.client, debug=args.debug, region=args.region, zone=args.zone, namespace=args.namespace)
+    config = kconfig(client=args.client, debug=args.debug, region=args.region, zone=args.zone, namespace=args.namespace)
     networkinfo = config.k.info_network(name)
     if networkinfo:
         common.pretty_print(networkinfo)
@@ -2401,7 +2492,7 @@ def info_keyword(args):
     """Info keyword"""
     keyword = args.keyword
     pprint(f"Providing information about keyword {keyword}...")
-    baseconfig = Kbaseconfig(client=args.client, debug=args.debug, offline=True)
+    baseconfig = kbaseconfig(client=args.client, debug=args.debug, offline=True)
     return baseconfig.info_keyword(keyword)
 
 
@@ -2409,7 +2500,7 @@ def info_plantype(args):
     """Info plantype"""
     plantype = args.plantype
     pprint(f"Providing keywords available with plantype {plantype}...")
-    baseconfig = Kbaseconfig(client=args.client, debug=args.debug, offline=True)
+    baseconfig = kbaseconfig(client=args.client, debug=args.debug, offline=True)
     return baseconfig.info_plantype(plantype)
 
 
@@ -2420,7 +2511,7 @@ def download_plan(args):
     if plan is None:
         plan = nameutils.get_random_name()
         pprint(f"Using {plan} as name of the plan")
-    config = Kconfig(client=args.client, debug=args.debug, region=args.region, zone=args.zone, namespace=args.namespace)
+    config = kconfig(client=args.client, debug=args.debug, region=args.region, zone=args.zone, namespace=args.namespace)
     config.plan(plan, url=url, download=True)
 
 
@@ -2457,7 +2548,7 @@ def download_oc(args):
 def download_openshift_installer(args):
     """Download Openshift Installer"""
     overrides = handle_parameters(args.param, args.paramfile)
-    baseconfig = Kbaseconfig(client=args.client, debug=args.debug)
+    baseconfig = kbaseconfig(client=args.client, debug=args.debug)
     return baseconfig.download_openshift_installer(overrides)
 
 
@@ -2471,7 +2562,7 @@ def create_pipeline_github(args):
     if container_mode():
         inputfile = f"/workdir/{inputfile}"
     paramfile = args.paramfile[0] if args.paramfile else None
-    baseconfig = Kbaseconfig(client=args.client, debug=args.debug)
+    baseconfig = kbaseconfig(client=args.client, debug=args.debug)
     renderfile = baseconfig.create_github_pipeline(plan, inputfile, paramfile=paramfile, overrides=overrides,
                                                    kube=kube, script=script)
     print(renderfile)
@@ -2485,7 +2576,7 @@ def create_pipeline_jenkins(args):
     inputfile = overrides.get('inputfile') or args.inputfile or 'kcli_plan.yml'
     if container_mode():
         inputfile = f"/workdir/{inputfile}"
-    baseconfig = Kbaseconfig(client=args.client, debug=args.debug)
+    baseconfig = kbaseconfig(client=args.client, debug=args.debug)
     if not kube and not os.path.exists(inputfile):
         error(f"Input file {inputfile} not found")
         sys.exit(1)
@@ -2502,7 +2593,7 @@ def create_pipeline_tekton(args):
     paramfile = args.paramfile[0] if args.paramfile else None
     kube = args.kube
     plan = args.plan
-    baseconfig = Kbaseconfig(client=args.client, debug=args.debug)
+    baseconfig = kbaseconfig(client=args.client, debug=args.debug)
     renderfile = baseconfig.create_tekton_pipeline(plan, inputfile, paramfile=paramfile, overrides=overrides, kube=kube)
     print(renderfile)
 
@@ -2519,7 +2610,7 @@ def render_file(args):
     inputfile = overrides.get('inputfile') or args.inputfile or 'kcli_plan.yml'
     if container_mode():
         inputfile = f"/workdir/{inputfile}"
-    baseconfig = Kbaseconfig(client=args.client, debug=args.debug)
+    baseconfig = kbaseconfig(client=args.client, debug=args.debug)
     default_data = {f'config_{k}': baseconfig.default[k] for k in baseconfig.default}
     client_data = {f'config_{k}': baseconfig.ini[baseconfig.client][k] for k in baseconfig.ini[baseconfig.client]}
     client_data['config_type'] = client_data.get('config_type', 'kvm')
@@ -2558,7 +2649,7 @@ def create_plandata(args):
     inputfile = overrides.get('inputfile') or args.inputfile or 'kcli_plan.yml'
     if container_mode():
         inputfile = f"/workdir/{inputfile}"
-    config = Kconfig(client=args.client, debug=args.debug, region=args.region, zone=args.zone,
+    config = kconfig(client=args.client, debug=args.debug, region=args.region, zone=args.zone,
                      namespace=args.namespace)
     config_data = {f'config_{k}': config.ini[config.client][k] for k in config.ini[config.client]}
     config_data['config_type'] = config_data.get('config_type', 'kvm')
@@ -2612,7 +2703,7 @@ def create_plantemplate(args):
     skipscripts = args.skipscripts
     directory = args.directory
     overrides = handle_parameters(args.param, args.paramfile)
-    baseconfig = Kbaseconfig(client=args.client, debug=args.debug)
+    baseconfig = kbaseconfig(client=args.client, debug=args.debug)
     baseconfig.create_plan_template(directory, overrides=overrides, skipfiles=skipfiles, skipscripts=skipscripts)
 
 
@@ -2620,7 +2711,7 @@ def create_snapshot_plan(args):
     """Snapshot plan"""
     plan = args.plan
     snapshot = args.snapshot
-    config = Kconfig(client=args.client, debug=args.debug, region=args.region, zone=args.zone, namespace=args.namespace)
+    config = kconfig(client=args.client, debug=args.debug, region=args.region, zone=args.zone, namespace=args.namespace)
     config.snapshot_plan(plan, snapshotname=snapshot)
 
 
@@ -2632,7 +2723,7 @@ def delete_snapshot_plan(args):
         common.confirm("Are you sure?")
     plan = args.plan
     snapshot = args.snapshot
-    config = Kconfig(client=args.client, debug=args.debug, region=args.region, zone=args.zone, namespace=args.namespace)
+    config = kconfig(client=args.client, debug=args.debug, region=args.region, zone=args.zone, namespace=args.namespace)
     k = config.k
     for vm in sorted(k.list(), key=lambda x: x['name']):
         name = vm['name']
@@ -2645,7 +2736,7 @@ def revert_snapshot_plan(args):
     """Revert snapshot of plan"""
     plan = args.plan
     snapshot = args.snapshot
-    config = Kconfig(client=args.client, debug=args.debug, region=args.region, zone=args.zone, namespace=args.namespace)
+    config = kconfig(client=args.client, debug=args.debug, region=args.region, zone=args.zone, namespace=args.namespace)
     config.revert_plan(plan, snapshotname=snapshot)
 
 
@@ -2653,7 +2744,7 @@ def create_repo(args):
     """Create repo"""
     repo = args.repo
     url = args.url
-    baseconfig = Kbaseconfig(client=args.client, debug=args.debug)
+    baseconfig = kbaseconfig(client=args.client, debug=args.debug)
     if repo is None:
         error("Missing repo. Leaving...")
         sys.exit(1)
@@ -2671,7 +2762,7 @@ def delete_repo(args):
     if not yes and not yes_top:
         common.confirm("Are you sure?")
     repo = args.repo
-    baseconfig = Kbaseconfig(client=args.client, debug=args.debug)
+    baseconfig = kbaseconfig(client=args.client, debug=args.debug)
     if repo is None:
         error("Missing repo. Leaving...")
         sys.exit(1)
@@ -2682,7 +2773,7 @@ def delete_repo(args):
 def update_repo(args):
     """Update repo"""
     repo = args.repo
-    baseconfig = Kbaseconfig(client=args.client, debug=args.debug)
+    baseconfig = kbaseconfig(client=args.client, debug=args.debug)
     if repo is None:
         pprint("Updating all repos...")
         repos = baseconfig.list_repos()
@@ -2699,7 +2790,7 @@ def info_product(args):
     repo = args.repo
     product = args.product
     group = args.group
-    baseconfig = Kbaseconfig(client=args.client, debug=args.debug)
+    baseconfig = kbaseconfig(client=args.client, debug=args.debug)
     pprint(f"Providing information on product {product}...")
     baseconfig.info_product(product, repo, group)
 
@@ -2712,7 +2803,7 @@ def create_product(args):
     group = args.group
     overrides = handle_parameters(args.param, args.paramfile)
     plan = overrides['plan'] if 'plan' in overrides else None
-    config = Kconfig(client=args.client, debug=args.debug, region=args.region, zone=args.zone, namespace=args.namespace)
+    config = kconfig(client=args.client, debug=args.debug, region=args.region, zone=args.zone, namespace=args.namespace)
     pprint(f"Creating product {product}...")
     config.create_product(product, repo=repo, group=group, plan=plan, latest=latest, overrides=overrides)
 
@@ -2727,7 +2818,7 @@ def ssh_vm(args):
     identityfile = args.identityfile
     user = args.user
     vmport = args.port
-    baseconfig = Kbaseconfig(client=args.client, debug=args.debug, quiet=True)
+    baseconfig = kbaseconfig(client=args.client, debug=args.debug, quiet=True)
     name = [common.get_lastvm(baseconfig.client)] if not args.name else args.name
     tunnel = baseconfig.tunnel
     tunnelhost = baseconfig.tunnelhost
@@ -2767,7 +2858,7 @@ def ssh_vm(args):
                                         insecure=insecure, cmd=cmd, X=X, Y=Y, D=D, debug=args.debug, vmport=vmport,
                                         identityfile=identityfile)
     if sshcommand is None:
-        config = Kconfig(client=args.client, debug=args.debug, region=args.region, zone=args.zone,
+        config = kconfig(client=args.client, debug=args.debug, region=args.region, zone=args.zone,
                          namespace=args.namespace)
         k = config.k
         u, ip, vmport = common._ssh_credentials(k, name)
@@ -2807,7 +2898,7 @@ def scp_vm(args):
     destination = args.destination[0]
     user = args.user
     vmport = args.port
-    baseconfig = Kbaseconfig(client=args.client, debug=args.debug, quiet=True)
+    baseconfig = kbaseconfig(client=args.client, debug=args.debug, quiet=True)
     tunnel = baseconfig.tunnel
     tunnelhost = baseconfig.tunnelhost
     tunneluser = baseconfig.tunneluser
@@ -2850,7 +2941,7 @@ def scp_vm(args):
                                         tunnelport=tunnelport, tunneluser=tunneluser, debug=args.debug,
                                         download=download, vmport=vmport, insecure=insecure, identityfile=identityfile)
     if scpcommand is None:
-        config = Kconfig(client=args.client, debug=args.debug, region=args.region, zone=args.zone,
+        config = kconfig(client=args.client, debug=args.debug, region=args.region, zone=args.zone,
                          namespace=args.namespace)
         k = config.k
         u, ip, vmport = common._ssh_credentials(k, name)
@@ -2885,7 +2976,7 @@ def create_network(args):
     nodhcp = args.nodhcp
     domain = overrides.get('domain', args.domain)
     plan = overrides.get('plan', 'kvirt')
-    config = Kconfig(client=args.client, debug=args.debug, region=args.region, zone=args.zone, namespace=args.namespace)
+    config = kconfig(client=args.client, debug=args.debug, region=args.region, zone=args.zone, namespace=args.namespace)
     k = config.k
     if name is None:
         error("Missing Network")
@@ -2905,7 +2996,7 @@ def delete_network(args):
     if not yes and not yes_top:
         common.confirm("Are you sure?")
     names = args.names
-    config = Kconfig(client=args.client, debug=args.debug, region=args.region, zone=args.zone, namespace=args.namespace)
+    config = kconfig(client=args.client, debug=args.debug, region=args.region, zone=args.zone, namespace=args.namespace)
     k = config.k
     for name in names:
         result = k.delete_network(name=name)
@@ -2920,7 +3011,7 @@ def update_network(args):
     dhcp = False if 'nodhcp' in args else overrides.get('dhcp')
     domain = overrides.get('domain', args.domain)
     plan = overrides.get('plan')
-    config = Kconfig(client=args.client, debug=args.debug, region=args.region, zone=args.zone, namespace=args.namespace)
+    config = kconfig(client=args.client, debug=args.debug, region=args.region, zone=args.zone, namespace=args.namespace)
     k = config.k
     result = k.update_network(name=name, dhcp=dhcp, nat=nat, domain=domain, overrides=overrides, plan=plan)
     common.handle_response(result, name, element='Network', action='updated')
@@ -2934,7 +3025,7 @@ def create_host_group(args):
     data['algorithm'] = args.algorithm
     data['members'] = args.members
     common.create_host(data)
-    baseconfig = Kbaseconfig(client=args.client, debug=args.debug, quiet=True)
+    baseconfig = kbaseconfig(client=args.client, debug=args.debug, quiet=True)
     if len(baseconfig.clients) == 1:
         baseconfig.set_defaults()
 
@@ -2951,7 +3042,7 @@ def create_host_kvm(args):
     data['url'] = args.url
     data['pool'] = args.pool
     common.create_host(data)
-    baseconfig = Kbaseconfig(client=args.client, debug=args.debug, quiet=True)
+    baseconfig = kbaseconfig(client=args.client, debug=args.debug, quiet=True)
     if len(baseconfig.clients) == 1:
         baseconfig.set_defaults()
 
@@ -2972,7 +3063,7 @@ def create_host_ovirt(args):
         data['pool'] = args.pool
     data['client'] = args.client
     common.create_host(data)
-    baseconfig = Kbaseconfig(client=args.client, debug=args.debug, quiet=True)
+    baseconfig = kbaseconfig(client=args.client, debug=args.debug, quiet=True)
     if len(baseconfig.clients) == 1:
         baseconfig.set_defaults()
 
@@ -2986,7 +3077,7 @@ def create_host_gcp(args):
     data['zone'] = args.zone
     data['_type'] = 'gcp'
     common.create_host(data)
-    baseconfig = Kbaseconfig(client=args.client, debug=args.debug, quiet=True)
+    baseconfig = kbaseconfig(client=args.client, debug=args.debug, quiet=True)
     if len(baseconfig.clients) == 1:
         baseconfig.set_defaults()
 
@@ -3001,7 +3092,7 @@ def create_host_aws(args):
     data['region'] = args.region
     data['keypair'] = args.keypair
     common.create_host(data)
-    baseconfig = Kbaseconfig(client=args.client, debug=args.debug, quiet=True)
+    baseconfig = kbaseconfig(client=args.client, debug=args.debug, quiet=True)
     if len(baseconfig.clients) == 1:
         baseconfig.set_defaults()
 
@@ -3018,7 +3109,7 @@ def create_host_ibm(args):
     data['access_key_id'] = args.access_key_id
     data['secret_access_key'] = args.access_key_secret
     common.create_host(data)
-    baseconfig = Kbaseconfig(client=args.client, debug=args.debug, quiet=True)
+    baseconfig = kbaseconfig(client=args.client, debug=args.debug, quiet=True)
     if len(baseconfig.clients) == 1:
         baseconfig.set_defaults()
 
@@ -3034,7 +3125,7 @@ def create_host_openstack(args):
     data['domain'] = args.domain
     data['auth_url'] = args.auth_url
     common.create_host(data)
-    baseconfig = Kbaseconfig(client=args.client, debug=args.debug, quiet=True)
+    baseconfig = kbaseconfig(client=args.client, debug=args.debug, quiet=True)
     if len(baseconfig.clients) == 1:
         baseconfig.set_defaults()
 
@@ -3057,7 +3148,7 @@ def create_host_kubevirt(args):
     if args.port is not None:
         data['port'] = args.port
     common.create_host(data)
-    baseconfig = Kbaseconfig(client=args.client, debug=args.debug, quiet=True)
+    baseconfig = kbaseconfig(client=args.client, debug=args.debug, quiet=True)
     if len(baseconfig.clients) == 1:
         baseconfig.set_defaults()
 
@@ -3075,7 +3166,7 @@ def create_host_vsphere(args):
     if args.pool is not None:
         data['pool'] = args.pool
     common.create_host(data)
-    baseconfig = Kbaseconfig(client=args.client, debug=args.debug, quiet=True)
+    baseconfig = kbaseconfig(client=args.client, debug=args.debug, quiet=True)
     if len(baseconfig.clients) == 1:
         baseconfig.set_defaults()
 
@@ -3086,8 +3177,8 @@ def create_container(args):
     image = args.image
     profile = args.profile
     overrides = handle_parameters(args.param, args.paramfile)
-    config = Kconfig(client=args.client, debug=args.debug, region=args.region, zone=args.zone, namespace=args.namespace)
-    cont = Kcontainerconfig(config, client=args.containerclient).cont
+    config = kconfig(client=args.client, debug=args.debug, region=args.region, zone=args.zone, namespace=args.namespace)
+    cont = kcontainerconfig(config, client=args.containerclient).cont
     containerprofiles = {k: v for k, v in config.profiles.items() if 'type' in v and v['type'] == 'container'}
     if name is None:
         name = nameutils.get_random_name()
@@ -3122,7 +3213,7 @@ def snapshotcreate_vm(args):
     """Create snapshot"""
     snapshot = args.snapshot
     name = args.name
-    config = Kconfig(client=args.client, debug=args.debug, region=args.region, zone=args.zone, namespace=args.namespace)
+    config = kconfig(client=args.client, debug=args.debug, region=args.region, zone=args.zone, namespace=args.namespace)
     k = config.k
     pprint(f"Creating snapshot of {name} named {snapshot}...")
     result = k.create_snapshot(snapshot, name)
@@ -3134,7 +3225,7 @@ def snapshotdelete_vm(args):
     """Delete snapshot"""
     snapshot = args.snapshot
     name = args.name
-    config = Kconfig(client=args.client, debug=args.debug, region=args.region, zone=args.zone, namespace=args.namespace)
+    config = kconfig(client=args.client, debug=args.debug, region=args.region, zone=args.zone, namespace=args.namespace)
     k = config.k
     pprint(f"Deleting snapshot {snapshot} of vm {name}...")
     result = k.delete_snapshot(snapshot, name)
@@ -3146,7 +3237,7 @@ def snapshotrevert_vm(args):
     """Revert snapshot of vm"""
     snapshot = args.snapshot
     name = args.name
-    config = Kconfig(client=args.client, debug=args.debug, region=args.region, zone=args.zone, namespace=args.namespace)
+    config = kconfig(client=args.client, debug=args.debug, region=args.region, zone=args.zone, namespace=args.namespace)
     k = config.k
     pprint(f"Reverting snapshot {snapshot} of vm {name}...")
     result = k.revert_snapshot(snapshot, name)
@@ -3157,7 +3248,7 @@ def snapshotrevert_vm(args):
 def snapshotlist_vm(args):
     """List snapshots of vm"""
     name = args.name
-    config = Kconfig(client=args.client, debug=args.debug, region=args.region, zone=args.zone, namespace=args.namespace)
+    config = kconfig(client=args.client, debug=args.debug, region=args.region, zone=args.zone, namespace=args.namespace)
     k = config.k
     pprint(f"Listing snapshots of {name}...")
     snapshots = k.list_snapshots(name)
@@ -3173,7 +3264,7 @@ def create_bucket(args):
     """Create bucket"""
     buckets = args.buckets
     public = args.public
-    config = Kconfig(client=args.client, debug=args.debug, region=args.region, zone=args.zone, namespace=args.namespace)
+    config = kconfig(client=args.client, debug=args.debug, region=args.region, zone=args.zone, namespace=args.namespace)
     k = config.k
     for bucket in buckets:
         pprint(f"Creating bucket {bucket}...")
@@ -3187,7 +3278,7 @@ def delete_bucket(args):
     if not yes and not yes_top:
         common.confirm("Are you sure?")
     buckets = args.buckets
-    config = Kconfig(client=args.client, debug=args.debug, region=args.region, zone=args.zone, namespace=args.namespace)
+    config = kconfig(client=args.client, debug=args.debug, region=args.region, zone=args.zone, namespace=args.namespace)
     k = config.k
     for bucket in buckets:
         pprint(f"Deleting bucket {bucket}...")
@@ -3197,13 +3288,13 @@ def delete_bucket(args):
 def list_bucket(args):
     """List buckets"""
     pprint("Listing buckets...")
-    config = Kconfig(client=args.client, debug=args.debug, region=args.region, zone=args.zone, namespace=args.namespace)
+    config = kconfig(client=args.client, debug=args.debug, region=args.region, zone=args.zone, namespace=args.namespace)
     k = config.k
     buckets = k.list_buckets()
     output = args.global_output or args.output
     if output is not None:
         _list_output(buckets, output)
-    bucketstable = PrettyTable(["Bucket"])
+    bucketstable = prettytable(["Bucket"])
     for bucket in sorted(buckets):
         bucketstable.add_row([bucket])
     bucketstable.align["Bucket"] = "l"
@@ -3214,13 +3305,13 @@ def list_bucketfiles(args):
     """List bucket files"""
     bucket = args.bucket
     pprint(f"Listing bucket files of bucket {bucket}...")
-    config = Kconfig(client=args.client, debug=args.debug, region=args.region, zone=args.zone, namespace=args.namespace)
+    config = kconfig(client=args.client, debug=args.debug, region=args.region, zone=args.zone, namespace=args.namespace)
     k = config.k
     bucketfiles = k.list_bucketfiles(bucket)
     output = args.global_output or args.output
     if output is not None:
         _list_output(bucketfiles, output)
-    bucketfilestable = PrettyTable(["BucketFiles"])
+    bucketfilestable = prettytable(["BucketFiles"])
     for bucketfile in sorted(bucketfiles):
         bucketfilestable.add_row([bucketfile])
     bucketfilestable.align["BucketFiles"] = "l"
@@ -3232,7 +3323,7 @@ def create_bucketfile(args):
     temp_url = args.temp
     public = args.public
     path = args.path
-    config = Kconfig(client=args.client, debug=args.debug, region=args.region, zone=args.zone, namespace=args.namespace)
+    config = kconfig(client=args.client, debug=args.debug, region=args.region, zone=args.zone, namespace=args.namespace)
     k = config.k
     pprint(f"Uploading file {path} to bucket {bucket}...")
     result = k.upload_to_bucket(bucket, path, temp_url=temp_url, public=public)
@@ -3247,7 +3338,7 @@ def delete_bucketfile(args):
         common.confirm("Are you sure?")
     bucket = args.bucket
     path = args.path
-    config = Kconfig(client=args.client, debug=args.debug, region=args.region, zone=args.zone, namespace=args.namespace)
+    config = kconfig(client=args.client, debug=args.debug, region=args.region, zone=args.zone, namespace=args.namespace)
     k = config.k
     pprint(f"Deleting file {path} to bucket {bucket}...")
     k.delete_from_bucket(bucket, path)
@@ -3256,7 +3347,7 @@ def delete_bucketfile(args):
 def download_bucketfile(args):
     bucket = args.bucket
     path = args.path
-    config = Kconfig(client=args.client, debug=args.debug, region=args.region, zone=args.zone, namespace=args.namespace)
+    config = kconfig(client=args.client, debug=args.debug, region=args.region, zone=args.zone, namespace=args.namespace)
     k = config.k
     pprint(f"Downloading file {path} from bucket {bucket}...")
     k.download_from_bucket(bucket, path)
@@ -3266,7 +3357,7 @@ def info_baremetal_host(args):
     """Report info about host"""
     overrides = common.get_overrides(param=args.param)
     full = overrides.get('full', args.full)
-    baseconfig = Kbaseconfig(client=args.client, debug=args.debug, offline=True)
+    baseconfig = kbaseconfig(client=args.client, debug=args.debug, offline=True)
     baremetal_hosts = overrides.get('baremetal_hosts', [])
     bmc_url = overrides.get('bmc_url') or overrides.get('url')
     bmc_model = overrides.get('bmc_model') or overrides.get('model') or baseconfig.bmc_model or 'dell'
@@ -3289,7 +3380,7 @@ def info_baremetal_host(args):
 def info_host(args):
     """Report info about host"""
     client = args.host or args.client
-    config = Kconfig(client=client, debug=args.debug, region=args.region, zone=args.zone, namespace=args.namespace)
+    config = kconfig(client=client, debug=args.debug, region=args.region, zone=args.zone, namespace=args.namespace)
     k = config.k
     common.pretty_print(k.info_host(), width=100)
 
@@ -3297,7 +3388,7 @@ def info_host(args):
 def switch_host(args):
     """Handle host"""
     host = args.name
-    baseconfig = Kbaseconfig(client=args.client, debug=args.debug)
+    baseconfig = kbaseconfig(client=args.client, debug=args.debug)
     result = baseconfig.switch_host(host)
     if result['result'] == 'success':
         sys.exit(0)
@@ -3333,9 +3424,9 @@ def switch_kubeconfig(args):
 
 def list_keyword(args):
     """List keywords"""
-    baseconfig = Kbaseconfig(client=args.client, debug=args.debug)
+    baseconfig = kbaseconfig(client=args.client, debug=args.debug)
     default = baseconfig.default
-    keywordstable = PrettyTable(["Keyword", "Default Value", "Current Value"])
+    keywordstable = prettytable(["Keyword", "Default Value", "Current Value"])
     keywordstable.align["Client"] = "l"
     keywords = baseconfig.list_keywords()
     output = args.global_output or args.output
@@ -3375,13 +3466,13 @@ def create_workflow(args):
         else:
             hostname = target
         if '.' not in hostname and ':' not in hostname:
-            config = Kconfig(client=args.client, debug=args.debug, region=args.region, zone=args.zone,
+            config = kconfig(client=args.client, debug=args.debug, region=args.region, zone=args.zone,
                              namespace=args.namespace)
             vmuser, vmip, vmport = _ssh_credentials(config.k, hostname)
             if vmip is not None:
                 overrides['target'] = {'user': user or vmuser, 'port': vmport, 'ip': vmip, 'hostname': hostname}
     if config is None:
-        config = Kbaseconfig(client=args.client, debug=args.debug)
+        config = kbaseconfig(client=args.client, debug=args.debug)
     run = not args.render
     result = config.create_workflow(workflow, overrides, outputdir=outputdir, run=run)
     sys.exit(0 if result['result'] == 'success' else 1)
@@ -3391,7 +3482,7 @@ def create_securitygroup(args):
     """Create securitygroup"""
     securitygroup = args.securitygroup
     overrides = handle_parameters(args.param, args.paramfile)
-    config = Kconfig(client=args.client, debug=args.debug, region=args.region, zone=args.zone, namespace=args.namespace)
+    config = kconfig(client=args.client, debug=args.debug, region=args.region, zone=args.zone, namespace=args.namespace)
     k = config.k
     pprint(f"Creating securitygroup {securitygroup}...")
     k.create_security_group(securitygroup, overrides)
@@ -3404,7 +3495,7 @@ def delete_securitygroup(args):
     if not yes and not yes_top:
         common.confirm("Are you sure?")
     securitygroups = args.securitygroups
-    config = Kconfig(client=args.client, debug=args.debug, region=args.region, zone=args.zone, namespace=args.namespace)
+    config = kconfig(client=args.client, debug=args.debug, region=args.region, zone=args.zone, namespace=args.namespace)
     k = config.k
     for securitygroup in securitygroups:
         pprint(f"Deleting securitygroup {securitygroup}...")
@@ -3414,13 +3505,13 @@ def delete_securitygroup(args):
 def list_securitygroups(args):
     """List securitygroup"""
     pprint("Listing securitygroups...")
-    config = Kconfig(client=args.client, debug=args.debug, region=args.region, zone=args.zone, namespace=args.namespace)
+    config = kconfig(client=args.client, debug=args.debug, region=args.region, zone=args.zone, namespace=args.namespace)
     k = config.k
     securitygroups = k.list_security_groups(network=args.network)
     output = args.global_output or args.output
     if output is not None:
         _list_output(securitygroups, output)
-    securitygroupstable = PrettyTable(["Securitygroup"])
+    securitygroupstable = prettytable(["Securitygroup"])
     for securitygroup in sorted(securitygroups):
         securitygroupstable.add_row([securitygroup])
     securitygroupstable.align["Securitygroup"] = "l"
@@ -3428,12 +3519,12 @@ def list_securitygroups(args):
 
 
 def create_ksushy_service(args):
-    baseconfig = Kbaseconfig(client=args.client, debug=args.debug, offline=True)
+    baseconfig = kbaseconfig(client=args.client, debug=args.debug, offline=True)
     baseconfig.deploy_ksushy_service(ipv6=args.ipv6, ssl=args.ssl, user=args.user, password=args.password)
 
 
 def create_web_service(args):
-    baseconfig = Kbaseconfig(client=args.client, debug=args.debug, offline=True)
+    baseconfig = kbaseconfig(client=args.client, debug=args.debug, offline=True)
     baseconfig.deploy_web_service(ipv6=args.ipv6, ssl=args.ssl)
 
 
@@ -3441,6 +3532,8 @@ def cli():
     """
 
     """
+    if '_ARGCOMPLETE' in os.environ and cached_completion():
+        os._exit(0)
     parent_parser = argparse.ArgumentParser(add_help=False)
     parent_parser.add_argument('-P', '--param', action='append',
                                help='specify parameter or keyword for rendering (multiple can be specified)',
@@ -5063,6 +5156,9 @@ def cli():
     planupdate_parser.add_argument('-p', '--path', help='Path where to download plans. Defaults to plan',
                                    metavar='PATH')
     planupdate_parser.add_argument('-c', '--container', action='store_true', help='Handle container')
+    planupdate_parser.add_argument('--dry', action='store_true',
+                                   help='Only report the changes between the plan and existing vms. Exits with 1 when '
+                                   'any is found')
     planupdate_parser.add_argument('-f', '--inputfile', help='Input Plan file')
     planupdate_parser.add_argument('plan', metavar='PLAN')
     planupdate_parser.set_defaults(func=update_plan)
@@ -5087,6 +5183,8 @@ def cli():
     subparsers.add_parser('version', parents=[version_parser], description=version_desc, help=version_desc,
                           epilog=version_epilog, formatter_class=rawhelp)
 
+    if '_ARGCOMPLETE' in os.environ:
+        save_completion_tree(parser)
     argcomplete.autocomplete(parser)
     if len(sys.argv) == 1 or (len(sys.argv) == 3 and sys.argv[1] == '-C'):
         parser.print_help()
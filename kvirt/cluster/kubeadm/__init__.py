@@ -34,25 +34,25 @@ def scale(config, plandir, cluster, overrides):
             apicmd = "grep API_IP= /root/bootstrap.sh"
             apicmd = ssh(first_ctlplane_vm, ip=first_ctlplane_ip, user='root', tunnel=config.tunnel,
                          tunnelhost=config.tunnelhost, tunnelport=config.tunnelport, tunneluser=config.tunneluser,
-                         insecure=True, cmd=apicmd, vmport=first_ctlplane_vmport)
+                         insecure=True, cmd=apicmd, vmport=first_ctlplane_vmport, persist=config.sshpersist)
             data['api_ip'] = os.popen(apicmd).read().strip().split('=')[1]
         domain = overrides.get('domain')
         if domain is None:
             domaincmd = "grep DOMAIN= /root/bootstrap.sh"
             domaincmd = ssh(first_ctlplane_vm, ip=first_ctlplane_ip, user='root', tunnel=config.tunnel,
                             tunnelhost=config.tunnelhost, tunnelport=config.tunnelport, tunneluser=config.tunneluser,
-                            insecure=True, cmd=domaincmd, vmport=first_ctlplane_vmport)
+                            insecure=True, cmd=domaincmd, vmport=first_ctlplane_vmport, persist=config.sshpersist)
             data['domain'] = os.popen(domaincmd).read().strip().split('=')[1]
         os.mkdir(clusterdir)
         tokencmd = "grep TOKEN= /root/bootstrap.sh"
         tokencmd = ssh(first_ctlplane_vm, ip=first_ctlplane_ip, user='root', tunnel=config.tunnel,
                        tunnelhost=config.tunnelhost, tunnelport=config.tunnelport, tunneluser=config.tunneluser,
-                       insecure=True, cmd=tokencmd, vmport=first_ctlplane_vmport)
+                       insecure=True, cmd=tokencmd, vmport=first_ctlplane_vmport, persist=config.sshpersist)
         data['token'] = os.popen(tokencmd).read().strip().split('=')[1]
         certkeycmd = "grep CERTKEY= /root/bootstrap.sh"
         certkeycmd = ssh(first_ctlplane_vm, ip=first_ctlplane_ip, user='root', tunnel=config.tunnel,
                          tunnelhost=config.tunnelhost, tunnelport=config.tunnelport, tunneluser=config.tunneluser,
-                         insecure=True, cmd=certkeycmd, vmport=first_ctlplane_vmport)
+                         insecure=True, cmd=certkeycmd, vmport=first_ctlplane_vmport, persist=config.sshpersist)
         data['cert_key'] = os.popen(certkeycmd).read().strip().split('=')[1]
     if os.path.exists(f"{clusterdir}/kcli_parameters.yml"):
         with open(f"{clusterdir}/kcli_parameters.yml", 'r') as install:
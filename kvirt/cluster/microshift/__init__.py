@@ -81,9 +81,9 @@ def create(config, plandir, cluster, overrides, dnsconfig=None):
     if result['result'] != 'success':
         return result
     KUBECONFIG = '/root/kubeconfig'
+    config.wait_vms([{'name': f"{cluster}-{index}"} for index in range(nodes)])
     for index in range(nodes):
         name = f"{cluster}-{index}"
-        config.wait_finish(name)
         finishfiles = [{'origin': KUBECONFIG, 'path': f"~/.kcli/clusters/{cluster}/auth/kubeconfig.{index}"}]
         config.handle_finishfiles(name, finishfiles)
         ip = config.k.info(name).get('ip')
@@ -860,7 +860,7 @@ def create(config, plandir, cluster, overrides, dnsconfig=None):
         cacmd = "cat /opt/registry/certs/domain.crt"
         cacmd = ssh(disconnected_vm, ip=disconnected_ip, user='root', tunnel=config.tunnel,
                     tunnelhost=config.tunnelhost, tunnelport=config.tunnelport, tunneluser=config.tunneluser,
-                    insecure=True, cmd=cacmd, vmport=disconnected_vmport)
+                    insecure=True, cmd=cacmd, vmport=disconnected_vmport, persist=config.sshpersist)
         disconnected_ca = os.popen(cacmd).read().strip()
         if data.get('ca') is not None:
             data['ca'] += disconnected_ca
@@ -869,7 +869,7 @@ def create(config, plandir, cluster, overrides, dnsconfig=None):
         urlcmd = "cat /root/url.txt"
         urlcmd = ssh(disconnected_vm, ip=disconnected_ip, user='root', tunnel=config.tunnel,
                      tunnelhost=config.tunnelhost, tunnelport=config.tunnelport, tunneluser=config.tunneluser,
-                     insecure=True, cmd=urlcmd, vmport=disconnected_vmport)
+                     insecure=True, cmd=urlcmd, vmport=disconnected_vmport, persist=config.sshpersist)
         disconnected_url = os.popen(urlcmd).read().strip()
         overrides['disconnected_url'] = disconnected_url
         data['disconnected_url'] = disconnected_url
@@ -880,7 +880,7 @@ def create(config, plandir, cluster, overrides, dnsconfig=None):
         versioncmd = "cat /root/version.txt"
         versioncmd = ssh(disconnected_vm, ip=disconnected_ip, user='root', tunnel=config.tunnel,
                          tunnelhost=config.tunnelhost, tunnelport=config.tunnelport, tunneluser=config.tunneluser,
-                         insecure=True, cmd=versioncmd, vmport=disconnected_vmport)
+                         insecure=True, cmd=versioncmd, vmport=disconnected_vmport, persist=config.sshpersist)
         disconnected_version = os.popen(versioncmd).read().strip()
         if disconnected_operators or disconnected_certified_operators or disconnected_community_operators or\
            disconnected_marketplace_operators:
@@ -889,7 +889,7 @@ def create(config, plandir, cluster, overrides, dnsconfig=None):
             scpcmd = scp(disconnected_vm, ip=disconnected_ip, user='root', source=source,
                          destination=destination, tunnel=config.tunnel, tunnelhost=config.tunnelhost,
                          tunnelport=config.tunnelport, tunneluser=config.tunneluser, download=True, insecure=True,
-                         vmport=disconnected_vmport)
+                         vmport=disconnected_vmport, persist=config.sshpersist)
             os.system(scpcmd)
         if disconnected_operators:
             source = "/root/catalogSource-redhat-operator-index.yaml"
@@ -897,7 +897,7 @@ def create(config, plandir, cluster, overrides, dnsconfig=None):
             scpcmd = scp(disconnected_vm, ip=disconnected_ip, user='root', source=source,
                          destination=destination, tunnel=config.tunnel, tunnelhost=config.tunnelhost,
                          tunnelport=config.tunnelport, tunneluser=config.tunneluser, download=True, insecure=True,
-                         vmport=disconnected_vmport)
+                         vmport=disconnected_vmport, persist=config.sshpersist)
             os.system(scpcmd)
         if disconnected_certified_operators:
             source = "/root/catalogSource-certified-operator-index.yaml"
@@ -905,7 +905,7 @@ def create(config, plandir, cluster, overrides, dnsconfig=None):
             scpcmd = scp(disconnected_vm, ip=disconnected_ip, user='root', source=source,
                          destination=destination, tunnel=config.tunnel, tunnelhost=config.tunnelhost,
                          tunnelport=config.tunnelport, tunneluser=config.tunneluser, download=True, insecure=True,
-                         vmport=disconnected_vmport)
+                         vmport=disconnected_vmport, persist=config.sshpersist)
             os.system(scpcmd)
         if disconnected_community_operators:
             source = "/root/catalogSource-community-operator-index.yaml"
@@ -913,7 +913,7 @@ def create(config, plandir, cluster, overrides, dnsconfig=None):
             scpcmd = scp(disconnected_vm, ip=disconnected_ip, user='root', source=source,
                          destination=destination, tunnel=config.tunnel, tunnelhost=config.tunnelhost,
                          tunnelport=config.tunnelport, tunneluser=config.tunneluser, download=True, insecure=True,
-                         vmport=disconnected_vmport)
+                         vmport=disconnected_vmport, persist=config.sshpersist)
             os.system(scpcmd)
         if disconnected_marketplace_operators:
             source = "/root/catalogSource-redhat-marketplace-index.yaml"
@@ -921,7 +921,7 @@ def create(config, plandir, cluster, overrides, dnsconfig=None):
             scpcmd = scp(disconnected_vm, ip=disconnected_ip, user='root', source=source,
                          destination=destination, tunnel=config.tunnel, tunnelhost=config.tunnelhost,
                          tunnelport=config.tunnelport, tunneluser=config.tunneluser, download=True, insecure=True,
-                         vmport=disconnected_vmport)
+                         vmport=disconnected_vmport, persist=config.sshpersist)
             os.system(scpcmd)
         os.environ['OPENSHIFT_INSTALL_RELEASE_IMAGE_OVERRIDE'] = disconnected_version
         pprint(f"Setting OPENSHIFT_INSTALL_RELEASE_IMAGE_OVERRIDE to {disconnected_version}")
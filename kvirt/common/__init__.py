@@ -2,18 +2,21 @@
 # coding=utf-8
 
 from ast import literal_eval
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 from hashlib import sha256
 from kvirt.jinjafilters import jinjafilters
-from kvirt.defaults import UBUNTUS, SSH_PUB_LOCATIONS
+from kvirt.defaults import UBUNTUS, SSH_PUB_LOCATIONS, SSHPERSIST
+from kvirt import httpcache
 from kvirt.kfish import Redfish
+from kvirt.providers.cache import Kcache
 from kvirt import version
 from ipaddress import ip_address
 from random import randint
 import base64
 from glob import glob
 from grp import getgrgid
-from jinja2 import Environment, FileSystemLoader
+from jinja2 import Environment, FileSystemLoader, FileSystemBytecodeCache
 from jinja2 import StrictUndefined as undefined
 from jinja2.exceptions import TemplateSyntaxError, TemplateError, TemplateNotFound
 import re
@@ -24,6 +27,7 @@ from urllib.request import urlretrieve, urlopen, Request
 import json
 import os
 import sys
+import threading
 from subprocess import call
 from shutil import copy2, move, which
 from tempfile import TemporaryDirectory
@@ -368,6 +372,32 @@ def cloudinit(name, keys=[], cmds=[], nets=[], gateway=None, dns=None, domain=No
     return userdata.strip(), metadata, netdata
 
 
+JINJA_ENVS = {}
+JINJA_LOCK = threading.Lock()
+
+
+def jinja_env(basedir, undefined=undefined, trim=True):
+    """
+    Returns a shared environment for templates of basedir, so that each template gets parsed once per process
+    and its bytecode kept under ~/.kcli/cache/jinja across runs. Both get refreshed when the source changes
+    """
+    key = (os.path.abspath(basedir), undefined, trim)
+    with JINJA_LOCK:
+        env = JINJA_ENVS.get(key)
+        if env is None:
+            bytecodedir = os.path.expanduser('~/.kcli/cache/jinja')
+            try:
+                os.makedirs(bytecodedir, exist_ok=True)
+                bytecode_cache = FileSystemBytecodeCache(bytecodedir) if os.access(bytecodedir, os.W_OK) else None
+            except OSError:
+                bytecode_cache = None
+            env = Environment(loader=FileSystemLoader(basedir), undefined=undefined, extensions=['jinja2.ext.do'],
+                              trim_blocks=trim, lstrip_blocks=trim, bytecode_cache=bytecode_cache)
+            env.filters.update(jinjafilters.jinjafilters)
+            JINJA_ENVS[key] = env
+    return env
+
+
 def process_files(files=[], overrides={}, remediate=False):
     data = [] if remediate else ''
     todelete = []
@@ -429,10 +459,7 @@ def process_files(files=[], overrides={}, remediate=False):
             origin = os.path.expanduser(origin)
             if overrides and render:
                 basedir = os.path.dirname(origin) if os.path.dirname(origin) != '' else '.'
-                env = Environment(loader=FileSystemLoader(basedir), undefined=undefined, extensions=['jinja2.ext.do'],
-                                  trim_blocks=True, lstrip_blocks=True)
-                for jinjafilter in jinjafilters.jinjafilters:
-                    env.filters[jinjafilter] = jinjafilters.jinjafilters[jinjafilter]
+                env = jinja_env(basedir)
                 try:
                     templ = env.get_template(os.path.basename(origin))
                     fileentries = templ.render(file_overrides)
@@ -508,9 +535,7 @@ def process_ignition_files(files=[], overrides={}):
                 continue
             elif overrides and render:
                 basedir = os.path.dirname(origin) if os.path.dirname(origin) != '' else '.'
-                env = Environment(loader=FileSystemLoader(basedir), undefined=undefined, extensions=['jinja2.ext.do'])
-                for jinjafilter in jinjafilters.jinjafilters:
-                    env.filters[jinjafilter] = jinjafilters.jinjafilters[jinjafilter]
+                env = jinja_env(basedir, trim=False)
                 try:
                     templ = env.get_template(os.path.basename(origin))
                     fileentries = templ.render(overrides)
@@ -876,9 +901,25 @@ def print_info(yamlinfo, output='plain', fields=[], values=False, pretty=True):
         return result.rstrip()
 
 
+def ssh_control(user, host, port=22, tunnelhost=None, tunnelport=22, tunneluser='root', persist=SSHPERSIST):
+    """
+    Returns the options making ssh and scp commands against the same host and tunnel share a single master connection,
+    which goes away after persist idle seconds
+    """
+    if not persist or host in ['localhost', '127.0.0.1']:
+        return ''
+    controldir = os.path.expanduser('~/.kcli/ssh')
+    try:
+        os.makedirs(controldir, mode=0o700, exist_ok=True)
+    except OSError:
+        return ''
+    key = sha256(f"{user}@{host}:{port}/{tunneluser}@{tunnelhost}:{tunnelport}".encode()).hexdigest()[:16]
+    return f"-o ControlMaster=auto -o ControlPath={controldir}/{key} -o ControlPersist={persist}"
+
+
 def ssh(name, ip='', user=None, local=None, remote=None, tunnel=False, tunnelhost=None, tunnelport=22,
         tunneluser='root', insecure=False, cmd=None, X=False, Y=False, debug=False, D=None, vmport=None,
-        identityfile=None, password=True):
+        identityfile=None, password=True, tty=False, persist=0):
     if ip == '':
         return None
     else:
@@ -897,6 +938,8 @@ def ssh(name, ip='', user=None, local=None, remote=None, tunnel=False, tunnelhos
             sshcommand = f"-X {sshcommand}"
         if Y:
             sshcommand = f"-Y {sshcommand}"
+        if tty:
+            sshcommand = f"-tt {sshcommand}"
         if cmd:
             sshcommand = f'{sshcommand} "{cmd}"'
         if tunnelhost is not None and tunnelhost not in ['localhost', '127.0.0.1'] and tunnel and\
@@ -911,6 +954,11 @@ def ssh(name, ip='', user=None, local=None, remote=None, tunnel=False, tunnelhos
             sshcommand = f"-o ProxyCommand='ssh {tunnelcommand}' {sshcommand}"
             if ':' in ip:
                 sshcommand = sshcommand.replace(ip, f'[{ip}]')
+        if local is None and remote is None and D is None:
+            tunnelargs = [tunnelhost, tunnelport, tunneluser] if tunnel else [None, 22, 'root']
+            control = ssh_control(user, ip, vmport or 22, *tunnelargs, persist=persist)
+            if control != '':
+                sshcommand = f"{control} {sshcommand}"
         if local is not None:
             sshcommand = f"-L {local} {sshcommand}"
         if remote is not None:
@@ -928,7 +976,8 @@ def ssh(name, ip='', user=None, local=None, remote=None, tunnel=False, tunnelhos
 
 
 def scp(name, ip='', user=None, source=None, destination=None, recursive=None, tunnel=False, tunnelhost=None,
-        tunnelport=22, tunneluser='root', debug=False, download=False, vmport=None, insecure=False, identityfile=None):
+        tunnelport=22, tunneluser='root', debug=False, download=False, vmport=None, insecure=False, identityfile=None,
+        persist=0):
     if ip == '':
         print("No ip found. Cannot scp...")
     else:
@@ -941,6 +990,10 @@ def scp(name, ip='', user=None, source=None, destination=None, recursive=None, t
             arguments += f"-o ProxyCommand='ssh -qp {tunnelport} -W {h}:%p {tunneluser}@{tunnelhost}'"
         if insecure:
             arguments += " -o LogLevel=quiet -o StrictHostKeyChecking=no -o UserKnownHostsFile=/dev/null"
+        tunnelargs = [tunnelhost, tunnelport, tunneluser] if tunnel else [None, 22, 'root']
+        control = ssh_control(user, ip.strip('[]'), vmport or 22, *tunnelargs, persist=persist)
+        if control != '':
+            arguments += f" {control}"
         scpcommand = 'scp -q'
         if identityfile is None:
             publickeyfile = get_ssh_pub_key()
@@ -1205,24 +1258,22 @@ def get_latest_fcos(url, _type='kvm', region=None):
     keys = {'ovirt': 'openstack', 'kubevirt': 'openstack', 'kvm': 'qemu', 'vsphere': 'vmware'}
     key = keys.get(_type, _type)
     _format = 'ova' if _type == 'vsphere' else 'qcow2.xz'
-    with urlopen(url) as u:
-        data = json.loads(u.read().decode())
-        if _type == 'aws':
-            return data['architectures']['x86_64']['images']['aws']['regions'][region]['image']
-        elif _type == 'gcp':
-            return data['architectures']['x86_64']['images']['gcp']['name']
-        else:
-            return data['architectures']['x86_64']['artifacts'][key]["formats"][_format]['disk']['location']
+    data = httpcache.fetch_json(url, ttl=6 * httpcache.HOUR)
+    if _type == 'aws':
+        return data['architectures']['x86_64']['images']['aws']['regions'][region]['image']
+    elif _type == 'gcp':
+        return data['architectures']['x86_64']['images']['gcp']['name']
+    else:
+        return data['architectures']['x86_64']['artifacts'][key]["formats"][_format]['disk']['location']
 
 
 def get_latest_fcos_metal(url):
-    with urlopen(url) as u:
-        data = json.loads(u.read().decode())
-        formats = data['architectures']['x86_64']['artifacts']['metal']['formats']
-        kernel = formats['pxe']['kernel']['location']
-        initrd = formats['pxe']['initramfs']['location']
-        metal = formats['raw.xz']['disk']['location']
-        return kernel, initrd, metal
+    data = httpcache.fetch_json(url, ttl=6 * httpcache.HOUR)
+    formats = data['architectures']['x86_64']['artifacts']['metal']['formats']
+    kernel = formats['pxe']['kernel']['location']
+    initrd = formats['pxe']['initramfs']['location']
+    metal = formats['raw.xz']['disk']['location']
+    return kernel, initrd, metal
 
 
 def get_latest_rhcos(url, _type='kvm', arch='x86_64'):
@@ -1244,22 +1295,21 @@ def get_commit_rhcos(commitid, _type='kvm', region=None):
     keys = {'ovirt': 'openstack', 'kubevirt': 'openstack', 'kvm': 'qemu', 'vsphere': 'vmware', 'ibm': 'ibmcloud'}
     key = keys.get(_type, _type)
     buildurl = f"https://raw.githubusercontent.com/openshift/installer/{commitid}/data/data/rhcos.json"
-    with urlopen(buildurl) as b:
-        data = json.loads(b.read().decode())
-        if _type == 'aws':
-            return data['amis'][region]['hvm']
-        elif _type == 'gcp':
-            return data['gcp']['image']
-        else:
-            baseuri = data['baseURI']
-            path = f"{baseuri}{data['images'][key]['path']}"
-            return path
+    data = httpcache.fetch_json(buildurl, ttl=30 * httpcache.DAY)
+    if _type == 'aws':
+        return data['amis'][region]['hvm']
+    elif _type == 'gcp':
+        return data['gcp']['image']
+    else:
+        baseuri = data['baseURI']
+        path = f"{baseuri}{data['images'][key]['path']}"
+        return path
 
 
 def get_installer_rhcos(_type='kvm', region=None, arch='x86_64'):
     keys = {'ovirt': 'openstack', 'kubevirt': 'openstack', 'kvm': 'qemu', 'vsphere': 'vmware', 'ibm': 'ibmcloud'}
     key = keys.get(_type, _type)
-    INSTALLER_COREOS = os.popen('openshift-install coreos print-stream-json 2>/dev/null').read()
+    INSTALLER_COREOS = httpcache.command('openshift-install coreos print-stream-json 2>/dev/null', 'openshift-install')
     data = json.loads(INSTALLER_COREOS)
     if _type == 'aws':
         return data['architectures'][arch]['images']['aws']['regions'][region]['image']
@@ -1272,17 +1322,16 @@ def get_installer_rhcos(_type='kvm', region=None, arch='x86_64'):
 
 def get_commit_rhcos_metal(commitid):
     buildurl = f"https://raw.githubusercontent.com/openshift/installer/{commitid}/data/data/rhcos.json"
-    with urlopen(buildurl) as b:
-        data = json.loads(b.read().decode())
-        baseuri = data['baseURI']
-        kernel = f"{baseuri}{data['images']['kernel']['path']}"
-        initrd = f"{baseuri}{data['images']['initramfs']['path']}"
-        metal = f"{baseuri}{data['images']['metal']['path']}"
-        return kernel, initrd, metal
+    data = httpcache.fetch_json(buildurl, ttl=30 * httpcache.DAY)
+    baseuri = data['baseURI']
+    kernel = f"{baseuri}{data['images']['kernel']['path']}"
+    initrd = f"{baseuri}{data['images']['initramfs']['path']}"
+    metal = f"{baseuri}{data['images']['metal']['path']}"
+    return kernel, initrd, metal
 
 
 def get_installer_rhcos_metal():
-    INSTALLER_COREOS = os.popen('openshift-install coreos print-stream-json 2>/dev/null').read()
+    INSTALLER_COREOS = httpcache.command('openshift-install coreos print-stream-json 2>/dev/null', 'openshift-install')
     data = json.loads(INSTALLER_COREOS)
     base = data['architectures']['x86_64']['artifacts']['metal']['formats']['pxe']
     kernel = base['kernel']['location']
@@ -1296,32 +1345,33 @@ def get_installer_iso():
     if which('openshift-install') is None:
         error("Couldnt find openshift-install in your path")
         sys.exit(0)
-    INSTALLER_COREOS = os.popen('openshift-install coreos print-stream-json 2>/dev/null').read()
+    INSTALLER_COREOS = httpcache.command('openshift-install coreos print-stream-json 2>/dev/null', 'openshift-install')
     data = json.loads(INSTALLER_COREOS)
     return data['architectures']['x86_64']['artifacts']['metal']['formats']['iso']['disk']['location']
 
 
 def get_installer_iso_sha():
-    INSTALLER_COREOS = os.popen('openshift-install coreos print-stream-json 2>/dev/null').read()
+    INSTALLER_COREOS = httpcache.command('openshift-install coreos print-stream-json 2>/dev/null', 'openshift-install')
     data = json.loads(INSTALLER_COREOS)
     return data['architectures']['x86_64']['artifacts']['metal']['formats']['iso']['disk']['sha256']
 
 
 def get_latest_rhcos_metal(url):
     buildurl = f'{url}/builds.json'
-    with urlopen(buildurl) as b:
-        data = json.loads(b.read().decode())
-        for build in data['builds']:
-            build = build['id']
-            kernel = f"{url}/{build}/x86_64/rhcos-{build}-installer-kernel-x86_64"
-            initrd = f"{url}/{build}/x86_64/rhcos-{build}-installer-initramfs.x86_64.img"
-            metal = f"{url}/{build}/x86_64/rhcos-{build}-metal.x86_64.raw.gz"
-            return kernel, initrd, metal
+    data = httpcache.fetch_json(buildurl)
+    for build in data['builds']:
+        build = build['id']
+        kernel = f"{url}/{build}/x86_64/rhcos-{build}-installer-kernel-x86_64"
+        initrd = f"{url}/{build}/x86_64/rhcos-{build}-installer-initramfs.x86_64.img"
+        metal = f"{url}/{build}/x86_64/rhcos-{build}-metal.x86_64.raw.gz"
+        return kernel, initrd, metal
 
 
 def get_latest_fedora(url='https://alt.fedoraproject.org/cloud'):
-    LINE = os.popen(f'curl -sLk {url} | grep download | grep cow | head -1').read()
-    return re.sub('.*href="(.*)">Download.*', r'\1', LINE).strip()
+    for line in httpcache.fetch(url, ttl=httpcache.DAY, insecure=True).splitlines():
+        if 'download' in line and 'cow' in line:
+            return re.sub('.*href="(.*)">Download.*', r'\1', line).strip()
+    return ''
 
 
 def find_ignition_files(role, cluster):
@@ -1938,9 +1988,10 @@ def generate_rhcos_iso(k, cluster, pool, version='latest', podman=False, install
         baseiso = f'rhcos-live.{arch}.iso'
         path = f'{version}/latest' if version != 'latest' else 'latest'
         liveiso = f"https://mirror.openshift.com/pub/openshift-v4/{arch}/dependencies/rhcos/{path}/{baseiso}"
-    kubevirt = 'kubevirt' in str(type(k))
-    openstack = 'openstack' in str(type(k))
-    vsphere = 'vsphere' in str(type(k))
+    provider = str(type(k.k if isinstance(k, Kcache) else k))
+    kubevirt = 'kubevirt' in provider
+    openstack = 'openstack' in provider
+    vsphere = 'vsphere' in provider
     name = f'{cluster}-iso' if kubevirt else f'{cluster}.iso'
     if name in [os.path.basename(iso) for iso in k.volumes(iso=True)]:
         warning(f"Deleting old iso {name}")
@@ -2122,7 +2173,8 @@ def get_rhcos_url_from_file(filename, _type='kvm'):
     return url
 
 
-def boot_baremetal_hosts(baremetal_hosts, iso_url, overrides={}, debug=False):
+def _baremetal_hosts(baremetal_hosts, overrides={}, debug=False):
+    hosts = []
     for index, host in enumerate(baremetal_hosts):
         bmc_url = host.get('url') or host.get('bmc_url')
         bmc_user = host.get('username') or host.get('user') or host.get('bmc_username') or host.get('bmc_user')\
@@ -2130,59 +2182,80 @@ def boot_baremetal_hosts(baremetal_hosts, iso_url, overrides={}, debug=False):
             or overrides.get('user') or overrides.get('username')
         bmc_password = host.get('password') or host.get('bmc_password') or overrides.get('bmc_password')
         bmc_model = host.get('model') or host.get('bmc_model') or overrides.get('bmc_model', 'dell')
-        bmc_reset = host.get('reset') or host.get('bmc_reset') or overrides.get('bmc_reset', False)
         if bmc_url is not None and bmc_user is not None and bmc_password is not None:
             red = Redfish(bmc_url, bmc_user, bmc_password, model=bmc_model, debug=debug)
+            msg = host['name'] if 'name' in host else f"with url {bmc_url}"
+            hosts.append((host, red, msg))
+        else:
+            warning(f"Skipping entry {index} because either bmc_url, bmc_user or bmc_password is not set")
+    return hosts
+
+
+def _run_baremetal_hosts(hosts, action):
+    if not hosts:
+        return []
+    with ThreadPoolExecutor(max_workers=min(len(hosts), 32)) as executor:
+        results = list(executor.map(lambda entry: action(*entry), hosts))
+    for host, red, msg in hosts:
+        red.close()
+    return results
+
+
+def boot_baremetal_hosts(baremetal_hosts, iso_url, overrides={}, debug=False):
+    def boot(host, red, msg):
+        bmc_reset = host.get('reset') or host.get('bmc_reset') or overrides.get('bmc_reset', False)
+        try:
             if bmc_reset:
+                pprint(f"Resetting bmc of Host {msg}")
                 red.reset()
-                sleep(240)
-            msg = host['name'] if 'name' in host else f"with url {bmc_url}"
+                if not red.wait_manager():
+                    warning(f"Timeout waiting for bmc of Host {msg} to come back")
             pprint(f"Booting Host {msg} with {iso_url}")
             if iso_url is not None:
-                try:
-                    red.set_iso(iso_url)
-                except Exception as e:
-                    msg = f"Hit {e} when plugging iso to host {msg}"
-                    error(msg)
-                    return {'result': 'failure', 'reason': msg}
+                red.set_iso(iso_url)
             else:
                 red.start()
-        else:
-            warning(f"Skipping entry {index} because either bmc_url, bmc_user or bmc_password is not set")
+        except Exception as e:
+            action = "plugging iso to" if iso_url is not None else "starting"
+            msg = f"Hit {e} when {action} host {msg}"
+            error(msg)
+            return msg
+    hosts = _baremetal_hosts(baremetal_hosts, overrides=overrides, debug=debug)
+    failures = [msg for msg in _run_baremetal_hosts(hosts, boot) if msg is not None]
+    if failures:
+        return {'result': 'failure', 'reason': '\n'.join(failures)}
     return {'result': 'success'}
 
 
 def info_baremetal_hosts(baremetal_hosts, overrides={}, debug=False, full=False):
-    for host in baremetal_hosts:
-        bmc_url = host.get('url') or host.get('bmc_url')
-        bmc_user = host.get('user') or host.get('bmc_user') or overrides.get('bmc_user')
-        bmc_password = host.get('password') or host.get('bmc_password') or overrides.get('bmc_password')
-        bmc_model = host.get('model') or host.get('bmc_model') or overrides.get('bmc_model', 'dell')
-        if bmc_url is not None and bmc_user is not None and bmc_password is not None:
-            red = Redfish(bmc_url, bmc_user, bmc_password, model=bmc_model, debug=debug)
-            msg = host['name'] if 'name' in host else f"with url {bmc_url}"
-            pprint(f"Reporting info on Host {msg}")
-            info = red.info()
-            if full:
-                pretty_print(info)
-            else:
-                keys = ['UUID', 'SERIAL', 'BOOT', 'HostName', 'IndicatorLED', 'Manufacturer', 'Model', 'MemorySummary',
-                        'PowerState', 'PartNumber', 'SKU', 'SystemType']
-                data = {key: info[key] for key in keys if key in info}
-                pretty_print(data)
+    def info(host, red, msg):
+        try:
+            return red.info()
+        except Exception as e:
+            return e
+    hosts = _baremetal_hosts(baremetal_hosts, overrides=overrides, debug=debug)
+    for (host, red, msg), info in zip(hosts, _run_baremetal_hosts(hosts, info)):
+        pprint(f"Reporting info on Host {msg}")
+        if isinstance(info, Exception):
+            error(f"Hit {info} when getting info of host {msg}")
+        elif full:
+            pretty_print(info)
+        else:
+            keys = ['UUID', 'SERIAL', 'BOOT', 'HostName', 'IndicatorLED', 'Manufacturer', 'Model', 'MemorySummary',
+                    'PowerState', 'PartNumber', 'SKU', 'SystemType']
+            data = {key: info[key] for key in keys if key in info}
+            pretty_print(data)
 
 
 def stop_baremetal_hosts(baremetal_hosts, overrides={}, debug=False):
-    for host in baremetal_hosts:
-        bmc_url = host.get('url') or host.get('bmc_url')
-        bmc_user = host.get('user') or host.get('bmc_user') or overrides.get('bmc_user')
-        bmc_password = host.get('password') or host.get('bmc_password') or overrides.get('bmc_password')
-        bmc_model = host.get('model') or host.get('bmc_model') or overrides.get('bmc_model', 'dell')
-        if bmc_url is not None and bmc_user is not None and bmc_password is not None:
-            red = Redfish(bmc_url, bmc_user, bmc_password, model=bmc_model, debug=debug)
-            msg = host['name'] if 'name' in host else f"with url {bmc_url}"
-            pprint(f"Stopping Host {msg}")
+    def stop(host, red, msg):
+        pprint(f"Stopping Host {msg}")
+        try:
             red.stop()
+        except Exception as e:
+            error(f"Hit {e} when stopping host {msg}")
+    hosts = _baremetal_hosts(baremetal_hosts, overrides=overrides, debug=debug)
+    _run_baremetal_hosts(hosts, stop)
 
 
 def valid_uuid(uuid):
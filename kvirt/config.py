@@ -5,15 +5,16 @@ Kvirt config class
 """
 
 import base64
+from copy import deepcopy
 from datetime import datetime
 from fnmatch import fnmatch
+from functools import wraps
 from ipaddress import ip_network
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
 from jinja2 import Environment, FileSystemLoader
-from jinja2 import StrictUndefined as undefined
 from jinja2.exceptions import TemplateSyntaxError, TemplateError, TemplateNotFound
 from kvirt.defaults import IMAGES, IMAGESCOMMANDS, OPENSHIFT_TAG
 from kvirt import ansibleutils
-from kvirt.jinjafilters import jinjafilters
 from kvirt import nameutils
 from kvirt import common
 from kvirt.common import error, pprint, success, warning, generate_rhcos_iso, pwd_path, container_mode
@@ -28,17 +29,19 @@ from kvirt.internalplans import haproxy as haproxyplan
 from kvirt.baseconfig import Kbaseconfig
 from kvirt.containerconfig import Kcontainerconfig
 from kvirt.miniconsole import Kminiconsole
+from kvirt.providers.cache import Kcache
 from getpass import getuser
 import glob
 import os
 import re
+import selectors
 import socket
 from shutil import rmtree, which
 import sys
-from subprocess import call, run, PIPE, STDOUT
+from subprocess import call, run, Popen, DEVNULL, PIPE, STDOUT
 from tempfile import TemporaryDirectory
 import threading
-from time import sleep
+from time import sleep, time
 import webbrowser
 import yaml
 
@@ -77,12 +80,31 @@ fi'"""
 cloudplatforms = ['aws', 'gcp', 'packet', 'ibmcloud']
 
 
+def volumes_inventory(func):
+    """Share a single image/volume inventory of the provider for the whole call, nested calls included"""
+    @wraps(func)
+    def wrapper(self, *args, **kwargs):
+        k = self.k
+        owner = k is not None and hasattr(k, 'cache_volumes') and k.volumes_cache is None
+        if owner:
+            k.cache_volumes()
+        try:
+            return func(self, *args, **kwargs)
+        finally:
+            if owner:
+                k.cache_volumes(enabled=False)
+    return wrapper
+
+
 class Kconfig(Kbaseconfig):
     """
 
     """
-    def __init__(self, client=None, debug=False, quiet=False, region=None, zone=None, namespace=None, offline=False):
+    def __init__(self, client=None, debug=False, quiet=False, region=None, zone=None, namespace=None, offline=False,
+                 cache_ttl=None):
         Kbaseconfig.__init__(self, client=client, debug=debug, quiet=quiet, offline=offline)
+        if cache_ttl is not None:
+            self.cache_ttl = cache_ttl
         if not self.enabled:
             k = None
         else:
@@ -396,6 +418,11 @@ class Kconfig(Kbaseconfig):
                 from kvirt.providers.web import Kwebclient
                 k = Kwebclient(self.host, port, localkube=localkube, debug=debug)
                 self.type = 'web'
+            elif self.type == 'memory':
+                latency = self.options.get('latency', 0)
+                images = self.options.get('images', [])
+                from kvirt.providers.fake import Kmemory
+                k = Kmemory(latency=latency, images=images, debug=debug)
             elif offline:
                 from kvirt.providers.fake import Kfake
                 k = Kfake()
@@ -406,9 +433,11 @@ class Kconfig(Kbaseconfig):
                     sys.exit(1)
                 session = self.options.get('session', False)
                 remotednsmasq = self.options.get('remotednsmasq', False)
+                imagecache = self.options.get('imagecache', False)
                 from kvirt.providers.kvm import Kvirt
                 k = Kvirt(host=self.host, port=self.port, user=self.user, protocol=self.protocol, url=self.url,
-                          debug=debug, insecure=self.insecure, session=session, remotednsmasq=remotednsmasq)
+                          debug=debug, insecure=self.insecure, session=session, remotednsmasq=remotednsmasq,
+                          imagecache=imagecache, sshpersist=self.sshpersist)
             if k.conn is None:
                 error(f"Couldn't connect to client {self.client}. Leaving...")
                 sys.exit(1)
@@ -416,7 +445,7 @@ class Kconfig(Kbaseconfig):
                 if extraclient not in self.ini:
                     warning(f"Missing section for client {extraclient} in config file. Trying to connect...")
                     self.ini[extraclient] = {'host': extraclient}
-                c = Kconfig(client=extraclient)
+                c = Kconfig(client=extraclient, cache_ttl=cache_ttl)
                 e = c.k
                 self.extraclients[extraclient] = e
                 if e.conn is None:
@@ -458,6 +487,8 @@ class Kconfig(Kbaseconfig):
                                 break
 
                 pprint(f"Selecting client {self.client} from group {self.group}")
+            if not isinstance(k, Kcache):
+                k = Kcache(k, ttl=self.cache_ttl)
         self.k = k
         default_data = {'config_%s' % k: self.default[k] for k in self.default}
         config_data = {'config_%s' % k: self.ini[self.client][k] for k in self.ini[self.client]}
@@ -830,10 +861,7 @@ class Kconfig(Kbaseconfig):
                     sys.exit(1)
                 else:
                     scriptbasedir = os.path.dirname(script) if os.path.dirname(script) != '' else '.'
-                    env = Environment(loader=FileSystemLoader(scriptbasedir), undefined=undefined,
-                                      extensions=['jinja2.ext.do'], trim_blocks=True, lstrip_blocks=True)
-                    for jinjafilter in jinjafilters.jinjafilters:
-                        env.filters[jinjafilter] = jinjafilters.jinjafilters[jinjafilter]
+                    env = common.jinja_env(scriptbasedir)
                     try:
                         templ = env.get_template(os.path.basename(script))
                         scriptentries = templ.render(overrides)
@@ -1111,6 +1139,8 @@ class Kconfig(Kbaseconfig):
                 if overrides.get('tempkeydir') is not None:
                     identityfile = f"{overrides['tempkeydir'].name}/id_rsa"
                     tempkey_clean = True
+                if getattr(k, 'pending_reservations', None):
+                    k.flush_reservations(keep=True)
                 self.wait_finish(name, image=image, waitcommand=waitcommand, waittimeout=waittimeout,
                                  identityfile=identityfile, vmclient=client)
                 finishfiles = profile.get('finishfiles', [])
@@ -1388,24 +1418,144 @@ class Kconfig(Kbaseconfig):
             pprint(f"Product can be deleted with: kcli delete plan --yes {plan}")
         return {'result': 'success', 'plan': plan}
 
+    def plan_vms(self, plan, clients, action, bulk=None):
+        with ThreadPoolExecutor(max_workers=len(clients)) as executor:
+            listings = {hypervisor: executor.submit(clients[hypervisor].list) for hypervisor in clients}
+        concurrency = max(int(self.concurrency), 1)
+        executors = {hypervisor: ThreadPoolExecutor(max_workers=concurrency) for hypervisor in clients}
+        futures = []
+        for hypervisor in clients:
+            c = clients[hypervisor]
+            vms = [vm for vm in sorted(listings[hypervisor].result(), key=lambda x: x['name'])
+                   if vm.get('plan') == plan]
+            if bulk is not None and getattr(c, 'bulk', False) and vms:
+                futures.append((executors[hypervisor].submit(bulk, hypervisor, c, vms), True))
+                continue
+            for vm in vms:
+                futures.append((executors[hypervisor].submit(action, hypervisor, c, vm), False))
+        for executor in executors.values():
+            executor.shutdown()
+        results = []
+        for future, batch in futures:
+            results.extend(future.result() if batch else [future.result()])
+        return results
+
+    def diff_vm(self, profile, currentvm):
+        """Returns the (field, current, desired) entries where an existing vm differs from its plan profile"""
+        changes = []
+        currentstart = currentvm.get('autostart', False)
+        currentflavor = currentvm.get('flavor')
+        if 'autostart' in profile and currentstart != profile['autostart']:
+            changes.append(('autostart', currentstart, profile['autostart']))
+        if 'flavor' in profile and currentflavor != profile['flavor']:
+            changes.append(('flavor', currentflavor, profile['flavor']))
+        else:
+            if 'memory' in profile and currentvm['memory'] != profile['memory']:
+                changes.append(('memory', currentvm['memory'], profile['memory']))
+            if 'numcpus' in profile and int(currentvm['cpus']) != profile['numcpus']:
+                changes.append(('numcpus', int(currentvm['cpus']), profile['numcpus']))
+        for field in ['disks', 'nets']:
+            if field in profile and len(currentvm[field]) != len(profile[field]):
+                changes.append((field, len(currentvm[field]), len(profile[field])))
+        return changes
+
+    def update_vms(self, updatetasks, hosts, overrides={}, inputdir='.', dry=False):
+        """Reconciles existing vms of a plan in parallel, only touching the fields which changed"""
+        def update_vm(vmclient, name, profile, currentvm):
+            c = hosts[vmclient]
+            z = c.k
+            if not all(key in currentvm for key in ['memory', 'cpus', 'disks', 'nets']):
+                currentvm = z.info(name)
+            changes = self.diff_vm(profile, currentvm)
+            if dry:
+                for field, current, desired in changes:
+                    pprint(f"{field} of {name} would be updated from {current} to {desired}")
+                return changes
+            for field, current, desired in changes:
+                if field == 'autostart':
+                    pprint(f"Updating autostart of {name} to {desired}")
+                    z.update_start(name, desired)
+                elif field == 'flavor':
+                    pprint(f"Updating flavor of {name} to {desired}")
+                    z.update_flavor(name, desired)
+                elif field == 'memory':
+                    pprint(f"Updating memory of {name} to {desired}")
+                    z.update_memory(name, desired)
+                elif field == 'numcpus':
+                    pprint(f"Updating cpus of {name} to {desired}")
+                    z.update_cpus(name, desired)
+                elif field == 'disks' and current < desired:
+                    pprint(f"Adding Disks to {name}")
+                    for disk in profile['disks'][current:]:
+                        if isinstance(disk, int):
+                            size = disk
+                            pool = c.pool
+                        elif isinstance(disk, str) and disk.isdigit():
+                            size = int(disk)
+                            pool = c.pool
+                        elif isinstance(disk, dict):
+                            size = disk.get('size', c.disksize)
+                            pool = disk.get('pool', c.pool)
+                        else:
+                            continue
+                        z.add_disk(name=name, size=size, pool=pool)
+                elif field == 'disks':
+                    pprint(f"Removing Disks of {name}")
+                    for disk in currentvm['disks'][desired:]:
+                        diskname = os.path.basename(disk['path'])
+                        diskpool = os.path.dirname(disk['path'])
+                        z.delete_disk(name=name, diskname=diskname, pool=diskpool)
+                elif field == 'nets' and current < desired:
+                    pprint(f"Adding Nics to {name}")
+                    for net in profile['nets'][current:]:
+                        if isinstance(net, str):
+                            network = net
+                        elif isinstance(net, dict) and 'name' in net:
+                            network = net['name']
+                        else:
+                            error(f"Skpping wrong nic spec for {name}")
+                            continue
+                        z.add_nic(name, network)
+                elif field == 'nets':
+                    pprint(f"Removing Nics of {name}")
+                    for net in range(current, desired, -1):
+                        z.delete_nic(name, f"eth{net -1}")
+            updated = len(changes) > 0
+            if overrides.get('skip_files_remediation', False):
+                pprint(f"Skipping Remediation files of {name}")
+            elif c.remediate_files(name, profile.get('files', []), overrides, inputdir=inputdir):
+                updated = True
+            if not updated:
+                pprint(f"{name} skipped on {vmclient}!")
+            return changes
+        concurrency = max(int(overrides.get('concurrency', self.concurrency)), 1)
+        executors = {vmclient: ThreadPoolExecutor(max_workers=concurrency) for vmclient in updatetasks}
+        futures = {}
+        for vmclient in updatetasks:
+            for name, profile, currentvm in updatetasks[vmclient]:
+                futures[name] = executors[vmclient].submit(update_vm, vmclient, name, profile, currentvm)
+        for executor in executors.values():
+            executor.shutdown()
+        changes = {name: futures[name].result() for name in futures}
+        if dry and not any(changes.values()):
+            pprint("No changes found in existing vms")
+        return {name: changes[name] for name in changes if changes[name]}
+
     def start_plan(self, plan, container=False):
         k = self.k
-        startfound = False
         pprint(f"Starting vms from plan {plan}")
-        if not self.extraclients:
-            startclients = {self.client: k}
-        else:
-            startclients = self.extraclients
-            startclients.update({self.client: k})
-        for hypervisor in startclients:
-            c = startclients[hypervisor]
-            for vm in sorted(c.list(), key=lambda x: x['name']):
-                name = vm['name']
-                description = vm.get('plan')
-                if description == plan:
-                    startfound = True
-                    c.start(name)
-                    success(f"{name} started on {hypervisor}!")
+        startclients = {**self.extraclients, self.client: k}
+
+        def start_vm(hypervisor, c, vm):
+            c.start(vm['name'])
+            success(f"{vm['name']} started on {hypervisor}!")
+
+        def start_vms(hypervisor, c, vms):
+            c.start_vms([vm['name'] for vm in vms])
+            for vm in vms:
+                success(f"{vm['name']} started on {hypervisor}!")
+            return vms
+        startfound = len(self.plan_vms(plan, startclients, start_vm, bulk=start_vms)) > 0
         if container:
             cont = Kcontainerconfig(self, client=self.containerclient).cont
             for conta in sorted(cont.list_containers(k)):
@@ -1423,22 +1573,19 @@ class Kconfig(Kbaseconfig):
 
     def stop_plan(self, plan, soft=False, container=False):
         k = self.k
-        stopfound = True
         pprint(f"Stopping vms from plan {plan}")
-        if not self.extraclients:
-            stopclients = {self.client: k}
-        else:
-            stopclients = self.extraclients
-            stopclients.update({self.client: k})
-        for hypervisor in stopclients:
-            c = stopclients[hypervisor]
-            for vm in sorted(c.list(), key=lambda x: x['name']):
-                name = vm['name']
-                description = vm.get('plan')
-                if description == plan:
-                    stopfound = True
-                    c.stop(name, soft=soft)
-                    success(f"{name} stopped on {hypervisor}!")
+        stopclients = {**self.extraclients, self.client: k}
+
+        def stop_vm(hypervisor, c, vm):
+            c.stop(vm['name'], soft=soft)
+            success(f"{vm['name']} stopped on {hypervisor}!")
+
+        def stop_vms(hypervisor, c, vms):
+            c.stop_vms([vm['name'] for vm in vms], soft=soft)
+            for vm in vms:
+                success(f"{vm['name']} stopped on {hypervisor}!")
+            return vms
+        stopfound = len(self.plan_vms(plan, stopclients, stop_vm, bulk=stop_vms)) > 0
         if container:
             cont = Kcontainerconfig(self, client=self.containerclient).cont
             for conta in sorted(cont.list_containers()):
@@ -1480,7 +1627,7 @@ class Kconfig(Kbaseconfig):
         k = self.k
         deletedvms = []
         deletedlbs = []
-        dnsclients = []
+        dnsclients = {}
         networks = []
         if plan == '':
             error("That would delete every vm...Not doing that")
@@ -1495,64 +1642,76 @@ class Kconfig(Kbaseconfig):
         if self.extraclients:
             deleteclients.update(self.extraclients)
         elif vmclients:
-            deleteclients.update({cli: Kconfig(client=cli).k for cli in vmclients if cli != self.client})
+            vmclients = [cli for cli in vmclients if cli != self.client]
+            with ThreadPoolExecutor(max_workers=max(len(vmclients), 1)) as executor:
+                deleteclients.update(zip(vmclients, executor.map(lambda cli: Kconfig(client=cli).k, vmclients)))
         hypershift = False
         assisted = False
-        for hypervisor in deleteclients:
-            c = deleteclients[hypervisor]
-            for vm in sorted(c.list(), key=lambda x: x['name']):
-                name = vm['name']
-                description = vm.get('plan')
-                if description == plan:
-                    if 'loadbalancer' in vm:
-                        lbs = vm['loadbalancer'].split(',')
-                        for lb in lbs:
-                            if lb not in deletedlbs:
-                                deletedlbs.append(lb)
-                    vmnetworks = c.vm_ports(name)
-                    for network in vmnetworks:
-                        if network != 'default' and network not in networks:
-                            networks.append(network)
-                    dnsclient, domain = c.dnsinfo(name)
-                    if unregister:
-                        image = k.info(name).get('image')
-                        if 'rhel' in image:
-                            pprint(f"Removing rhel subscription for {name}")
-                            ip, vmport = _ssh_credentials(k, name)[1:]
-                            cmd = "subscription-manager unregister"
-                            sshcmd = ssh(name, ip=ip, user='root', tunnel=self.tunnel,
-                                         tunnelhost=self.tunnelhost, tunnelport=self.tunnelport,
-                                         tunneluser=self.tunneluser, insecure=True, cmd=cmd, vmport=vmport)
-                            os.system(sshcmd)
-                    c.delete(name, snapshots=True)
-                    if dnsclient is not None and domain is not None and dnsclient in self.clients:
-                        if dnsclient in dnsclients:
-                            z = dnsclients[dnsclient]
-                        elif dnsclient in self.clients:
-                            z = Kconfig(client=dnsclient).k
-                            dnsclients[dnsclient] = z
-                        z.delete_dns(dnsclient, domain)
-                    common.set_lastvm(name, self.client, delete=True)
-                    success(f"{name} deleted on {hypervisor}!")
-                    deletedvms.append(name)
-                    found = True
-                    cluster = vm.get('kube')
-                    if cluster is not None and cluster != '':
-                        clusterdir = os.path.expanduser(f"~/.kcli/clusters/{cluster}")
-                        if os.path.exists(clusterdir):
-                            parametersfile = f"{clusterdir}/kcli_parameters.yml"
-                            if os.path.exists(parametersfile):
-                                with open(parametersfile) as f:
-                                    clusterdata = yaml.safe_load(f)
-                                    kubetype = clusterdata.get('kubetype', 'generic')
-                                    if kubetype == 'hypershift':
-                                        hypershift = True
-                                        assisted = clusterdata.get(assisted, False)
-                                    domain = clusterdata.get('domain', domain)
-                                    dnsclient = clusterdata.get('dnsclient')
-                            if not hypershift:
-                                pprint(f"Deleting directory {clusterdir}")
-                                rmtree(clusterdir, ignore_errors=True)
+
+        def delete_vm(hypervisor, c, vm):
+            name = vm['name']
+            vmnetworks = c.vm_ports(name)
+            dnsclient, domain = c.dnsinfo(name)
+            if unregister:
+                image = c.info(name).get('image')
+                if 'rhel' in image:
+                    pprint(f"Removing rhel subscription for {name}")
+                    ip, vmport = _ssh_credentials(c, name)[1:]
+                    cmd = "subscription-manager unregister"
+                    sshcmd = ssh(name, ip=ip, user='root', tunnel=self.tunnel, tunnelhost=self.tunnelhost,
+                                 tunnelport=self.tunnelport, tunneluser=self.tunneluser, insecure=True, cmd=cmd,
+                                 vmport=vmport, persist=self.sshpersist)
+                    os.system(sshcmd)
+            c.delete(name, snapshots=True)
+            success(f"{name} deleted on {hypervisor}!")
+            return vm, vmnetworks, dnsclient, domain
+
+        def delete_vms(hypervisor, c, vms):
+            names = [vm['name'] for vm in vms]
+            infos = c.info_vms(names)
+            c.delete_vms(names, snapshots=True)
+            results = []
+            for vm in vms:
+                info = infos.get(vm['name']) or {}
+                vmnetworks = [net['net'] for net in info.get('nets', [])]
+                success(f"{vm['name']} deleted on {hypervisor}!")
+                results.append((vm, vmnetworks, info.get('dnsclient'), info.get('domain')))
+            return results
+        bulk = None if unregister else delete_vms
+        for vm, vmnetworks, dnsclient, domain in self.plan_vms(plan, deleteclients, delete_vm, bulk=bulk):
+            name = vm['name']
+            if 'loadbalancer' in vm:
+                lbs = vm['loadbalancer'].split(',')
+                for lb in lbs:
+                    if lb not in deletedlbs:
+                        deletedlbs.append(lb)
+            for network in vmnetworks:
+                if network != 'default' and network not in networks:
+                    networks.append(network)
+            if dnsclient is not None and domain is not None and dnsclient in self.clients:
+                if dnsclient not in dnsclients:
+                    dnsclients[dnsclient] = Kconfig(client=dnsclient).k
+                dnsclients[dnsclient].delete_dns(name, domain)
+            common.set_lastvm(name, self.client, delete=True)
+            deletedvms.append(name)
+            found = True
+            cluster = vm.get('kube')
+            if cluster is not None and cluster != '':
+                clusterdir = os.path.expanduser(f"~/.kcli/clusters/{cluster}")
+                if os.path.exists(clusterdir):
+                    parametersfile = f"{clusterdir}/kcli_parameters.yml"
+                    if os.path.exists(parametersfile):
+                        with open(parametersfile) as f:
+                            clusterdata = yaml.safe_load(f)
+                            kubetype = clusterdata.get('kubetype', 'generic')
+                            if kubetype == 'hypershift':
+                                hypershift = True
+                                assisted = clusterdata.get(assisted, False)
+                            domain = clusterdata.get('domain', domain)
+                            dnsclient = clusterdata.get('dnsclient')
+                    if not hypershift:
+                        pprint(f"Deleting directory {clusterdir}")
+                        rmtree(clusterdir, ignore_errors=True)
         if hypershift:
             kubeconfigmgmt = f"{clusterdir}/kubeconfig.mgmt"
             call(f'KUBECONFIG={kubeconfigmgmt} oc delete -f {clusterdir}/autoapprovercron.yml', shell=True)
@@ -1644,13 +1803,17 @@ class Kconfig(Kbaseconfig):
             warning("No matching vms found")
         return {'result': 'success'}
 
+    @volumes_inventory
     def plan(self, plan, ansible=False, url=None, path=None, container=False, inputfile=None, inputstring=None,
              overrides={}, info=False, update=False, embedded=False, download=False, quiet=False, doc=False,
-             onlyassets=False, pre=True, post=True, excludevms=[], basemode=False, threaded=False):
+             onlyassets=False, pre=True, post=True, excludevms=[], basemode=False, threaded=False, dry=False):
         """Manage plan file"""
         k = self.k
+        if dry:
+            pre, post = False, False
         no_overrides = not overrides
-        threads = []
+        kubethreads = []
+        vmtasks = {}
         newvms = []
         newassets = []
         failedvms = []
@@ -1780,6 +1943,9 @@ class Kconfig(Kbaseconfig):
             else:
                 msg = f"{inputfile} doesn't look like a valid plan file. Maybe you provided a parameter file ?"
                 return {'result': 'failure', 'reason': msg}
+        if dry:
+            entries = {entry: entries[entry] for entry in dict_types
+                       if entries[entry].get('type', 'vm') in ['vm', 'profile']}
         inputdir = os.path.dirname(inputfile) if os.path.dirname(inputfile) != '' and os.path.isabs(inputfile) else '.'
         pre_base = os.path.splitext(os.path.basename(inputfile))[0]
         pre_script = f'{inputdir}/kcli_pre.sh' if pre_base == 'kcli_plan' else f"{inputdir}/{pre_base}_pre.sh"
@@ -1951,272 +2117,220 @@ class Kconfig(Kbaseconfig):
                     kube_overrides['use_existing_openshift'] = True
                     new_args = (plan, kubetype, kube_overrides)
                     t = threading.Thread(target=self.threaded_create_kube, args=new_args)
-                    threads.append(t)
+                    kubethreads.append(t)
                     t.start()
                 else:
                     currentconfig.create_kube(plan, kubetype, overrides=kube_overrides)
         vmclients = []
-        if vmentries:
-            if not onlyassets:
-                pprint("Deploying Vms...")
-            vmcounter = 0
-            hosts = {}
-            vms_to_host = {}
-            baseplans = []
-            vmnames = [name for name in vmentries]
-            if basefile is not None:
-                basedir = os.path.dirname(inputfile) if os.path.isabs(inputfile) else '.'
-                baseinputfile = f"{basedir}/{basefile}"
-                if container_mode() and not os.path.isabs(basefile) and '/workdir' not in basedir:
-                    baseinputfile = f"/workdir/{basedir}/{basefile}"
-                self.plan(plan, inputfile=baseinputfile, overrides=overrides, excludevms=vmnames, basemode=True,
-                          onlyassets=onlyassets)
-                baseplans.append(basefile)
-            vmrules_strict = overrides.get('vmrules_strict', self.vmrules_strict)
-            for name in vmentries:
-                if name in excludevms:
-                    continue
-                currentplandir = basedir
-                if len(vmentries) == 1 and 'name' in overrides:
-                    newname = overrides['name']
-                    profile = entries[name]
-                    name = newname
-                else:
-                    profile = entries[name]
-                if 'name' in profile:
-                    name = profile['name']
-                if 'basevm' in profile or 'baseplan' in profile:
-                    baseprofile = {}
-                    appendkeys = ['disks', 'nets', 'files', 'scripts', 'cmds']
-                    if 'baseplan' in profile:
-                        baseplan = profile['baseplan']
-                        basedir = os.path.dirname(inputfile) if '/' in inputfile else '.'
-                        baseinputfile = f"{basedir}/{baseplan}"
-                        if container_mode() and not os.path.isabs(baseplan) and '/workdir' not in basedir:
-                            baseinputfile = f"/workdir/{basedir}/{baseplan}"
-                        basevm = profile['basevm'] if 'basevm' in profile else name
-                        if baseplan not in baseplans:
-                            self.plan(plan, inputfile=baseinputfile, overrides=overrides, excludevms=vmnames,
-                                      basemode=True, onlyassets=onlyassets)
-                            baseplans.append(baseplan)
-                        baseinfo = self.process_inputfile(plan, baseinputfile, overrides=overrides, full=True)
-                        baseprofile = baseinfo[0][basevm] if basevm in baseinfo[0] else {}
-                        currentplandir = baseinfo[3] if os.path.isabs(baseinfo[3]) else '.'
-                    elif 'basevm' in profile and profile['basevm'] in baseentries:
-                        baseprofile = baseentries[profile['basevm']]
-                    else:
-                        warning(f"Incorrect base entry for {name}. Skipping...")
+        deferred = []
+        try:
+            if vmentries:
+                if not onlyassets:
+                    pprint("Deploying Vms...")
+                vmcounter = 0
+                hosts = {}
+                vms_to_host = {}
+                baseplans = []
+                baseinfos = {}
+                currentvms = {}
+                updatetasks = {}
+                vmnames = [name for name in vmentries]
+                if basefile is not None:
+                    basedir = os.path.dirname(inputfile) if os.path.isabs(inputfile) else '.'
+                    baseinputfile = f"{basedir}/{basefile}"
+                    if container_mode() and not os.path.isabs(basefile) and '/workdir' not in basedir:
+                        baseinputfile = f"/workdir/{basedir}/{basefile}"
+                    self.plan(plan, inputfile=baseinputfile, overrides=overrides, excludevms=vmnames, basemode=True,
+                              onlyassets=onlyassets, dry=dry)
+                    baseplans.append(basefile)
+                vmrules_strict = overrides.get('vmrules_strict', self.vmrules_strict)
+                for name in vmentries:
+                    if name in excludevms:
                         continue
-                    for key in baseprofile:
-                        if key not in profile:
-                            profile[key] = baseprofile[key]
-                        elif key in baseprofile and key in profile and key in appendkeys:
-                            profile[key] = baseprofile[key] + profile[key]
-                rulefound = False
-                for entry in overrides.get('vmrules', self.vmrules):
-                    if len(entry) != 1:
-                        error(f"Wrong vm rule {entry}")
-                        sys.exit(1)
-                    rule = list(entry.keys())[0]
-                    if (re.match(rule, name) or fnmatch(name, rule)) and isinstance(entry[rule], dict):
-                        rulefound = True
-                        listkeys = ['cmds', 'files', 'scripts']
-                        for rule in entry:
-                            current = entry[rule]
-                            for key in current:
-                                if key in listkeys and isinstance(current[key], list) and key in profile:
-                                    current[key] = profile[key] + current[key]
-                            profile.update(entry[rule])
-                            if 'name' in entry[rule]:
-                                warning(f"Renaming {name} to {entry[rule]['name']}")
-                                name = entry[rule]['name']
-                if vmrules_strict and not rulefound:
-                    warning(f"No vmrules found for {name}. Skipping...")
-                    continue
-                vmclient = profile.get('client')
-                if vmclient is not None and vmclient not in vmclients:
-                    vmclients.append(vmclient)
-                if vmclient is None:
-                    z = k
-                    vmclient = self.client
-                    if vmclient not in hosts:
-                        hosts[vmclient] = self
-                elif vmclient in hosts:
-                    z = hosts[vmclient].k
-                elif vmclient in self.clients:
-                    newclient = Kconfig(client=vmclient)
-                    z = newclient.k
-                    hosts[vmclient] = newclient
-                else:
-                    warning(f"Client {vmclient} not found. Using default one")
-                    z = k
-                    vmclient = self.client
-                    if vmclient not in hosts:
-                        hosts[vmclient] = self
-                vms_to_host[name] = hosts[vmclient]
-                if 'profile' in profile and profile['profile'] in vmprofiles:
-                    customprofile = vmprofiles[profile['profile']]
-                    profilename = profile['profile']
-                else:
-                    customprofile = {}
-                    profilename = 'kvirt'
-                if customprofile:
-                    customprofile.update(profile)
-                    profile = customprofile
-                if 'playbook' in profile and profile['playbook']:
-                    if 'scripts' not in profile and 'files' not in profile and 'cmds' not in profile:
-                        pprint(f"Skipping empty playbook for {name}")
+                    currentplandir = basedir
+                    if len(vmentries) == 1 and 'name' in overrides:
+                        newname = overrides['name']
+                        profile = entries[name]
+                        name = newname
                     else:
-                        if 'image' in profile and 'rhel' in profile['image']\
-                                and 'rhnregister' in profile and profile['rhnregister']:
-                            warning(f"Make sure to subscribe {name} to Red Hat network")
-                        if 'privatekey' in profile and profile['privatekey']:
-                            warning(f"Copy your private key to {name}")
-                        for net in profile.get('nets', []):
-                            if 'ip' in net and 'mask' in net and 'gateway' in net:
-                                ip, mask, gateway = net['ip'], net['mask'], net['gateway']
-                                warning(f"Add manually this network {ip}/{mask} with gateway {gateway}")
-                            if 'vips' in net:
-                                vips = ','.join(net['vips'])
-                                warning(f"Add manually vips {vips}")
-                        pprint("Make sure to export ANSIBLE_JINJA2_EXTENSIONS=jinja2.ext.do")
-                        self.create_vm_playbook(name, profile, overrides=overrides, store=True)
+                        profile = entries[name]
+                    if 'name' in profile:
+                        name = profile['name']
+                    if 'basevm' in profile or 'baseplan' in profile:
+                        baseprofile = {}
+                        appendkeys = ['disks', 'nets', 'files', 'scripts', 'cmds']
+                        if 'baseplan' in profile:
+                            baseplan = profile['baseplan']
+                            basedir = os.path.dirname(inputfile) if '/' in inputfile else '.'
+                            baseinputfile = f"{basedir}/{baseplan}"
+                            if container_mode() and not os.path.isabs(baseplan) and '/workdir' not in basedir:
+                                baseinputfile = f"/workdir/{basedir}/{baseplan}"
+                            basevm = profile['basevm'] if 'basevm' in profile else name
+                            if baseplan not in baseplans:
+                                self.plan(plan, inputfile=baseinputfile, overrides=overrides, excludevms=vmnames,
+                                          basemode=True, onlyassets=onlyassets, dry=dry)
+                                baseplans.append(baseplan)
+                            if baseinputfile not in baseinfos:
+                                baseinfos[baseinputfile] = self.process_inputfile(plan, baseinputfile,
+                                                                                  overrides=overrides, full=True)
+                            baseinfo = baseinfos[baseinputfile]
+                            baseprofile = deepcopy(baseinfo[0][basevm]) if basevm in baseinfo[0] else {}
+                            currentplandir = baseinfo[3] if os.path.isabs(baseinfo[3]) else '.'
+                        elif 'basevm' in profile and profile['basevm'] in baseentries:
+                            baseprofile = baseentries[profile['basevm']]
+                        else:
+                            warning(f"Incorrect base entry for {name}. Skipping...")
+                            continue
+                        for key in baseprofile:
+                            if key not in profile:
+                                profile[key] = baseprofile[key]
+                            elif key in baseprofile and key in profile and key in appendkeys:
+                                profile[key] = baseprofile[key] + profile[key]
+                    rulefound = False
+                    for entry in overrides.get('vmrules', self.vmrules):
+                        if len(entry) != 1:
+                            error(f"Wrong vm rule {entry}")
+                            sys.exit(1)
+                        rule = list(entry.keys())[0]
+                        if (re.match(rule, name) or fnmatch(name, rule)) and isinstance(entry[rule], dict):
+                            rulefound = True
+                            listkeys = ['cmds', 'files', 'scripts']
+                            for rule in entry:
+                                current = entry[rule]
+                                for key in current:
+                                    if key in listkeys and isinstance(current[key], list) and key in profile:
+                                        current[key] = profile[key] + current[key]
+                                profile.update(entry[rule])
+                                if 'name' in entry[rule]:
+                                    warning(f"Renaming {name} to {entry[rule]['name']}")
+                                    name = entry[rule]['name']
+                    if vmrules_strict and not rulefound:
+                        warning(f"No vmrules found for {name}. Skipping...")
                         continue
-                if z.exists(name) and not onlyassets:
-                    if not update:
-                        pprint(f"{name} skipped on {vmclient}!")
+                    vmclient = profile.get('client')
+                    if vmclient is not None and vmclient not in vmclients:
+                        vmclients.append(vmclient)
+                    if vmclient is None:
+                        z = k
+                        vmclient = self.client
+                        if vmclient not in hosts:
+                            hosts[vmclient] = self
+                    elif vmclient in hosts:
+                        z = hosts[vmclient].k
+                    elif vmclient in self.clients:
+                        newclient = Kconfig(client=vmclient)
+                        z = newclient.k
+                        hosts[vmclient] = newclient
+                    else:
+                        warning(f"Client {vmclient} not found. Using default one")
+                        z = k
+                        vmclient = self.client
+                        if vmclient not in hosts:
+                            hosts[vmclient] = self
+                    vms_to_host[name] = hosts[vmclient]
+                    if hosts[vmclient].type == 'kvm' and not onlyassets and not dry:
+                        if z.defer_reservations():
+                            deferred.append(z)
+                    if 'profile' in profile and profile['profile'] in vmprofiles:
+                        customprofile = vmprofiles[profile['profile']]
+                        profilename = profile['profile']
                     else:
-                        updated = False
-                        currentvm = z.info(name)
-                        currentstart = currentvm.get('autostart', False)
-                        currentmemory = currentvm['memory']
-                        currentimage = currentvm.get('template')
-                        currentimage = currentvm.get('image', currentimage)
-                        currentcpus = int(currentvm['cpus'])
-                        currentnets = currentvm['nets']
-                        currentdisks = currentvm['disks']
-                        currentflavor = currentvm.get('flavor')
-                        if 'autostart' in profile and currentstart != profile['autostart']:
-                            updated = True
-                            pprint(f"Updating autostart of {name} to {profile['autostart']}")
-                            z.update_start(name, profile['autostart'])
-                        if 'flavor' in profile and currentflavor != profile['flavor']:
-                            updated = True
-                            pprint(f"Updating flavor of {name} to {profile['flavor']}")
-                            z.update_flavor(name, profile['flavor'])
+                        customprofile = {}
+                        profilename = 'kvirt'
+                    if customprofile:
+                        customprofile.update(profile)
+                        profile = customprofile
+                    if 'playbook' in profile and profile['playbook']:
+                        if 'scripts' not in profile and 'files' not in profile and 'cmds' not in profile:
+                            pprint(f"Skipping empty playbook for {name}")
                         else:
-                            if 'memory' in profile and currentmemory != profile['memory']:
-                                updated = True
-                                pprint(f"Updating memory of {name} to {profile['memory']}")
-                                z.update_memory(name, profile['memory'])
-                            if 'numcpus' in profile and currentcpus != profile['numcpus']:
-                                updated = True
-                                pprint(f"Updating cpus of {name} to {profile['numcpus']}")
-                                z.update_cpus(name, profile['numcpus'])
-                        if 'disks' in profile:
-                            if len(currentdisks) < len(profile['disks']):
-                                updated = True
-                                pprint(f"Adding Disks to {name}")
-                                for disk in profile['disks'][len(currentdisks):]:
-                                    if isinstance(disk, int):
-                                        size = disk
-                                        pool = self.pool
-                                    elif isinstance(disk, str) and disk.isdigit():
-                                        size = int(disk)
-                                        pool = self.pool
-                                    elif isinstance(disk, dict):
-                                        size = disk.get('size', self.disksize)
-                                        pool = disk.get('pool', self.pool)
-                                    else:
-                                        continue
-                                    z.add_disk(name=name, size=size, pool=pool)
-                            if len(currentdisks) > len(profile['disks']):
-                                updated = True
-                                pprint(f"Removing Disks of {name}")
-                                for disk in currentdisks[len(currentdisks) - len(profile['disks']):]:
-                                    diskname = os.path.basename(disk['path'])
-                                    diskpool = os.path.dirname(disk['path'])
-                                    z.delete_disk(name=name, diskname=diskname, pool=diskpool)
-                        if 'nets' in profile:
-                            if len(currentnets) < len(profile['nets']):
-                                updated = True
-                                pprint(f"Adding Nics to {name}")
-                                for net in profile['nets'][len(currentnets):]:
-                                    if isinstance(net, str):
-                                        network = net
-                                    elif isinstance(net, dict) and 'name' in net:
-                                        network = net['name']
-                                    else:
-                                        error(f"Skpping wrong nic spec for {name}")
-                                        continue
-                                    z.add_nic(name, network)
-                            if len(currentnets) > len(profile['nets']):
-                                updated = True
-                                pprint(f"Removing Nics of {name}")
-                                for net in range(len(currentnets), len(profile['nets']), -1):
-                                    interface = f"eth{net -1}"
-                                    z.delete_nic(name, interface)
-                        if overrides.get('skip_files_remediation', False):
-                            pprint(f"Skipping Remediation files of {name}")
-                        elif self.remediate_files(name, profile.get('files', []), overrides, inputdir=inputdir):
-                            updated = True
-                        if not updated:
-                            pprint(f"{name} skipped on {vmclient}!")
-                    existingvms.append(name)
-                    continue
-                sharedkey = profile.get('sharedkey', self.sharedkey)
-                if sharedkey:
-                    vmcounter += 1
-                    if not os.path.exists(f"{plan}.key") or not os.path.exists(f"{plan}.key.pub"):
-                        os.system(f"ssh-keygen -qt rsa -N '' -f {plan}.key")
-                    publickey = open(f"{plan}.key.pub").read().strip()
-                    privatekey = open(f"{plan}.key").read().strip()
-                    if 'keys' not in profile:
-                        profile['keys'] = [publickey]
+                            if 'image' in profile and 'rhel' in profile['image']\
+                                    and 'rhnregister' in profile and profile['rhnregister']:
+                                warning(f"Make sure to subscribe {name} to Red Hat network")
+                            if 'privatekey' in profile and profile['privatekey']:
+                                warning(f"Copy your private key to {name}")
+                            for net in profile.get('nets', []):
+                                if 'ip' in net and 'mask' in net and 'gateway' in net:
+                                    ip, mask, gateway = net['ip'], net['mask'], net['gateway']
+                                    warning(f"Add manually this network {ip}/{mask} with gateway {gateway}")
+                                if 'vips' in net:
+                                    vips = ','.join(net['vips'])
+                                    warning(f"Add manually vips {vips}")
+                            pprint("Make sure to export ANSIBLE_JINJA2_EXTENSIONS=jinja2.ext.do")
+                            self.create_vm_playbook(name, profile, overrides=overrides, store=True)
+                            continue
+                    if update and not onlyassets:
+                        if vmclient not in currentvms:
+                            currentvms[vmclient] = {vm['name']: vm for vm in z.list() if 'name' in vm}
+                        exists = name in currentvms[vmclient]
                     else:
-                        profile['keys'].append(publickey)
-                    if 'files' in profile:
-                        profile['files'].append({'path': '/root/.ssh/id_rsa', 'content': privatekey})
-                        profile['files'].append({'path': '/root/.ssh/id_rsa.pub', 'content': publickey})
+                        exists = not onlyassets and z.exists(name)
+                    if exists:
+                        if not update:
+                            pprint(f"{name} skipped on {vmclient}!")
+                        else:
+                            updatetasks.setdefault(vmclient, []).append((name, profile, currentvms[vmclient][name]))
+                        existingvms.append(name)
+                        continue
+                    if dry:
+                        pprint(f"{name} would be created on {vmclient}")
+                        newvms.append(name)
+                        continue
+                    sharedkey = profile.get('sharedkey', self.sharedkey)
+                    if sharedkey:
+                        vmcounter += 1
+                        if not os.path.exists(f"{plan}.key") or not os.path.exists(f"{plan}.key.pub"):
+                            os.system(f"ssh-keygen -qt rsa -N '' -f {plan}.key")
+                        publickey = open(f"{plan}.key.pub").read().strip()
+                        privatekey = open(f"{plan}.key").read().strip()
+                        if 'keys' not in profile:
+                            profile['keys'] = [publickey]
+                        else:
+                            profile['keys'].append(publickey)
+                        if 'files' in profile:
+                            profile['files'].append({'path': '/root/.ssh/id_rsa', 'content': privatekey})
+                            profile['files'].append({'path': '/root/.ssh/id_rsa.pub', 'content': publickey})
+                        else:
+                            profile['files'] = [{'path': '/root/.ssh/id_rsa', 'content': privatekey},
+                                                {'path': '/root/.ssh/id_rsa.pub', 'content': publickey}]
+                        if vmcounter >= len(vmentries):
+                            os.remove(f"{plan}.key.pub")
+                            os.remove(f"{plan}.key")
+                    currentoverrides = overrides.copy()
+                    if 'image' in profile and profile['image'] in self.profile_index():
+                        profile['image'] = self.profile_index()[profile['image']][0][4]
+                        currentoverrides['image'] = profile['image']
+                    if threaded:
+                        new_args = (name, profilename, currentoverrides, profile, z, plan, currentplandir, vmclient,
+                                    onfly, onlyassets, newvms, failedvms, asyncwaitvms, newassets)
+                        depends = profile.get('depends', [])
+                        depends = [depends] if isinstance(depends, str) else depends
+                        vmtasks[name] = {'args': new_args, 'vmclient': vmclient, 'depends': depends}
                     else:
-                        profile['files'] = [{'path': '/root/.ssh/id_rsa', 'content': privatekey},
-                                            {'path': '/root/.ssh/id_rsa.pub', 'content': publickey}]
-                    if vmcounter >= len(vmentries):
-                        os.remove(f"{plan}.key.pub")
-                        os.remove(f"{plan}.key")
-                currentoverrides = overrides.copy()
-                if 'image' in profile:
-                    for entry in self.list_profiles():
-                        currentimage = profile['image']
-                        entryprofile = entry[0]
-                        if entryprofile == currentimage:
-                            profile['image'] = entry[4]
-                            currentoverrides['image'] = profile['image']
-                            break
-                if threaded:
-                    new_args = (name, profilename, currentoverrides, profile, z, plan, currentplandir, vmclient,
-                                onfly, onlyassets, newvms, failedvms, asyncwaitvms, newassets)
-                    t = threading.Thread(target=self.threaded_create_vm, args=new_args)
-                    threads.append(t)
-                    t.start()
-                else:
-                    result = self.create_vm(name, profilename, overrides=currentoverrides, customprofile=profile, k=z,
-                                            plan=plan, basedir=currentplandir, client=vmclient, onfly=onfly,
-                                            onlyassets=onlyassets)
-                    if not onlyassets:
-                        common.handle_response(result, name, client=vmclient)
-                    self.handle_vm_result(name, profile, result=result, newvms=newvms, failedvms=failedvms,
-                                          asyncwaitvms=asyncwaitvms, onlyassets=onlyassets, newassets=newassets,
-                                          vmclient=vmclient)
+                        result = self.create_vm(name, profilename, overrides=currentoverrides, customprofile=profile,
+                                                k=z, plan=plan, basedir=currentplandir, client=vmclient, onfly=onfly,
+                                                onlyassets=onlyassets)
+                        if not onlyassets:
+                            common.handle_response(result, name, client=vmclient)
+                        self.handle_vm_result(name, profile, result=result, newvms=newvms, failedvms=failedvms,
+                                              asyncwaitvms=asyncwaitvms, onlyassets=onlyassets, newassets=newassets,
+                                              vmclient=vmclient)
+                if updatetasks:
+                    changes = self.update_vms(updatetasks, hosts, overrides=overrides, inputdir=inputdir, dry=dry)
+                if dry:
+                    changes = changes if updatetasks else {}
+                    return {'result': 'success', 'plan': plan, 'changes': changes, 'newvms': newvms}
+            if vmentries and threaded and vmtasks:
+                self.schedule_vms(vmtasks, hosts, failedvms, overrides=overrides)
+        except BaseException:
+            for z in deferred:
+                z.flush_reservations(wait=False)
+            raise
+        for z in deferred:
+            z.flush_reservations()
         if vmentries and threaded:
-            while True:
-                for index, t in enumerate(threads):
-                    if not t.is_alive():
-                        del threads[index]
-                if not threads:
-                    break
-                else:
-                    sleep(1)
+            for t in kubethreads:
+                t.join()
         if vmclients:
             yaml.safe_dump(vmclients, open(os.path.expanduser(f'~/.kcli/vmclients_{plan}'), 'w'))
         if diskentries and not onlyassets:
@@ -2414,13 +2528,11 @@ class Kconfig(Kbaseconfig):
             rmtree(path)
         if inputstring is not None and os.path.exists(f"temp_plan_{plan}.yml"):
             os.remove(f"temp_plan_{plan}.yml")
+        if asyncwaitvms:
+            self.wait_vms(asyncwaitvms)
         for entry in asyncwaitvms:
-            name, finishfiles = entry['name'], entry['finishfiles']
-            waitcommand, waittimeout = entry['waitcommand'], entry['waittimeout']
-            vmclient = entry['vmclient']
-            self.wait_finish(name, waitcommand=waitcommand, waittimeout=waittimeout, vmclient=vmclient)
-            if finishfiles:
-                self.handle_finishfiles(name, finishfiles, vmclient=vmclient)
+            if entry['finishfiles']:
+                self.handle_finishfiles(entry['name'], entry['finishfiles'], vmclient=entry['vmclient'])
         post_script = f'{inputdir}/kcli_post.sh'
         if os.path.exists(post_script):
             if post:
@@ -2633,83 +2745,138 @@ class Kconfig(Kbaseconfig):
 
     def wait_finish(self, name, image=None, quiet=False, waitcommand=None, waittimeout=0, identityfile=None,
                     vmclient=None):
-        config = Kconfig(client=vmclient) if vmclient is not None else self
-        k = config.k
-        if image is None:
-            image = k.info(name)['image']
-        pprint(f"Waiting for vm {name} to finish customisation")
-        if waitcommand is not None and '2>' not in waitcommand:
-            waitcommand += " 2>/dev/null"
-        if common.needs_ignition(image):
-            cmd = waitcommand or 'sudo journalctl --all --no-pager'
-        else:
-            cmd = waitcommand or f"sudo tail -n 50 {common.get_cloudinitfile(image)}"
-        user, ip, vmport = None, None, None
-        hostip = None
-        timeout = 0
-        while ip is None:
-            info = k.info(name)
-            if config.type == 'packet' and info.get('status') != 'active':
-                warning("Waiting for node to be active")
-                ip = None
+        entry = {'name': name, 'image': image, 'waitcommand': waitcommand, 'waittimeout': waittimeout,
+                 'vmclient': vmclient}
+        self.wait_vms([entry], quiet=quiet, identityfile=identityfile)
+        return True
+
+    def wait_vms(self, entries, quiet=False, identityfile=None):
+        configs, vms = {}, []
+        for entry in entries:
+            name, vmclient = entry['name'], entry.get('vmclient')
+            if vmclient is not None and vmclient not in configs:
+                configs[vmclient] = Kconfig(client=vmclient)
+            config = configs[vmclient] if vmclient is not None else self
+            image = entry.get('image') or config.k.info(name)['image']
+            waitcommand = entry.get('waitcommand')
+            pprint(f"Waiting for vm {name} to finish customisation")
+            if waitcommand is not None:
+                if '2>' not in waitcommand:
+                    waitcommand += " 2>/dev/null"
+                waitcommand = base64.b64encode(waitcommand.encode()).decode()
+                cmd = f"until echo {waitcommand} | base64 -d | sh | grep .; do sleep 2; done"
+            elif common.needs_ignition(image):
+                cmd = "sudo journalctl --all --no-pager --follow 2>/dev/null | tail -n +%s"
             else:
-                user, ip = config.vmuser or info.get('user'), info.get('ip')
-                if config.type == 'kubevirt':
-                    if k.access_mode == 'NodePort':
-                        vmport = info.get('nodeport')
-                        if hostip is None:
-                            hostip = k.node_host(name=info.get('host'))
-                        ip = hostip
-                    elif k.access_mode == 'LoadBalancer':
-                        ip = info.get('loadbalancerip')
-                if user is not None and ip is not None:
-                    if config.type == 'openstack' and info.get('privateip') == ip and k.external_network is not None\
-                            and info.get('nets')[0]['net'] != k.external_network:
-                        warning("Waiting for floating ip instead of a private ip...")
-                        ip = None
+                cmd = f"sudo tail -n +%s -F {common.get_cloudinitfile(image)} 2>/dev/null"
+            vms.append({'name': name, 'config': config, 'cmd': cmd, 'waitcommand': waitcommand is not None,
+                        'waittimeout': entry.get('waittimeout') or 0, 'start': time(), 'next': time(), 'ip': None,
+                        'vmport': None, 'hostip': None, 'process': None, 'buffer': b'', 'offset': 0,
+                        'output': ''})
+        selector = selectors.DefaultSelector()
+        pending = list(vms)
+        while pending:
+            now = time()
+            for vm in pending:
+                if vm['process'] is None and now >= vm['next']:
+                    if vm['ip'] is None:
+                        self._wait_access(vm, identityfile=identityfile)
+                        vm['next'] = now + 5
+                        if vm['ip'] is None:
+                            pprint(f"Waiting for vm {vm['name']} to be accessible...")
                     else:
-                        testcmd = common.ssh(name, user=user, ip=ip, tunnel=config.tunnel, tunnelhost=config.tunnelhost,
-                                             tunnelport=config.tunnelport, tunneluser=config.tunneluser,
-                                             insecure=config.insecure, cmd='id -un', vmport=vmport,
-                                             identityfile=identityfile, password=False)
-                        if os.popen(testcmd).read().strip() != user:
-                            warning("Gathered ip not functional yet...")
-                            ip = None
-            pprint("Waiting for vm to be accessible...")
-            sleep(5)
-            timeout += 5
-            if waittimeout > 0 and timeout > waittimeout:
-                error("Timeout waiting for vm to be accessible...")
-                break
-        sleep(5)
-        oldoutput = ''
-        timeout = 0
-        while True:
-            sshcmd = common.ssh(name, user='root', ip=ip, tunnel=config.tunnel, tunnelhost=config.tunnelhost,
-                                vmport=vmport, tunnelport=config.tunnelport, tunneluser=config.tunneluser,
-                                insecure=config.insecure, cmd=cmd, identityfile=identityfile, password=False)
-            output = os.popen(sshcmd).read()
-            if waitcommand is not None:
-                if output != '':
-                    print(output)
-                    break
+                        self._wait_stream(vm, selector, identityfile=identityfile)
+            if not selector.get_map():
+                sleep(1)
+            for key, _ in selector.select(timeout=1) if selector.get_map() else []:
+                vm = key.data
+                data = os.read(key.fd, 65536)
+                if data:
+                    lines = (vm['buffer'] + data).split(b'\n')
+                    vm['buffer'] = lines.pop()
                 else:
-                    pprint("Waiting for waitcommand to succeed...")
-            else:
-                if 'kcli boot finished' in output or 'Ignition finished successfully' in output or\
-                   'Finished Combustion' in output:
-                    break
-                output = output.replace(oldoutput, '')
-                if not quiet:
-                    print(output)
-                oldoutput = output
-            sleep(2)
-            timeout += 2
-            if waittimeout > 0 and timeout > waittimeout:
-                error("Timeout waiting for waitcommand to execute...")
-                break
+                    lines, vm['buffer'] = [vm['buffer']] if vm['buffer'] else [], b''
+                vm['offset'] += len(lines)
+                output = '\n'.join(line.decode(errors='replace').rstrip('\r') for line in lines)
+                if vm['waitcommand'] or not quiet:
+                    prefix = f"{vm['name']}: " if len(vms) > 1 else ''
+                    for line in output.splitlines():
+                        print(f"{prefix}{line}")
+                vm['output'] = (vm['output'] + output)[-1024:]
+                if (vm['waitcommand'] and vm['output'].strip() and not data) or 'kcli boot finished' in vm['output']\
+                        or 'Ignition finished successfully' in vm['output'] or 'Finished Combustion' in vm['output']:
+                    self._wait_close(vm, selector)
+                    pending.remove(vm)
+                elif not data:
+                    self._wait_close(vm, selector)
+                    vm['next'] = time() + 5
+            for vm in pending[:]:
+                if 0 < vm['waittimeout'] < time() - vm['start']:
+                    if vm['ip'] is None:
+                        error(f"Timeout waiting for vm {vm['name']} to be accessible...")
+                    else:
+                        error(f"Timeout waiting for vm {vm['name']} to finish customisation...")
+                    self._wait_close(vm, selector)
+                    pending.remove(vm)
+        selector.close()
         return True
 
+    def _wait_access(self, vm, identityfile=None):
+        name, config = vm['name'], vm['config']
+        k = config.k
+        info = k.info(name)
+        if config.type == 'packet' and info.get('status') != 'active':
+            warning("Waiting for node to be active")
+            return
+        user, ip = config.vmuser or info.get('user'), info.get('ip')
+        if config.type == 'kubevirt':
+            if k.access_mode == 'NodePort':
+                vm['vmport'] = info.get('nodeport')
+                if vm['hostip'] is None:
+                    vm['hostip'] = k.node_host(name=info.get('host'))
+                ip = vm['hostip']
+            elif k.access_mode == 'LoadBalancer':
+                ip = info.get('loadbalancerip')
+        if user is None or ip is None:
+            return
+        if config.type == 'openstack' and info.get('privateip') == ip and k.external_network is not None\
+                and info.get('nets')[0]['net'] != k.external_network:
+            warning("Waiting for floating ip instead of a private ip...")
+            return
+        testcmd = common.ssh(name, user=user, ip=ip, tunnel=config.tunnel, tunnelhost=config.tunnelhost,
+                             tunnelport=config.tunnelport, tunneluser=config.tunneluser, insecure=config.insecure,
+                             cmd='id -un', vmport=vm['vmport'], identityfile=identityfile, password=False,
+                             persist=config.sshpersist)
+        if os.popen(testcmd).read().strip() != user:
+            warning("Gathered ip not functional yet...")
+            return
+        vm['ip'] = ip
+        vm['start'] = time()
+
+    def _wait_stream(self, vm, selector, identityfile=None):
+        config = vm['config']
+        cmd = vm['cmd']
+        if not vm['waitcommand']:
+            cmd = cmd % (vm['offset'] + 1)
+        sshcmd = common.ssh(vm['name'], user='root', ip=vm['ip'], tunnel=config.tunnel, tunnelhost=config.tunnelhost,
+                            vmport=vm['vmport'], tunnelport=config.tunnelport, tunneluser=config.tunneluser,
+                            insecure=config.insecure, cmd=cmd, identityfile=identityfile, password=False, tty=True,
+                            persist=config.sshpersist)
+        vm['process'] = Popen(sshcmd, shell=True, stdin=DEVNULL, stdout=PIPE, stderr=DEVNULL)
+        vm['buffer'] = b''
+        selector.register(vm['process'].stdout, selectors.EVENT_READ, vm)
+
+    def _wait_close(self, vm, selector):
+        process = vm['process']
+        if process is None:
+            return
+        selector.unregister(process.stdout)
+        if process.poll() is None:
+            process.terminate()
+        process.wait()
+        process.stdout.close()
+        vm['process'] = None
+
     def clean_tempkey(self, name, identityfile=None):
         cmd = "sed -i '/temp-kcli-key/d' /home/*/.ssh/authorized_keys /root/.ssh/authorized_keys"
         k = self.k
@@ -2724,7 +2891,7 @@ class Kconfig(Kbaseconfig):
                 ip = info.get('loadbalancerip')
         sshcmd = common.ssh(name, user='root', ip=ip, tunnel=self.tunnel, tunnelhost=self.tunnelhost, vmport=vmport,
                             tunnelport=self.tunnelport, tunneluser=self.tunneluser, insecure=self.insecure, cmd=cmd,
-                            identityfile=identityfile, password=False)
+                            identityfile=identityfile, password=False, persist=self.sshpersist)
         os.popen(sshcmd).read()
 
     def threaded_create_kube(self, cluster, kubetype, kube_overrides):
@@ -3123,7 +3290,7 @@ class Kconfig(Kbaseconfig):
             cmd = "cat /root/version.txt"
             sshcmd = ssh(name, ip=ip, user='root', tunnel=self.tunnel,
                          tunnelhost=self.tunnelhost, tunnelport=self.tunnelport,
-                         tunneluser=self.tunneluser, insecure=True, cmd=cmd, vmport=vmport)
+                         tunneluser=self.tunneluser, insecure=True, cmd=cmd, vmport=vmport, persist=self.sshpersist)
             os.system(sshcmd)
 
     def handle_finishfiles(self, name, finishfiles, identityfile=None, vmclient=None):
@@ -3141,7 +3308,8 @@ class Kconfig(Kbaseconfig):
                 continue
             scpcmd = common.scp(name, ip=current_ip, user='root', source=source, destination=destination,
                                 tunnel=config.tunnel, tunnelhost=config.tunnelhost, tunnelport=config.tunnelport,
-                                tunneluser=self.tunneluser, download=True, insecure=True, identityfile=identityfile)
+                                tunneluser=self.tunneluser, download=True, insecure=True, identityfile=identityfile,
+                                persist=self.sshpersist)
             os.system(scpcmd)
 
     def handle_notifications(self, name, notifymethods=[], pushbullettoken=None, notifyscript=None, notifycmd=None,
@@ -3248,6 +3416,68 @@ class Kconfig(Kbaseconfig):
             common.handle_response(result, name, client=vmclient)
         self.handle_vm_result(name, profile, result=result, newvms=newvms, failedvms=failedvms,
                               asyncwaitvms=asyncwaitvms, onlyassets=onlyassets, newassets=newassets, vmclient=vmclient)
+        return result
+
+    def schedule_vms(self, vmtasks, hosts, failedvms, overrides={}):
+        executors = {}
+        for task in vmtasks.values():
+            vmclient = task['vmclient']
+            if vmclient not in executors:
+                concurrency = int(overrides.get('concurrency', hosts[vmclient].concurrency))
+                executors[vmclient] = ThreadPoolExecutor(max_workers=max(concurrency, 1))
+        failfast = overrides.get('failfast', self.failfast)
+        pending = dict(vmtasks)
+        running = {}
+        done, failed = [], []
+        try:
+            while pending or running:
+                for name in list(pending):
+                    depends = [dep for dep in pending[name]['depends'] if dep in vmtasks]
+                    faileddeps = [dep for dep in depends if dep in failed]
+                    if faileddeps:
+                        reason = f"dependency {faileddeps[0]} failed"
+                        error(f"Skipping {name} as {reason}")
+                        failedvms.append({'name': name, 'reason': reason})
+                        failed.append(name)
+                        del pending[name]
+                    elif all(dep in done for dep in depends):
+                        task = pending.pop(name)
+                        future = executors[task['vmclient']].submit(self.threaded_create_vm, *task['args'])
+                        running[future] = name
+                if not running:
+                    for name in pending:
+                        reason = "unresolvable dependencies"
+                        error(f"Skipping {name} because of {reason}")
+                        failedvms.append({'name': name, 'reason': reason})
+                    break
+                finished, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in finished:
+                    name = running.pop(future)
+                    try:
+                        result = future.result()
+                    except Exception as e:
+                        error(f"Hit {e} when creating {name}")
+                        failedvms.append({'name': name, 'reason': str(e)})
+                        result = {'result': 'failure'}
+                    if result.get('result') == 'success':
+                        done.append(name)
+                        continue
+                    failed.append(name)
+                    if failfast:
+                        cancelled = [running.pop(f) for f in list(running) if f.cancel()] + list(pending)
+                        if cancelled:
+                            warning(f"Cancelling {','.join(cancelled)} as {name} failed")
+                        for vm in cancelled:
+                            failedvms.append({'name': vm, 'reason': f"cancelled as {name} failed"})
+                            failed.append(vm)
+                        pending.clear()
+        except KeyboardInterrupt:
+            warning("Cancelling pending vms")
+            for executor in executors.values():
+                executor.shutdown(wait=False, cancel_futures=True)
+            raise
+        for executor in executors.values():
+            executor.shutdown()
 
     def parse_files(self, name, files, basedir='.', onfly=None):
         if not files:
@@ -3326,13 +3556,13 @@ class Kconfig(Kbaseconfig):
                     pathdircmd = f'ls -a {pathdir} 2>&1'
                     pathdircmd = ssh(name, ip=ip, user='root', tunnel=self.tunnel, tunnelhost=self.tunnelhost,
                                      tunnelport=self.tunnelport, tunneluser=self.tunneluser, insecure=True,
-                                     cmd=pathdircmd, vmport=vmport)
+                                     cmd=pathdircmd, vmport=vmport, persist=self.sshpersist)
                     pathdirfiles = os.popen(pathdircmd).readlines()
                     if len(pathdirfiles) == 1 and 'No such file or directory' in pathdirfiles[0]:
                         createdircmd = f'mkdir -p {pathdir}'
                         createdircmd = ssh(name, ip=ip, user='root', tunnel=self.tunnel, tunnelhost=self.tunnelhost,
                                            tunnelport=self.tunnelport, tunneluser=self.tunneluser, insecure=True,
-                                           cmd=createdircmd, vmport=vmport)
+                                           cmd=createdircmd, vmport=vmport, persist=self.sshpersist)
                         os.popen(createdircmd)
                         pathdirfiles = []
                     else:
@@ -3345,7 +3575,7 @@ class Kconfig(Kbaseconfig):
                         f.write(entry['content'])
                     scpcmd = scp(name, ip=ip, user='root', source=source, destination=destination, tunnel=self.tunnel,
                                  tunnelhost=self.tunnelhost, tunnelport=self.tunnelport, tunneluser=self.tunneluser,
-                                 download=False, insecure=True, vmport=vmport)
+                                 download=False, insecure=True, vmport=vmport, persist=self.sshpersist)
                     os.system(scpcmd)
                     updated_files.append(destination)
         return updated_files
@@ -225,6 +225,10 @@ WAITCOMMAND = None
 BMC_USER = None
 BMC_PASSWORD = None
 BMC_MODEL = None
+CACHE_TTL = 5
+CONCURRENCY = 10
+FAILFAST = True
+SSHPERSIST = 60
 
 KSUSHYSERVICE = """[Unit]
 Description=Ksushy emulator service
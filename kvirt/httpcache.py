@@ -0,0 +1,112 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+On disk cache for the release metadata kcli pulls from the network
+"""
+
+from hashlib import sha256
+import json
+import os
+from shutil import which
+import ssl
+from subprocess import PIPE, run
+from tempfile import NamedTemporaryFile
+import time
+from urllib.error import HTTPError
+from urllib.request import urlopen, Request
+
+CACHEDIR = os.path.expanduser('~/.kcli/cache')
+HOUR = 3600
+DAY = 24 * HOUR
+
+
+def offline():
+    return os.environ.get('KCLI_OFFLINE', '').lower() in ['1', 'true', 'yes']
+
+
+def _path(key):
+    return f"{CACHEDIR}/{sha256(key.encode()).hexdigest()}.json"
+
+
+def _load(key):
+    try:
+        with open(_path(key)) as f:
+            entry = json.load(f)
+        return entry if entry.get('key') == key else None
+    except (OSError, ValueError):
+        return None
+
+
+def _save(key, entry):
+    entry['key'] = key
+    tmp = None
+    try:
+        os.makedirs(CACHEDIR, exist_ok=True)
+        with NamedTemporaryFile('w', dir=CACHEDIR, suffix='.tmp', delete=False) as f:
+            tmp = f.name
+            json.dump(entry, f)
+        os.replace(tmp, _path(key))
+    except OSError:
+        if tmp is not None and os.path.exists(tmp):
+            os.remove(tmp)
+
+
+def fetch(url, ttl=HOUR, timeout=None, insecure=False):
+    """
+    Returns the body of url, from the cache when it was fetched less than ttl seconds ago.
+    Older entries get revalidated through ETag/Last-Modified and are served as is when running
+    offline (KCLI_OFFLINE) or when the remote end can't be reached
+    """
+    from kvirt.common import warning
+    entry = _load(url)
+    if entry is not None and (offline() or time.time() - entry['timestamp'] < ttl):
+        return entry['body']
+    if entry is None and offline():
+        raise OSError(f"{url} not found in {CACHEDIR} and running offline")
+    request = Request(url)
+    if entry is not None:
+        if entry.get('etag') is not None:
+            request.add_header('If-None-Match', entry['etag'])
+        if entry.get('last_modified') is not None:
+            request.add_header('If-Modified-Since', entry['last_modified'])
+    context = ssl._create_unverified_context() if insecure else None
+    try:
+        with urlopen(request, timeout=timeout, context=context) as u:
+            body, headers = u.read().decode(), u.headers
+    except HTTPError as e:
+        if entry is None:
+            raise
+        elif e.code != 304:
+            warning(f"Using cached data for {url} as hit {e}")
+            return entry['body']
+        body, headers = entry['body'], e.headers
+    except OSError as e:
+        if entry is None:
+            raise
+        warning(f"Using cached data for {url} as hit {e}")
+        return entry['body']
+    entry = entry or {}
+    _save(url, {'timestamp': time.time(), 'body': body, 'etag': headers.get('ETag', entry.get('etag')),
+                'last_modified': headers.get('Last-Modified', entry.get('last_modified'))})
+    return body
+
+
+def fetch_json(url, ttl=HOUR, timeout=None):
+    return json.loads(fetch(url, ttl=ttl, timeout=timeout))
+
+
+def command(cmd, binary):
+    """
+    Returns the output of cmd, cached for as long as binary stays the same
+    """
+    path = which(binary)
+    if path is None:
+        return run(cmd, shell=True, stdout=PIPE, stderr=PIPE).stdout.decode()
+    key = f"{cmd} {path} {os.path.getmtime(path)}"
+    entry = _load(key)
+    if entry is not None:
+        return entry['body']
+    output = run(cmd, shell=True, stdout=PIPE, stderr=PIPE).stdout.decode()
+    if output:
+        _save(key, {'timestamp': time.time(), 'body': output})
+    return output
@@ -0,0 +1,211 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Local, content addressed cache of the images downloaded by kcli
+"""
+
+import bz2
+from concurrent.futures import ThreadPoolExecutor
+import fcntl
+from hashlib import sha256
+import json
+import lzma
+import os
+import re
+import threading
+from urllib.request import urlopen, Request
+import zlib
+
+IMAGEDIR = os.path.expanduser('~/.kcli/images')
+BLOCK = 1024 * 1024
+CHUNK = 64 * BLOCK
+WORKERS = 4
+TIMEOUT = 30
+CHECKSUMFILES = ['SHA256SUMS', 'CHECKSUM', 'sha256sum.txt']
+
+
+def _decompressor(url):
+    path = os.path.basename(url).split('?')[0]
+    if path.endswith('.xz'):
+        return lzma.LZMADecompressor()
+    elif path.endswith('.gz'):
+        return zlib.decompressobj(16 + zlib.MAX_WBITS)
+    elif path.endswith('.bz2'):
+        return bz2.BZ2Decompressor()
+    return None
+
+
+def _load_index():
+    try:
+        with open(f"{IMAGEDIR}/index.json") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def _save_index(index):
+    with open(f"{IMAGEDIR}/index.json.tmp", 'w') as f:
+        json.dump(index, f, indent=2)
+    os.replace(f"{IMAGEDIR}/index.json.tmp", f"{IMAGEDIR}/index.json")
+
+
+def _checksum(path):
+    checksum = sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(BLOCK), b''):
+            checksum.update(block)
+    return checksum.hexdigest()
+
+
+def _head(url):
+    try:
+        with urlopen(Request(url, method='HEAD'), timeout=TIMEOUT) as u:
+            return {'source': u.geturl(), 'length': int(u.headers.get('Content-Length', 0)) or None,
+                    'ranges': u.headers.get('Accept-Ranges') == 'bytes', 'etag': u.headers.get('ETag'),
+                    'last_modified': u.headers.get('Last-Modified')}
+    except (OSError, ValueError):
+        return None
+
+
+def _fresh(entry, head):
+    if head is None:
+        return True
+    for field in ['etag', 'last_modified', 'length']:
+        if entry.get(field) is not None and head[field] is not None and entry[field] != head[field]:
+            return False
+    return True
+
+
+def _published_checksum(url):
+    url = url.split('?')[0]
+    filename = os.path.basename(url)
+    for checksumurl in [f"{url}.sha256"] + [f"{os.path.dirname(url)}/{name}" for name in CHECKSUMFILES]:
+        try:
+            with urlopen(checksumurl, timeout=TIMEOUT) as u:
+                content = u.read(BLOCK).decode(errors='ignore')
+        except (OSError, ValueError):
+            continue
+        for line in content.splitlines():
+            bsd = re.match(r'SHA256 \((.+)\) = ([0-9a-fA-F]{64})$', line.strip())
+            gnu = re.match(r'([0-9a-fA-F]{64})(\s+\*?(.+))?$', line.strip())
+            if bsd is not None and os.path.basename(bsd.group(1)) == filename:
+                return bsd.group(2).lower()
+            elif gnu is not None and gnu.group(3) is None and checksumurl.endswith('.sha256'):
+                return gnu.group(1).lower()
+            elif gnu is not None and gnu.group(3) is not None and os.path.basename(gnu.group(3)) == filename:
+                return gnu.group(1).lower()
+    return None
+
+
+def _stream(url, target, decompressor):
+    checksum, rawchecksum = sha256(), sha256()
+    with urlopen(url) as u, open(target, 'wb') as f:
+        for block in iter(lambda: u.read(BLOCK), b''):
+            rawchecksum.update(block)
+            if decompressor is not None:
+                block = decompressor.decompress(block)
+            checksum.update(block)
+            f.write(block)
+        if decompressor is not None and hasattr(decompressor, 'flush'):
+            block = decompressor.flush()
+            checksum.update(block)
+            f.write(block)
+    return checksum.hexdigest(), rawchecksum.hexdigest()
+
+
+def _resumable(target, statefile, head):
+    if not os.path.exists(target) or os.path.getsize(target) != head['length'] or not os.path.exists(statefile):
+        return None
+    try:
+        with open(statefile) as f:
+            state = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if not isinstance(state, dict) or state.get('length') != head['length']:
+        return None
+    if head['etag'] is None and head['last_modified'] is None:
+        return None
+    if state.get('etag') != head['etag'] or state.get('last_modified') != head['last_modified']:
+        return None
+    return state['done']
+
+
+def _parallel(url, target, head):
+    size = head['length']
+    statefile = f"{target}.chunks"
+    chunks = range(0, size, CHUNK)
+    done = _resumable(target, statefile, head)
+    if done is None:
+        done = []
+        with open(target, 'wb') as f:
+            f.truncate(size)
+    state = {field: head[field] for field in ['etag', 'last_modified', 'length']}
+    lock = threading.Lock()
+    fd = os.open(target, os.O_WRONLY)
+
+    def download(start):
+        end = min(start + CHUNK, size) - 1
+        request = Request(url, headers={'Range': f'bytes={start}-{end}'})
+        offset = start
+        with urlopen(request) as u:
+            for block in iter(lambda: u.read(BLOCK), b''):
+                os.pwrite(fd, block, offset)
+                offset += len(block)
+        if offset != end + 1:
+            raise IOError(f"Short read on range {start}-{end} of {url}")
+        with lock:
+            done.append(start)
+            with open(statefile, 'w') as f:
+                json.dump({**state, 'done': done}, f)
+    try:
+        with ThreadPoolExecutor(max_workers=WORKERS) as executor:
+            for future in [executor.submit(download, start) for start in chunks if start not in done]:
+                future.result()
+    finally:
+        os.close(fd)
+    os.remove(statefile)
+    return _checksum(target)
+
+
+def get_image(url):
+    """
+    Returns the path of the uncompressed content of url, downloading it only when it's not cached yet or
+    when its ETag, Last-Modified or length changed upstream. Uncompressed images are fetched by ranges in
+    parallel and resumed when interrupted, as long as they didn't change upstream, compressed ones get
+    decompressed on the fly. Downloads are checked against the sha256 published next to the image, when there is one
+    """
+    os.makedirs(IMAGEDIR, exist_ok=True)
+    key = sha256(url.encode()).hexdigest()
+    with open(f"{IMAGEDIR}/{key}.lock", 'w') as lockfile:
+        fcntl.flock(lockfile, fcntl.LOCK_EX)
+        head = _head(url)
+        entry = _load_index().get(url)
+        if entry is not None:
+            path = f"{IMAGEDIR}/{entry['sha256']}"
+            if os.path.exists(path) and os.path.getsize(path) == entry['size'] and _fresh(entry, head):
+                return path
+        target = f"{IMAGEDIR}/{key}.partial"
+        decompressor = _decompressor(url)
+        source = head['source'] if head is not None else url
+        if decompressor is None and head is not None and head['ranges'] and (head['length'] or 0) > CHUNK:
+            checksum = rawchecksum = _parallel(source, target, head)
+        else:
+            checksum, rawchecksum = _stream(source, target, decompressor)
+        published = _published_checksum(url)
+        if published is not None and published not in [checksum, rawchecksum]:
+            os.remove(target)
+            raise ValueError(f"Checksum mismatch for {url}: expected {published}, got {rawchecksum}")
+        path = f"{IMAGEDIR}/{checksum}"
+        os.replace(target, path)
+        with open(f"{IMAGEDIR}/index.lock", 'w') as indexlock:
+            fcntl.flock(indexlock, fcntl.LOCK_EX)
+            index = _load_index()
+            previous = index.get(url, {}).get('sha256')
+            index[url] = {'sha256': checksum, 'size': os.path.getsize(path)}
+            if head is not None:
+                index[url].update({field: head[field] for field in ['etag', 'last_modified', 'length']})
+            _save_index(index)
+            if previous not in [None, checksum] and previous not in [e['sha256'] for e in index.values()]:
+                if os.path.exists(f"{IMAGEDIR}/{previous}"):
+                    os.remove(f"{IMAGEDIR}/{previous}")
+        return path
@@ -2,10 +2,8 @@ from base64 import b64encode
 from glob import glob
 from ipaddress import ip_address, ip_network
 import os
-from distutils.version import LooseVersion
-import json
+from kvirt import httpcache
 import sys
-from urllib.request import urlopen
 import yaml
 
 
@@ -68,9 +66,10 @@ def stable_release(release, tag_mode=False):
 
 def github_version(repo, version=None, tag_mode=False):
     if version is None or version == 'latest':
+        from distutils.version import LooseVersion
         obj = 'tags' if tag_mode else 'releases'
         tag_name = 'name' if tag_mode else 'tag_name'
-        data = json.loads(urlopen(f"https://api.github.com/repos/{repo}/{obj}", timeout=5).read())
+        data = httpcache.fetch_json(f"https://api.github.com/repos/{repo}/{obj}", timeout=5)
         if 'message' in data and data['message'] == 'Not Found':
             return ''
         tags = sorted([x[tag_name] for x in data if stable_release(x, tag_mode)], key=LooseVersion, reverse=True)
@@ -1,9 +1,12 @@
+from http.client import HTTPConnection, HTTPSConnection, HTTPException, RemoteDisconnected
+from urllib.error import HTTPError
 from urllib.parse import urlparse
-from urllib.request import urlopen, Request
 import base64
 import json
 import ssl
 import sys
+import threading
+import time
 
 
 class Redfish(object):
@@ -30,26 +33,68 @@ class Redfish(object):
         self.headers["Authorization"] = f"Basic {credentials}"
         self.baseurl = f"{p.scheme}://{p.netloc}"
         self.manager_url = None
+        self.iso_url = None
+        self.iso_actions = None
         self.context = ssl.create_default_context()
         if insecure:
             self.context.check_hostname = False
             self.context.verify_mode = ssl.CERT_NONE
+        self.conn = None
+        self.lock = threading.Lock()
+        self.last_reset = None
+
+    def _connect(self):
+        p = urlparse(self.baseurl)
+        if p.scheme == 'https':
+            return HTTPSConnection(p.netloc, context=self.context, timeout=60)
+        return HTTPConnection(p.netloc, timeout=60)
+
+    def _request(self, url, method='GET', data=None, headers=None):
+        p = urlparse(url)
+        path = f"{p.path}?{p.query}" if p.query else p.path
+        headers = headers or self.headers
+        with self.lock:
+            while True:
+                reused = self.conn is not None
+                if not reused:
+                    self.conn = self._connect()
+                try:
+                    self.conn.request(method, path, body=data, headers=headers)
+                    response = self.conn.getresponse()
+                    body = response.read()
+                    break
+                except (HTTPException, OSError) as e:
+                    self.conn.close()
+                    self.conn = None
+                    # only a kept alive connection closed by the bmc is known not to have processed the request
+                    if not reused or not isinstance(e, (RemoteDisconnected, BrokenPipeError)):
+                        raise
+        if response.status >= 400:
+            raise HTTPError(url, response.status, response.reason, response.headers, None)
+        return json.loads(body) if body.strip() else {}
+
+    def close(self):
+        with self.lock:
+            if self.conn is not None:
+                self.conn.close()
+                self.conn = None
 
     def get_manager_url(self):
-        request = Request(self.url, headers=self.headers)
-        response = json.loads(urlopen(request, context=self.context).read())
-        return f"{self.baseurl}{response['Links']['ManagedBy'][0]['@odata.id']}"
+        if self.manager_url is None:
+            response = self._request(self.url)
+            self.manager_url = f"{self.baseurl}{response['Links']['ManagedBy'][0]['@odata.id']}"
+        return self.manager_url
 
     def get_iso_url(self):
+        if self.iso_url is not None:
+            return self.iso_url
         manager_url = self.get_manager_url()
-        request = Request(f'{manager_url}', headers=self.headers)
-        results = json.loads(urlopen(request, context=self.context).read())
+        results = self._request(manager_url)
         if 'VirtualMedia' in results:
             virtual_media_url = results['VirtualMedia']['@odata.id']
         else:
             virtual_media_url = results['Status']['VirtualMedia']['@odata.id']
-        request = Request(f'{self.baseurl}{virtual_media_url}', headers=self.headers)
-        results = json.loads(urlopen(request, context=self.context).read())
+        results = self._request(f'{self.baseurl}{virtual_media_url}')
         if 'Oem' in results:
             odata = results['Oem']['Supermicro']['VirtualMediaConfig']['@odata.id']
         else:
@@ -57,28 +102,29 @@ class Redfish(object):
                 odata = member['@odata.id']
                 if odata.endswith('CD') or odata.endswith('Cd') or odata.endswith('2'):
                     break
-        return f'{self.baseurl}{odata}'
+        self.iso_url = f'{self.baseurl}{odata}'
+        return self.iso_url
 
     def get_iso_status(self):
         iso_url = self.get_iso_url()
         if self.debug:
             print(f"Getting {iso_url}")
-        request = Request(iso_url, headers=self.headers)
-        response = json.loads(urlopen(request, context=self.context).read())
+        response = self._request(iso_url)
         return f"{response['Image']}"
 
+    def get_iso_actions(self):
+        if self.iso_actions is None:
+            self.iso_actions = self._request(self.get_iso_url())['Actions']
+        return self.iso_actions
+
     def get_iso_eject_url(self):
-        iso_url = self.get_iso_url()
-        request = Request(iso_url, headers=self.headers)
-        actions = json.loads(urlopen(request, context=self.context).read())['Actions']
+        actions = self.get_iso_actions()
         target = '#IsoConfig.UnMount' if self.model == 'supermicro' else '#VirtualMedia.EjectMedia'
         t = actions[target]['target']
         return f"{self.baseurl}{t}"
 
     def get_iso_insert_url(self):
-        iso_url = self.get_iso_url()
-        request = Request(iso_url, headers=self.headers)
-        actions = json.loads(urlopen(request, context=self.context).read())['Actions']
+        actions = self.get_iso_actions()
         target = '#IsoConfig.Mount' if self.model == 'supermicro' else '#VirtualMedia.InsertMedia'
         t = actions[target]['target']
         return f"{self.baseurl}{t}"
@@ -88,12 +134,11 @@ class Redfish(object):
         data = json.dumps({}).encode('utf-8')
         if self.model == 'supermicro':
             headers['Content-Length'] = 0
-            # data = {}
+            data = None
         eject_url = self.get_iso_eject_url()
         if self.debug:
             print(f"Sending POST to {eject_url} with empty data")
-        request = Request(eject_url, headers=headers, method='POST', data=data)
-        urlopen(request, context=self.context)
+        self._request(eject_url, method='POST', data=data, headers=headers)
 
     def insert_iso(self, iso_url):
         headers = self.headers.copy()
@@ -105,20 +150,19 @@ class Redfish(object):
             if self.debug:
                 print(f"Sending PATCH to {cd_url} with data {data}")
             data = json.dumps(data).encode('utf-8')
-            request = Request(cd_url, data=data, headers=self.headers, method='PATCH')
-            urlopen(request, context=self.context)
+            self._request(cd_url, method='PATCH', data=data)
             headers['Content-Length'] = 0
-        data = {"Image": iso_url, "Inserted": True}
+            data = None
+        else:
+            data = {"Image": iso_url, "Inserted": True}
         insert_url = self.get_iso_insert_url()
         if self.debug:
             print(f"Sending POST to {insert_url} with data {data}")
-        data = json.dumps(data).encode('utf-8')
-        request = Request(insert_url, data=data, headers=headers)
-        urlopen(request, context=self.context)
+        data = json.dumps(data).encode('utf-8') if data is not None else None
+        self._request(insert_url, method='POST', data=data, headers=headers)
 
     def set_iso_once(self):
-        request = Request(self.url, headers=self.headers)
-        response = json.loads(urlopen(request, context=self.context).read())
+        response = self._request(self.url)
         currentboot = response['Boot']
         newboot = {}
         if currentboot['BootSourceOverrideEnabled'] != 'Once':
@@ -131,20 +175,17 @@ class Redfish(object):
         if self.debug:
             print(f"Sending PATCH to {self.url} with data {data}")
         data = json.dumps(data).encode('utf-8')
-        request = Request(self.url, data=data, headers=self.headers, method='PATCH')
-        urlopen(request, context=self.context)
+        self._request(self.url, method='PATCH', data=data)
 
     def restart(self):
-        request = Request(self.url, headers=self.headers)
-        response = json.loads(urlopen(request, context=self.context).read())
+        response = self._request(self.url)
         reset_type = 'On' if response['PowerState'] == 'Off' else 'ForceRestart'
         data = {"ResetType": reset_type}
         reset_url = f"{self.url}/Actions/ComputerSystem.Reset"
         if self.debug:
             print(f"Sending POST to {reset_url} with data {data}")
         data = json.dumps(data).encode('utf-8')
-        request = Request(reset_url, data=data, headers=self.headers)
-        urlopen(request, context=self.context)
+        self._request(reset_url, method='POST', data=data)
 
     def stop(self):
         data = {"ResetType": "ForceOff"}
@@ -152,8 +193,7 @@ class Redfish(object):
         if self.debug:
             print(f"Sending POST to {reset_url} with data {data}")
         data = json.dumps(data).encode('utf-8')
-        request = Request(reset_url, data=data, headers=self.headers)
-        urlopen(request, context=self.context)
+        self._request(reset_url, method='POST', data=data)
 
     def start(self):
         data = {"ResetType": "On"}
@@ -161,28 +201,47 @@ class Redfish(object):
         if self.debug:
             print(f"Sending POST to {reset_url} with {data}")
         data = json.dumps(data).encode('utf-8')
-        request = Request(reset_url, data=data, headers=self.headers)
-        urlopen(request, context=self.context)
+        self._request(reset_url, method='POST', data=data)
 
     def status(self):
-        request = Request(self.url, headers=self.headers)
-        response = json.loads(urlopen(request, context=self.context).read())
+        response = self._request(self.url)
         return response['PowerState']
 
     def info(self):
-        request = Request(self.url, headers=self.headers)
-        response = json.loads(urlopen(request, context=self.context).read())
+        response = self._request(self.url)
         return response
 
     def reset(self):
         manager_url = self.get_manager_url()
+        self.last_reset = self._request(manager_url).get('LastResetTime')
         reset_url = f"{manager_url}/Actions/Manager.Reset"
         data = {"ResetType": "GracefulRestart"}
         if self.debug:
             print(f"Sending POST to {reset_url} with data {data}")
         data = json.dumps(data).encode('utf-8')
-        request = Request(reset_url, headers=self.headers, method='POST', data=data)
-        urlopen(request, context=self.context)
+        self._request(reset_url, method='POST', data=data)
+
+    def wait_manager(self, timeout=600, interval=10):
+        """
+        Waits for the manager to report itself as enabled again after a reset, once it was seen going down
+        or its LastResetTime changed
+        """
+        manager_url = self.get_manager_url()
+        start = time.time()
+        down = False
+        while time.time() - start < timeout:
+            try:
+                response = self._request(manager_url)
+            except (HTTPError, HTTPException, OSError):
+                self.close()
+                down = True
+                response = None
+            if response is not None and response.get('Status', {}).get('State', 'Enabled') == 'Enabled':
+                lastreset = response.get('LastResetTime')
+                if down or (self.last_reset is not None and lastreset is not None and lastreset != self.last_reset):
+                    return True
+            time.sleep(interval)
+        return False
 
     def set_iso(self, iso_url):
         try:
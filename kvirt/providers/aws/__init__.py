@@ -10,6 +10,7 @@ from kvirt import common
 from kvirt.common import pprint, error, warning, get_ssh_pub_key
 from kvirt.defaults import METADATA_FIELDS
 import boto3
+from botocore.exceptions import ClientError
 import os
 import sys
 from socket import gethostbyname
@@ -47,6 +48,8 @@ class Kaws(object):
         self.access_key_secret = access_key_secret
         self.region = region
         self.keypair = keypair
+        self.image_sources = {}
+        self.flavor_specs = {}
         return
 
     def close(self):
@@ -385,17 +388,68 @@ class Kaws(object):
     def list(self):
         conn = self.conn
         vms = []
-        results = conn.describe_instances()
-        reservations = results['Reservations']
-        for reservation in reservations:
-            vm = reservation['Instances'][0]
-            name = vm['InstanceId']
+        instances = []
+        for page in conn.get_paginator('describe_instances').paginate():
+            for reservation in page['Reservations']:
+                instances.extend(reservation['Instances'])
+        self._get_image_sources([vm['ImageId'] for vm in instances])
+        self._get_flavor_specs([vm['InstanceType'] for vm in instances])
+        volumeids = [disk['Ebs']['VolumeId'] for vm in instances for disk in vm['BlockDeviceMappings'] if 'Ebs' in disk]
+        volumes = self._get_volumes(volumeids)
+        for vm in instances:
             try:
-                vms.append(self.info(name))
+                vms.append(self.info(vm['InstanceId'], vm=vm, volumes=volumes))
             except:
                 continue
         return sorted(vms, key=lambda x: x['name'])
 
+    def _get_image_sources(self, amids):
+        missing = [amid for amid in set(amids) if amid not in self.image_sources]
+        if missing:
+            try:
+                images = self.conn.describe_images(ImageIds=missing)['Images']
+            except ClientError:
+                images = []
+                for amid in missing:
+                    try:
+                        images.extend(self.conn.describe_images(ImageIds=[amid])['Images'])
+                    except ClientError:
+                        self.image_sources[amid] = amid
+            for image in images:
+                self.image_sources[image['ImageId']] = os.path.basename(image.get('ImageLocation', image['ImageId']))
+        return {amid: self.image_sources.get(amid, amid) for amid in amids}
+
+    def _get_flavor_specs(self, machinetypes):
+        missing = [machinetype for machinetype in set(machinetypes) if machinetype not in self.flavor_specs]
+        if missing:
+            paginator = self.conn.get_paginator('describe_instance_types')
+            try:
+                flavors = [flavor for page in paginator.paginate(InstanceTypes=missing)
+                           for flavor in page['InstanceTypes']]
+            except ClientError:
+                flavors = []
+                for machinetype in missing:
+                    try:
+                        flavors.extend(self.conn.describe_instance_types(InstanceTypes=[machinetype])['InstanceTypes'])
+                    except ClientError:
+                        continue
+            for flavor in flavors:
+                self.flavor_specs[flavor['InstanceType']] = {'cpus': flavor['VCpuInfo']['DefaultVCpus'],
+                                                             'memory': flavor['MemoryInfo']['SizeInMiB']}
+        return {machinetype: self.flavor_specs[machinetype] for machinetype in machinetypes
+                if machinetype in self.flavor_specs}
+
+    def _get_volumes(self, volumeids):
+        volumes = {}
+        volumeids = list(set(volumeids))
+        paginator = self.conn.get_paginator('describe_volumes')
+        for index in range(0, len(volumeids), 200):
+            filters = [{'Name': 'volume-id', 'Values': volumeids[index:index + 200]}]
+            for page in paginator.paginate(Filters=filters):
+                for volume in page['Volumes']:
+                    volumes[volume['VolumeId']] = volume
+        return volumes
+
     def console(self, name, tunnel=False, web=False):
         df = {'InstanceIds': [name]} if name.startswith('i-') else {'Filters': [{'Name': "tag:Name", 'Values': [name]}]}
         try:
@@ -494,10 +548,9 @@ class Kaws(object):
                         break
         return vpcid
 
-    def info(self, name, vm=None, debug=False):
+    def info(self, name, vm=None, debug=False, volumes=None):
         yamlinfo = {}
         conn = self.conn
-        resource = self.resource
         df = {'InstanceIds': [name]} if name.startswith('i-') else {'Filters': [{'Name': "tag:Name", 'Values': [name]}]}
         if vm is None:
             try:
@@ -510,8 +563,7 @@ class Kaws(object):
         state = vm['State']['Name']
         amid = vm['ImageId']
         az = vm['Placement']['AvailabilityZone']
-        image = resource.Image(amid)
-        source = os.path.basename(image.image_location)
+        source = self._get_image_sources([amid])[amid]
         yamlinfo['plan'] = ''
         yamlinfo['profile'] = ''
         if 'Tags' in vm:
@@ -524,9 +576,9 @@ class Kaws(object):
         yamlinfo['az'] = az
         yamlinfo['ip'] = vm.get('PublicIpAddress')
         machinetype = vm['InstanceType']
-        flavor = conn.describe_instance_types(InstanceTypes=[machinetype])['InstanceTypes'][0]
-        yamlinfo['cpus'] = flavor['VCpuInfo']['DefaultVCpus']
-        yamlinfo['memory'] = flavor['MemoryInfo']['SizeInMiB']
+        flavor = self._get_flavor_specs([machinetype])[machinetype]
+        yamlinfo['cpus'] = flavor['cpus']
+        yamlinfo['memory'] = flavor['memory']
         yamlinfo['flavor'] = machinetype
         yamlinfo['image'] = source
         yamlinfo['user'] = common.get_user(yamlinfo['image'])
@@ -543,10 +595,17 @@ class Kaws(object):
         if nets:
             yamlinfo['nets'] = nets
         disks = []
+        if volumes is None:
+            volumeids = [disk['Ebs']['VolumeId'] for disk in vm['BlockDeviceMappings'] if 'Ebs' in disk]
+            volumes = self._get_volumes(volumeids) if volumeids else {}
         for index, disk in enumerate(vm['BlockDeviceMappings']):
+            if 'Ebs' not in disk:
+                continue
             devname = disk['DeviceName']
             volumeid = disk['Ebs']['VolumeId']
-            volume = conn.describe_volumes(VolumeIds=[volumeid])['Volumes'][0]
+            volume = volumes.get(volumeid)
+            if volume is None:
+                continue
             disksize = volume['Size']
             diskformat = volume['AvailabilityZone']
             drivertype = volume['VolumeType']
@@ -0,0 +1,81 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Caching layer wrapping the provider objects built by Kconfig
+"""
+
+from copy import deepcopy
+import threading
+import time
+
+CACHED = ['info', 'dnsinfo', 'vm_ports', 'list_networks']
+VM_MUTATING = ['create', 'delete', 'start', 'stop', 'restart', 'clone', 'add_disk', 'delete_disk', 'add_nic',
+               'delete_nic', 'remove_cloudinit', 'export', 'start_vms', 'stop_vms', 'delete_vms']
+GLOBAL_MUTATING = ['create_network', 'delete_network', 'update_network', 'create_snapshot', 'delete_snapshot',
+                   'revert_snapshot']
+
+
+class Kcache(object):
+    """
+    Forwards everything to the wrapped provider, memoizing read calls for ttl seconds
+    and dropping the matching entries whenever a mutating call goes through
+    """
+    def __init__(self, k, ttl=5):
+        object.__setattr__(self, 'k', k)
+        object.__setattr__(self, 'ttl', ttl)
+        object.__setattr__(self, 'entries', {})
+        object.__setattr__(self, 'lock', threading.Lock())
+
+    def __getattr__(self, attr):
+        value = getattr(self.k, attr)
+        if not callable(value):
+            return value
+        elif attr in CACHED:
+            return self._cached(attr, value)
+        elif attr in VM_MUTATING or attr in GLOBAL_MUTATING or attr.startswith('update_'):
+            return self._invalidating(attr, value)
+        return value
+
+    def __setattr__(self, attr, value):
+        setattr(self.k, attr, value)
+
+    def invalidate(self, name=None):
+        with self.lock:
+            if name is None:
+                self.entries.clear()
+                return
+            for key in [key for key in self.entries if (key[1] and key[1][0] == name) or ('name', name) in key[2]]:
+                del self.entries[key]
+
+    def _cached(self, attr, method):
+        def cached(*args, **kwargs):
+            key = (attr, args, tuple(sorted(kwargs.items())))
+            try:
+                hash(key)
+            except TypeError:
+                return method(*args, **kwargs)
+            with self.lock:
+                entry = self.entries.get(key)
+            if entry is not None and time.time() - entry[0] < self.ttl:
+                return deepcopy(entry[1])
+            result = method(*args, **kwargs)
+            if self.ttl > 0 and result:
+                try:
+                    entry = (time.time(), deepcopy(result))
+                except Exception:
+                    return result
+                with self.lock:
+                    self.entries[key] = entry
+            return result
+        return cached
+
+    def _invalidating(self, attr, method):
+        def invalidating(*args, **kwargs):
+            name = args[0] if args else kwargs.get('name')
+            if attr in GLOBAL_MUTATING or not isinstance(name, str):
+                name = None
+            self.invalidate(name)
+            result = method(*args, **kwargs)
+            self.invalidate(name)
+            return result
+        return invalidating
@@ -1,5 +1,11 @@
+from collections import Counter
+from copy import deepcopy
 import glob
+from kvirt import common
+from kvirt.providers.sampleprovider import Kbase
 import os
+import threading
+import time
 
 
 class Kfake():
@@ -20,3 +26,198 @@ class Kfake():
 
     def list(self):
         return [{}]
+
+
+class Kmemory(Kbase):
+    """
+    Provider keeping vms, networks and images in memory, sleeping latency seconds on each call and counting them,
+    so that kcli code paths can be exercised and measured without any backend
+    """
+    def __init__(self, latency=0, images=[], networks=['default'], pools=['default'], debug=False):
+        self.conn = 'memory'
+        self.debug = debug
+        self.latency = float(latency)
+        self.calls = Counter()
+        self.lock = threading.Lock()
+        self.vms = {}
+        self.lastindex = 1
+        self.images = list(images)
+        self.networks = {network: {'cidr': '10.0.0.0/8', 'dhcp': True, 'type': 'routed', 'mode': 'nat',
+                                   'domain': network, 'plan': 'kvirt'} for network in networks}
+        self.pools = list(pools)
+
+    def _call(self, method):
+        with self.lock:
+            self.calls[method] += 1
+        if self.latency:
+            time.sleep(self.latency)
+
+    def close(self):
+        return
+
+    def exists(self, name):
+        self._call('exists')
+        return name in self.vms
+
+    def net_exists(self, name):
+        self._call('net_exists')
+        return name in self.networks
+
+    def create(self, name, virttype=None, profile='', flavor=None, plan='kvirt', cpumodel='Westmere',
+               cpuflags=[], cpupinning=[], numcpus=2, memory=512, guestid='guestrhel764', pool='default', image=None,
+               disks=[{'size': 10}], disksize=10, diskthin=True, diskinterface='virtio', nets=['default'], iso=None,
+               vnc=True, cloudinit=True, reserveip=False, reservedns=False, reservehost=False, start=True, keys=[],
+               cmds=[], ips=None, netmasks=None, gateway=None, nested=True, dns=None, domain=None, tunnel=False,
+               files=[], enableroot=True, overrides={}, tags=[], storemetadata=False, sharedfolders=[], kernel=None,
+               initrd=None, cmdline=None, placement=[], autostart=False, cpuhotplug=False, memoryhotplug=False,
+               numamode=None, numa=[], pcidevices=[], tpm=False, rng=False, metadata={}, securitygroups=[],
+               vmuser=None):
+        self._call('create')
+        if name in self.vms:
+            return {'result': 'failure', 'reason': f"VM {name} already exists"}
+        userdata = None
+        if cloudinit and image is not None and common.needs_ignition(image):
+            version = common.ignition_version(image)
+            userdata = common.ignition(name=name, keys=keys, cmds=cmds, nets=nets, gateway=gateway, dns=dns,
+                                       domain=domain, files=files, enableroot=enableroot, overrides=overrides,
+                                       version=version, plan=plan, image=image, vmuser=vmuser)
+        elif cloudinit:
+            userdata = common.cloudinit(name=name, keys=keys, cmds=cmds, nets=nets, gateway=gateway, dns=dns,
+                                        domain=domain, files=files, enableroot=enableroot, overrides=overrides,
+                                        storemetadata=storemetadata, image=image, vmuser=vmuser)[0]
+        vmdisks = []
+        for diskindex, disk in enumerate(disks):
+            size = disk.get('size', disksize) if isinstance(disk, dict) else disk
+            vmdisks.append({'device': f'vd{chr(97 + diskindex)}', 'size': int(size), 'format': 'qcow2',
+                            'type': diskinterface, 'path': f'/var/lib/libvirt/images/{name}_{diskindex}.img'})
+        with self.lock:
+            if name in self.vms:
+                return {'result': 'failure', 'reason': f"VM {name} already exists"}
+            self.lastindex += 1
+            index = self.lastindex
+            vmnets = []
+            for netindex, net in enumerate(nets):
+                netname = net if isinstance(net, str) else net.get('name', 'default')
+                mac = f'52:54:00:{index // 65536 % 256:02x}:{index // 256 % 256:02x}:{index % 256:02x}'
+                vmnets.append({'device': f'eth{netindex}', 'mac': mac, 'net': netname, 'type': 'virtio'})
+            self.vms[name] = {'name': name, 'status': 'up' if start else 'down', 'autostart': autostart,
+                              'plan': plan, 'profile': profile, 'image': image, 'flavor': flavor,
+                              'memory': int(memory), 'cpus': int(numcpus), 'nets': vmnets, 'disks': vmdisks,
+                              'ip': f'10.{index // 65536 % 256}.{index // 256 % 256}.{index % 256}',
+                              'user': common.get_user(image or ''), 'userdata': userdata}
+        return {'result': 'success'}
+
+    def start(self, name):
+        self._call('start')
+        if name not in self.vms:
+            return {'result': 'failure', 'reason': f"VM {name} not found"}
+        self.vms[name]['status'] = 'up'
+        return {'result': 'success'}
+
+    def stop(self, name, soft=False):
+        self._call('stop')
+        if name not in self.vms:
+            return {'result': 'failure', 'reason': f"VM {name} not found"}
+        self.vms[name]['status'] = 'down'
+        return {'result': 'success'}
+
+    def restart(self, name):
+        self._call('restart')
+        return {'result': 'success'}
+
+    def status(self, name):
+        self._call('status')
+        return self.vms[name]['status'] if name in self.vms else None
+
+    def list(self):
+        self._call('list')
+        return [self._info(name) for name in sorted(self.vms)]
+
+    def info(self, name, output='plain', fields=[], values=False, vm=None, debug=False):
+        self._call('info')
+        if name not in self.vms:
+            return {}
+        return self._info(name)
+
+    def _info(self, name):
+        vm = self.vms[name]
+        return {key: deepcopy(vm[key]) for key in vm if key != 'userdata'}
+
+    def ip(self, name):
+        self._call('ip')
+        return self.vms[name]['ip'] if name in self.vms else None
+
+    def volumes(self, iso=False):
+        self._call('volumes')
+        return [image for image in self.images if image.endswith('.iso') == iso]
+
+    def delete(self, name, snapshots=False):
+        self._call('delete')
+        if self.vms.pop(name, None) is None:
+            return {'result': 'failure', 'reason': f"VM {name} not found"}
+        return {'result': 'success'}
+
+    def dnsinfo(self, name):
+        self._call('dnsinfo')
+        return None, None
+
+    def update_memory(self, name, memory):
+        self._call('update_memory')
+        self.vms[name]['memory'] = int(memory)
+        return {'result': 'success'}
+
+    def update_cpus(self, name, numcpus):
+        self._call('update_cpus')
+        self.vms[name]['cpus'] = int(numcpus)
+        return {'result': 'success'}
+
+    def update_start(self, name, start=True):
+        self._call('update_start')
+        self.vms[name]['autostart'] = start
+        return {'result': 'success'}
+
+    def add_disk(self, name, size=1, pool=None, thin=True, image=None, shareable=False, existing=None,
+                 interface='virtio', novm=False, overrides={}):
+        self._call('add_disk')
+        disks = self.vms[name]['disks']
+        disks.append({'device': f'vd{chr(97 + len(disks))}', 'size': int(size), 'format': 'qcow2',
+                      'type': interface, 'path': f'/var/lib/libvirt/images/{name}_{len(disks)}.img'})
+        return {'result': 'success'}
+
+    def add_nic(self, name, network):
+        self._call('add_nic')
+        nets = self.vms[name]['nets']
+        nets.append({'device': f'eth{len(nets)}', 'mac': '52:54:00:ff:ff:ff', 'net': network, 'type': 'virtio'})
+        return {'result': 'success'}
+
+    def add_image(self, url, pool, short=None, cmd=None, name=None, size=None, convert=False):
+        self._call('add_image')
+        self.images.append(name or os.path.basename(url))
+        return {'result': 'success'}
+
+    def create_network(self, name, cidr=None, dhcp=True, nat=True, domain=None, plan='kvirt', overrides={}):
+        self._call('create_network')
+        self.networks[name] = {'cidr': cidr, 'dhcp': dhcp, 'type': 'routed', 'mode': 'nat' if nat else 'isolated',
+                               'domain': domain or name, 'plan': plan}
+        return {'result': 'success'}
+
+    def delete_network(self, name=None, cidr=None):
+        self._call('delete_network')
+        self.networks.pop(name, None)
+        return {'result': 'success'}
+
+    def list_networks(self):
+        self._call('list_networks')
+        return deepcopy(self.networks)
+
+    def list_pools(self):
+        self._call('list_pools')
+        return list(self.pools)
+
+    def get_pool_path(self, pool):
+        self._call('get_pool_path')
+        return f'/var/lib/libvirt/images/{pool}'
+
+    def vm_ports(self, name):
+        self._call('vm_ports')
+        return [net['net'] for net in self.vms[name]['nets']] if name in self.vms else []
@@ -4,6 +4,8 @@
 IBM Cloud provider class
 """
 
+from concurrent.futures import ThreadPoolExecutor
+from functools import wraps
 from ipaddress import ip_network
 from kvirt import common
 from kvirt.common import pprint, error, warning, get_ssh_pub_key
@@ -20,10 +22,14 @@ from ibm_cloud_networking_services import DnsRecordsV1, ZonesV1
 import json
 import os
 from shutil import which
-from time import sleep
+import threading
+from time import sleep, time
+from urllib.parse import parse_qs, urlparse
 from urllib.request import urlopen, Request
 import webbrowser
 
+INVENTORY_TTL = 10
+
 
 def get_zone_href(region, zone):
     return f"https://{region}.iaas.cloud.ibm.com/v1/regions/{region}/zones/{zone}"
@@ -33,6 +39,16 @@ def get_s3_endpoint(region):
     return f'https://s3.{region}.cloud-object-storage.appdomain.cloud'
 
 
+def invalidating(method):
+    @wraps(method)
+    def wrapper(self, *args, **kwargs):
+        try:
+            return method(self, *args, **kwargs)
+        finally:
+            self._invalidate()
+    return wrapper
+
+
 def get_service_instance_id(iam_api_key, name):
     if 'crn' in name:
         return name
@@ -86,6 +102,8 @@ class Kibm(object):
         self.region = region
         self.zone = zone if region in zone else f"{region}-2"
         self.vpc = vpc
+        self.inventory = {}
+        self.inventory_lock = threading.Lock()
 
     def close(self):
         return
@@ -107,6 +125,7 @@ class Kibm(object):
     def disk_exists(self, pool, name):
         print("not implemented")
 
+    @invalidating
     def create(self, name, virttype=None, profile='', flavor=None, plan='kvirt',
                cpumodel='Westmere', cpuflags=[], cpupinning=[], numcpus=2, memory=512,
                guestid='guestrhel764', pool='default', image=None,
@@ -120,7 +139,7 @@ class Kibm(object):
                cpuhotplug=False, memoryhotplug=False, numamode=None, numa=[], pcidevices=[], tpm=False,
                placement=[], autostart=False, rng=False, metadata={}, securitygroups=[], vmuser=None):
         try:
-            vpcs = self.conn.list_vpcs().result['vpcs']
+            vpcs = self._get_vpcs()
             for vpc in vpcs:
                 if self.vpc == vpc['name']:
                     vpc_id = vpc['id']
@@ -134,7 +153,7 @@ class Kibm(object):
             return {'result': 'failure', 'reason': f"VM {name} already exists"}
         key_list = []
         try:
-            pub_ssh_keys = [x['id'] for x in self.conn.list_keys().result['keys']]
+            pub_ssh_keys = [x['id'] for x in self._inventory('list_keys', 'keys')]
             if not pub_ssh_keys:
                 resource_group = {'id': resource_group_id}
                 publickeyfile = get_ssh_pub_key()
@@ -271,6 +290,7 @@ class Kibm(object):
             self.reserve_dns(name, nets=nets, domain=domain, alias=alias, instanceid=name)
         return {'result': 'success'}
 
+    @invalidating
     def start(self, name):
         try:
             vm = self._get_vm(name)
@@ -286,6 +306,7 @@ class Kibm(object):
             return {'result': 'failure', 'reason': f'Unable to start VM {name}. Hit {e}'}
         return {'result': 'success'}
 
+    @invalidating
     def stop(self, name, soft=False):
         try:
             vm = self._get_vm(name)
@@ -316,6 +337,7 @@ class Kibm(object):
         print("not implemented")
         return {'result': 'success'}
 
+    @invalidating
     def restart(self, name):
         try:
             vm = self._get_vm(name)
@@ -354,16 +376,20 @@ class Kibm(object):
             error(f'Unable to retrieve VMs. Hit {e}')
             return vms
         try:
-            floating_ips = {x['target']['id']: x for x in self.conn.list_floating_ips(
-            ).result['floating_ips'] if x['status'] == 'available' and 'target' in x}
+            floating_ips = self._get_floating_ips()
+            volumes = self._get_volumes()
         except ApiException as e:
-            error(f'Unable to retrieve floating ips. Hit {e}')
+            error(f'Unable to retrieve floating ips or volumes. Hit {e}')
             return vms
-        for vm in provisioned_vms:
+
+        def info(vm):
             try:
-                vms.append(self.info(vm['name'], vm=vm, ignore_volumes=True, floating_ips=floating_ips))
+                return self.info(vm['name'], vm=vm, floating_ips=floating_ips, volumes=volumes)
             except:
-                continue
+                return None
+        if provisioned_vms:
+            with ThreadPoolExecutor(max_workers=min(len(provisioned_vms), 10)) as executor:
+                vms = [vm for vm in executor.map(info, provisioned_vms) if vm]
         return sorted(vms, key=lambda x: x['name'])
 
     def console(self, name, tunnel=False, web=False):
@@ -415,7 +441,7 @@ class Kibm(object):
         return None
 
     def info(self, name, output='plain', fields=[], values=False, vm=None, ignore_volumes=False, floating_ips=None,
-             debug=False):
+             volumes=None, debug=False):
         yamlinfo = {}
         if vm is None:
             try:
@@ -429,8 +455,7 @@ class Kibm(object):
         state = vm['status']
         if floating_ips is None:
             try:
-                floating_ips = {x['target']['id']: x for x in
-                                self.conn.list_floating_ips().result['floating_ips'] if x['status'] == 'available'}
+                floating_ips = self._get_floating_ips()
             except ApiException as e:
                 error(f'Unable to retrieve floating ips. Hit {e}')
                 return yamlinfo
@@ -485,12 +510,13 @@ class Kibm(object):
             yamlinfo['nets'] = nets
             # yamlinfo['primary_network_interface'] = vm['primary_network_interface']['name']
         disks = []
-        if ignore_volumes is False:
+        if ignore_volumes is False and volumes is None:
             try:
                 volumes = self._get_volumes()
             except ApiException as e:
                 error(f"Unable to retrieve volume information. Hit {e}")
                 return yamlinfo
+        if volumes is not None:
             for attachment in vm['volume_attachments']:
                 devname = attachment['volume']['name']
                 if devname in volumes:
@@ -514,9 +540,10 @@ class Kibm(object):
             if vm is None:
                 error(f'VM {name} not found')
                 return ""
+            floating_ips = self._get_floating_ips()
             for network in vm['network_interfaces']:
-                response = self.conn.list_instance_network_interface_floating_ips(vm['id'], network['id'])
-                ips.extend([x['address'] for x in response.result['floating_ips'] if x['status'] == 'available'])
+                if network['id'] in floating_ips:
+                    ips.append(floating_ips[network['id']]['address'])
         except ApiException as e:
             error(f"Unable to retrieve IP for {name}. Hit {e}")
         return ','.join(ips)
@@ -533,7 +560,7 @@ class Kibm(object):
     def volumes(self, iso=False):
         image_list = []
         try:
-            images = self.conn.list_images().result['images']
+            images = self._inventory('list_images', 'images')
             for image in images:
                 if image['status'] not in ['available', 'deprecated'] or \
                         image['operating_system']['name'].startswith('windows'):
@@ -544,6 +571,7 @@ class Kibm(object):
             return image_list
         return sorted(image_list, key=str.lower)
 
+    @invalidating
     def delete(self, name, snapshots=False):
         conn = self.conn
         try:
@@ -648,6 +676,7 @@ class Kibm(object):
     def update_iso(self, name, iso):
         print("not implemented")
 
+    @invalidating
     def update_flavor(self, name, flavor):
         try:
             vm = self._get_vm(name)
@@ -684,6 +713,7 @@ class Kibm(object):
         print("not implemented")
         return {}
 
+    @invalidating
     def add_nic(self, name, network):
         try:
             vm = self._get_vm(name)
@@ -710,6 +740,7 @@ class Kibm(object):
         except ApiException as e:
             error(f'Unable to create NIC. Hit {e}')
 
+    @invalidating
     def delete_nic(self, name, interface):
         try:
             vm = self._get_vm(name)
@@ -731,6 +762,7 @@ class Kibm(object):
     def create_pool(self, name, poolpath, pooltype='dir', user='qemu', thinpool=None):
         print("not implemented")
 
+    @invalidating
     def delete_image(self, image, pool=None):
         try:
             image = self._get_image(image)
@@ -746,6 +778,7 @@ class Kibm(object):
             return {'result': 'failure', 'reason': f'Unable to delete image. Hit {e}'}
         return {'result': 'success'}
 
+    @invalidating
     def add_image(self, url, pool, short=None, cmd=None, name=None, size=None, convert=False):
         cos_id = self.cos_resource_instance_id.split(':')[7]
         identity_client = IamIdentityV1(authenticator=self.authenticator)
@@ -825,6 +858,7 @@ class Kibm(object):
             self.delete_from_bucket(pool, shortimage_unzipped)
         return {'result': 'success'}
 
+    @invalidating
     def create_network(self, name, cidr=None, dhcp=True, nat=True, domain=None, plan='kvirt', overrides={}):
         if cidr is not None:
             try:
@@ -834,7 +868,7 @@ class Kibm(object):
             if str(network.version) == "6":
                 return {'result': 'failure', 'reason': 'IPv6 is not allowed'}
         try:
-            vpcs = self.conn.list_vpcs().result['vpcs']
+            vpcs = self._get_vpcs()
             for vpc in vpcs:
                 if self.vpc == vpc['name']:
                     vpc_id = vpc['id']
@@ -858,6 +892,7 @@ class Kibm(object):
             return {'result': 'failure', 'reason': f'Unable to create network. Hit {e}'}
         return {'result': 'success'}
 
+    @invalidating
     def delete_network(self, name=None, cidr=None):
         try:
             subnets = self._get_subnets()
@@ -882,14 +917,14 @@ class Kibm(object):
     def list_networks(self):
         networks = {}
         subnets = {}
-        for subnet in self.conn.list_subnets().result['subnets']:
+        for subnet in self._get_subnets():
             newsubnet = {'name': subnet['name'], 'cidr': subnet['ipv4_cidr_block']}
             vpcid = subnet['vpc']['id']
             if vpcid in subnets:
                 subnets[vpcid].append(newsubnet)
             else:
                 subnets[vpcid] = [newsubnet]
-        for net in self.conn.list_vpcs().result['vpcs']:
+        for net in self._get_vpcs():
             networkname = net['name']
             vpcid = net['id']
             dhcp = net['default_network_acl']['name']
@@ -1127,7 +1162,7 @@ class Kibm(object):
             return results
         if lbs:
             vms_by_addresses = {}
-            for vm in self.conn.list_instances().get_result()['instances']:
+            for vm in self._get_vms():
                 vms_by_addresses[vm['network_interfaces'][0]['primary_ipv4_address']] = vm['name']
         for lb in lbs:
             protocols = set()
@@ -1332,11 +1367,35 @@ class Kibm(object):
             return None
         return result['instances'][0]
 
+    def _paginate(self, method, key, **kwargs):
+        results = []
+        while True:
+            result = getattr(self.conn, method)(limit=100, **kwargs).result
+            results.extend(result[key])
+            if 'next' not in result:
+                return results
+            kwargs['start'] = parse_qs(urlparse(result['next']['href']).query)['start'][0]
+
+    def _inventory(self, method, key, **kwargs):
+        """
+        Returns every page of a listing, sharing it for INVENTORY_TTL seconds or until a change goes through
+        """
+        cachekey = (method, tuple(sorted(kwargs.items())))
+        with self.inventory_lock:
+            entry = self.inventory.get(cachekey)
+        if entry is not None and time() - entry[0] < INVENTORY_TTL:
+            return entry[1]
+        results = self._paginate(method, key, **kwargs)
+        with self.inventory_lock:
+            self.inventory[cachekey] = (time(), results)
+        return results
+
+    def _invalidate(self):
+        with self.inventory_lock:
+            self.inventory.clear()
+
     def _get_vms(self):
-        result = self.conn.list_instances().result
-        if result['total_count'] == 0:
-            return []
-        return result['instances']
+        return self._inventory('list_instances', 'instances')
 
     def _get_subnet(self, name):
         subnets = self._get_subnets()
@@ -1346,7 +1405,17 @@ class Kibm(object):
         return None
 
     def _get_subnets(self):
-        return self.conn.list_subnets().result['subnets']
+        return self._inventory('list_subnets', 'subnets')
+
+    def _get_vpcs(self):
+        return self._inventory('list_vpcs', 'vpcs')
+
+    def _get_security_groups(self):
+        return self._inventory('list_security_groups', 'security_groups')
+
+    def _get_floating_ips(self):
+        return {x['target']['id']: x for x in self._inventory('list_floating_ips', 'floating_ips')
+                if x['status'] == 'available' and 'target' in x}
 
     def _get_image(self, name):
         result = self.conn.list_images(name=name).result
@@ -1358,7 +1427,7 @@ class Kibm(object):
         return {x['name']: x for x in self.conn.list_instance_profiles().result['profiles']}
 
     def _get_volumes(self):
-        return {x['name']: x for x in self.conn.list_volumes().result['volumes']}
+        return {x['name']: x for x in self._inventory('list_volumes', 'volumes')}
 
     def _get_dns_zone(self, domain):
         try:
@@ -1384,9 +1453,10 @@ class Kibm(object):
             return None
         return dnszone
 
+    @invalidating
     def create_security_group(self, name, overrides={}):
         ports = overrides.get('ports', [])
-        vpc_id = [net['id'] for net in self.conn.list_vpcs().result['vpcs'] if net['name'] == self.vpc][0]
+        vpc_id = [net['id'] for net in self._get_vpcs() if net['name'] == self.vpc][0]
         vpc_identity_model = {'id': vpc_id}
         rules = []
         security_group_rule_prototype_model = {}
@@ -1418,8 +1488,9 @@ class Kibm(object):
         response = self.conn.create_security_group(vpc_identity_model, name=name, rules=rules).result
         return response['id']
 
+    @invalidating
     def delete_security_group(self, name):
-        security_groups = self.conn.list_security_groups().result['security_groups']
+        security_groups = self._get_security_groups()
         matching_sgs = [x for x in security_groups if x['name'] == name]
         if matching_sgs:
             security_group = matching_sgs[0]
@@ -1442,4 +1513,4 @@ class Kibm(object):
         return {'result': 'success'}
 
     def list_security_groups(self, network=None):
-        return [x['name'] for x in self.conn.list_security_groups().result['security_groups']]
+        return [x['name'] for x in self._get_security_groups()]
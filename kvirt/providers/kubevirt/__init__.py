@@ -6,7 +6,8 @@ Kubevirt Provider Class
 
 import base64
 from ipaddress import ip_address
-from kubernetes import client
+from kubernetes import client, watch
+from kubernetes.client.rest import ApiException
 from kvirt.cluster.kubecommon import Kubecommon
 from kvirt import common
 from kvirt.common import error, pprint, warning
@@ -14,6 +15,7 @@ from kvirt.defaults import IMAGES, UBUNTUS, METADATA_FIELDS
 import datetime
 import os
 import sys
+import threading
 import time
 import yaml
 import urllib3
@@ -49,6 +51,96 @@ def _base_image_size(image):
     return size
 
 
+class Kwaiter(object):
+    """
+    Shares a single watch stream on a resource kind and namespace between all the callers waiting on objects
+    """
+    def __init__(self, func, *args):
+        self.func = func
+        self.args = args
+        self.lock = threading.Lock()
+        self.waiters = []
+        self.thread = None
+
+    def wait(self, names, done, failed=None, timeout=120):
+        waiter = {'names': set(names), 'done': done, 'failed': failed, 'failures': set(),
+                  'event': threading.Event()}
+        kwargs = {'field_selector': f"metadata.name={names[0]}"} if len(names) == 1 else {}
+        with self.lock:
+            self.waiters.append(waiter)
+            if self.thread is None:
+                self.thread = threading.Thread(target=self._watch, daemon=True)
+                self.thread.start()
+        try:
+            items, _ = self._list(**kwargs)
+            with self.lock:
+                for obj in items:
+                    self._check(waiter, obj)
+            waiter['event'].wait(timeout)
+        finally:
+            with self.lock:
+                if waiter in self.waiters:
+                    self.waiters.remove(waiter)
+        return not waiter['names'] and not waiter['failures']
+
+    def _list(self, **kwargs):
+        result = self.func(*self.args, **kwargs)
+        if isinstance(result, dict):
+            return result['items'], result['metadata']['resourceVersion']
+        return result.items, result.metadata.resource_version
+
+    def _check(self, waiter, obj):
+        name = obj['metadata']['name'] if isinstance(obj, dict) else obj.metadata.name
+        if name not in waiter['names']:
+            return
+        if waiter['failed'] is not None and waiter['failed'](obj):
+            waiter['names'].discard(name)
+            waiter['failures'].add(name)
+        elif waiter['done'](obj):
+            waiter['names'].discard(name)
+        if not waiter['names']:
+            waiter['event'].set()
+
+    def _dispatch(self, obj):
+        with self.lock:
+            for waiter in self.waiters:
+                self._check(waiter, obj)
+            self.waiters = [waiter for waiter in self.waiters if waiter['names']]
+            return bool(self.waiters)
+
+    def _watch(self):
+        resource_version = None
+        while True:
+            try:
+                if resource_version is None:
+                    items, resource_version = self._list()
+                    for obj in items:
+                        self._dispatch(obj)
+                for event in watch.Watch().stream(self.func, *self.args, resource_version=resource_version,
+                                                  timeout_seconds=30):
+                    obj = event['object']
+                    if event['type'] == 'ERROR':
+                        resource_version = None
+                        break
+                    if isinstance(obj, dict):
+                        resource_version = obj['metadata']['resourceVersion']
+                    else:
+                        resource_version = obj.metadata.resource_version
+                    if not self._dispatch(obj):
+                        break
+            except ApiException as e:
+                resource_version = None
+                if e.status != 410:
+                    time.sleep(2)
+            except Exception:
+                resource_version = None
+                time.sleep(2)
+            with self.lock:
+                if not self.waiters:
+                    self.thread = None
+                    return
+
+
 class Kubevirt(Kubecommon):
     """
 
@@ -73,6 +165,7 @@ class Kubevirt(Kubecommon):
         self.embed_userdata = embed_userdata
         self.first_consumer = first_consumer
         self.kubeconfig_file = kubeconfig_file
+        self.waiters = {}
         return
 
     def close(self):
@@ -570,11 +663,14 @@ class Kubevirt(Kubecommon):
         crds = self.crds
         namespace = self.namespace
         vms = []
+        vmis = {}
+        for vmi in crds.list_namespaced_custom_object(DOMAIN, VERSION, namespace, 'virtualmachineinstances')["items"]:
+            vmis[vmi['metadata']['name']] = vmi
         for vm in crds.list_namespaced_custom_object(DOMAIN, VERSION, namespace, 'virtualmachines')["items"]:
             metadata = vm.get("metadata")
             name = metadata["name"]
             try:
-                vms.append(self.info(name, vm=vm))
+                vms.append(self.info(name, vm=vm, vmi=vmis.get(name, {})))
             except:
                 continue
         return sorted(vms, key=lambda x: x['name'])
@@ -668,7 +764,7 @@ class Kubevirt(Kubecommon):
                 domain = annotations['kcli/domain']
         return dnsclient, domain
 
-    def info(self, name, vm=None, debug=False):
+    def info(self, name, vm=None, debug=False, vmi=None):
         yamlinfo = {}
         core = self.core
         crds = self.crds
@@ -714,7 +810,11 @@ class Kubevirt(Kubecommon):
         ips = []
         if running:
             try:
-                runvm = crds.get_namespaced_custom_object(DOMAIN, VERSION, namespace, 'virtualmachineinstances', name)
+                if vmi is not None:
+                    runvm = vmi
+                else:
+                    runvm = crds.get_namespaced_custom_object(DOMAIN, VERSION, namespace, 'virtualmachineinstances',
+                                                              name)
                 status = runvm.get('status')
                 if status:
                     state = status.get('phase').replace('Running', 'up')
@@ -1466,68 +1566,47 @@ class Kubevirt(Kubecommon):
         storageclass = storageapi.read_storage_class(pool)
         return storageclass.provisioner
 
+    def waiter(self, kind, namespace):
+        if (kind, namespace) not in self.waiters:
+            listers = {'pvc': self.core.list_namespaced_persistent_volume_claim, 'pod': self.core.list_namespaced_pod,
+                       'service': self.core.list_namespaced_service, 'job': self.batch_v1.list_namespaced_job}
+            return self.waiters.setdefault((kind, namespace), Kwaiter(listers[kind], namespace))
+        return self.waiters[(kind, namespace)]
+
     def pvc_bound(self, volname, namespace, first_consumer=False):
+        volnames = volname if isinstance(volname, list) else [volname]
         if first_consumer:
-            job_name = f"temp-{volname}"
-            container = {'name': 'hello', 'image': 'quay.io/karmab/kubectl', 'command': ["echo", "hello"]}
-            volume = {'name': volname, 'persistentVolumeClaim': {'claimName': volname}}
-            template = {'metadata': {'labels': {"app": "hello"}},
-                        'spec': {'containers': [container], 'volumes': [volume], 'restartPolicy': "Never"}}
-            spec = {'template': template, 'backoff_limit': 0, 'ttlSecondsAfterFinished': 10}
-            job = {'api_version': 'batch/v1', 'kind': 'Job', 'metadata': {'name': job_name}, 'spec': spec}
-            self.batch_v1.create_namespaced_job(body=job, namespace=namespace)
-            completed = False
-            while not completed:
-                response = self.batch_v1.read_namespaced_job_status(name=job_name, namespace=namespace)
-                if response.status.succeeded is not None or response.status.failed is not None:
-                    completed = True
-        core = self.core
-        pvctimeout = 120
-        pvcruntime = 0
-        pvcstatus = ''
-        while pvcstatus != 'Bound':
-            if pvcruntime >= pvctimeout:
-                return False
-            pvc = core.read_namespaced_persistent_volume_claim(volname, namespace)
-            pvcstatus = pvc.status.phase
-            time.sleep(2)
-            pprint(f"Waiting for pvc {volname} to get bound...")
-            pvcruntime += 2
-        return True
+            jobs = []
+            for volname in volnames:
+                job_name = f"temp-{volname}"
+                container = {'name': 'hello', 'image': 'quay.io/karmab/kubectl', 'command': ["echo", "hello"]}
+                volume = {'name': volname, 'persistentVolumeClaim': {'claimName': volname}}
+                template = {'metadata': {'labels': {"app": "hello"}},
+                            'spec': {'containers': [container], 'volumes': [volume], 'restartPolicy': "Never"}}
+                spec = {'template': template, 'backoff_limit': 0, 'ttlSecondsAfterFinished': 10}
+                job = {'api_version': 'batch/v1', 'kind': 'Job', 'metadata': {'name': job_name}, 'spec': spec}
+                self.batch_v1.create_namespaced_job(body=job, namespace=namespace)
+                jobs.append(job_name)
+            self.waiter('job', namespace).wait(jobs, lambda j: j.status.succeeded is not None or
+                                               j.status.failed is not None, timeout=120)
+        pprint(f"Waiting for pvc {','.join(volnames)} to get bound...")
+        return self.waiter('pvc', namespace).wait(volnames, lambda p: p.status.phase == 'Bound', timeout=120)
 
     def import_completed(self, volname, namespace):
-        core = self.core
-        pvctimeout = 1200
-        pvcruntime = 0
-        phase = ''
-        while phase != 'Succeeded':
-            if pvcruntime >= pvctimeout:
-                return False
-            pvc = core.read_namespaced_persistent_volume_claim(volname, namespace)
-            # pod = pvc.metadata.annotations['cdi.kubevirt.io/storage.import.importPodName']
-            if 'cdi.kubevirt.io/storage.pod.phase' not in pvc.metadata.annotations:
-                phase = 'Pending'
-            else:
-                phase = pvc.metadata.annotations['cdi.kubevirt.io/storage.pod.phase']
-            time.sleep(5)
-            pprint("Waiting for import to complete...")
-            pvcruntime += 5
-        return True
+        volnames = volname if isinstance(volname, list) else [volname]
+        pprint("Waiting for import to complete...")
+
+        def imported(pvc):
+            annotations = pvc.metadata.annotations or {}
+            return annotations.get('cdi.kubevirt.io/storage.pod.phase') == 'Succeeded'
+        return self.waiter('pvc', namespace).wait(volnames, imported, timeout=1200)
 
     def pod_completed(self, podname, namespace):
-        core = self.core
-        podtimeout = 1200
-        podruntime = 0
-        podstatus = ''
-        while podstatus != 'Succeeded':
-            if podruntime >= podtimeout or podstatus == 'Error' or podstatus == 'Failed':
-                return False
-            pod = core.read_namespaced_pod(podname, namespace)
-            podstatus = pod.status.phase
-            time.sleep(5)
-            pprint(f"Waiting for pod {podname} to complete...")
-            podruntime += 5
-        return True
+        podnames = podname if isinstance(podname, list) else [podname]
+        pprint(f"Waiting for pod {','.join(podnames)} to complete...")
+        return self.waiter('pod', namespace).wait(podnames, lambda p: p.status.phase == 'Succeeded',
+                                                  failed=lambda p: p.status.phase in ['Error', 'Failed'],
+                                                  timeout=1200)
 
     def prepare_pvc(self, name, size=1):
         core = self.core
@@ -1631,21 +1710,15 @@ class Kubevirt(Kubecommon):
         spec['spec']['ports'] = portspec
         self.core.create_namespaced_service(namespace, spec)
         if _type == 'LoadBalancer' and wait:
-            ipassigned = False
-            timeout = 60
-            runtime = 0
-            while not ipassigned:
-                if runtime >= timeout:
-                    error(f"Time out waiting for a loadbalancer ip for service {name}")
-                    return
-                else:
-                    try:
-                        api_service = self.core.read_namespaced_service(f'{name}', namespace)
-                        return api_service.status.load_balancer.ingress[0].ip
-                    except:
-                        time.sleep(5)
-                        pprint(f"Waiting to get a loadbalancer ip for service {name}...")
-                        runtime += 5
+            pprint(f"Waiting to get a loadbalancer ip for service {name}...")
+
+            def assigned(service):
+                return service.status.load_balancer is not None and bool(service.status.load_balancer.ingress)
+            if not self.waiter('service', namespace).wait([name], assigned, timeout=60):
+                error(f"Time out waiting for a loadbalancer ip for service {name}")
+                return
+            api_service = self.core.read_namespaced_service(f'{name}', namespace)
+            return api_service.status.load_balancer.ingress[0].ip
         else:
             api_service = self.core.read_namespaced_service(f'{name}', namespace)
             return api_service.spec.cluster_ip
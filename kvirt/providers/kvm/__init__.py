@@ -8,8 +8,9 @@ from getpass import getuser
 # from urllib.request import urlopen, urlretrieve
 from urllib.request import urlopen
 from kvirt.defaults import IMAGES
-from kvirt.defaults import UBUNTUS, METADATA_FIELDS
+from kvirt.defaults import UBUNTUS, METADATA_FIELDS, SSHPERSIST
 from kvirt import common
+from kvirt import imagecache
 from kvirt.common import error, pprint, warning, get_ssh_pub_key
 from kvirt.providers.kvm.helpers import DHCPKEYWORDS
 from ipaddress import ip_address, ip_network
@@ -19,7 +20,8 @@ from libvirt import VIR_DOMAIN_INTERFACE_ADDRESSES_SRC_AGENT as vir_src_agent
 from libvirt import VIR_DOMAIN_INTERFACE_ADDRESSES_SRC_LEASE as vir_src_lease
 from libvirt import (VIR_DOMAIN_NOSTATE, VIR_DOMAIN_RUNNING, VIR_DOMAIN_BLOCKED, VIR_DOMAIN_PAUSED,
                      VIR_DOMAIN_SHUTDOWN, VIR_DOMAIN_SHUTOFF, VIR_DOMAIN_CRASHED)
-from libvirt import VIR_CONNECT_LIST_STORAGE_POOLS_ACTIVE
+from libvirt import VIR_CONNECT_LIST_STORAGE_POOLS_ACTIVE, VIR_CONNECT_LIST_NETWORKS_ACTIVE
+from libvirt import VIR_DOMAIN_STATS_STATE
 try:
     from libvirt import VIR_DOMAIN_UNDEFINE_KEEP_NVRAM
 except:
@@ -27,11 +29,12 @@ except:
 from pwd import getpwuid
 import json
 import os
-from subprocess import call
+from subprocess import call, run
 import re
 import string
 from shutil import which
 from tempfile import TemporaryDirectory
+import threading
 import time
 from uuid import UUID
 import xml.etree.ElementTree as ET
@@ -99,7 +102,7 @@ class Kvirt(object):
 
     """
     def __init__(self, host='127.0.0.1', port=None, user='root', protocol='ssh', url=None, debug=False, insecure=False,
-                 session=False, remotednsmasq=False):
+                 session=False, remotednsmasq=False, imagecache=False, sshpersist=SSHPERSIST):
         if url is None:
             socketf = '/var/run/libvirt/libvirt-sock' if not session else f'/home/{user}/.cache/libvirt/libvirt-sock'
             conntype = 'system' if not session else 'session'
@@ -155,7 +158,17 @@ class Kvirt(object):
             self.identitycommand = f"-i {identityfile}"
         else:
             self.identitycommand = ""
+        if self.protocol == 'ssh' and host is not None:
+            control = common.ssh_control(user, host.strip('[]'), self.port, persist=sshpersist)
+            self.identitycommand = f"{self.identitycommand} {control}".strip()
         self.remotednsmasq = remotednsmasq
+        self.imagecache = imagecache
+        self.sshpersist = sshpersist
+        self.volumes_cache = None
+        self.volumes_lock = threading.Lock()
+        self.network_locks = {}
+        self.pending_reservations = None
+        self.reservations_lock = threading.Lock()
 
     def close(self):
         conn = self.conn
@@ -810,6 +823,8 @@ class Kvirt(object):
                         identitycommand = f"-i {identityfile}"
                     else:
                         identitycommand = ""
+                    control = common.ssh_control(self.user, self.host, self.port, persist=self.sshpersist)
+                    identitycommand = f"{identitycommand} {control}".strip()
                     ignitioncmd1 = 'scp %s -qP %s %s/%s.ign %s@%s:/var/lib/libvirt/images' % (identitycommand,
                                                                                               self.port, ignitiondir,
                                                                                               name, self.user,
@@ -1592,13 +1607,32 @@ class Kvirt(object):
     def list(self):
         vms = []
         conn = self.conn
-        for vm in conn.listAllDomains(0):
+        leases = self._dhcp_leases()
+        try:
+            domains = [(vm, stats.get('state.state')) for vm, stats in conn.getAllDomainStats(VIR_DOMAIN_STATS_STATE)]
+        except libvirtError:
+            domains = [(vm, None) for vm in conn.listAllDomains(0)]
+        for vm, state in domains:
             try:
-                vms.append(self.info(vm.name(), vm=vm))
+                vms.append(self.info(vm.name(), vm=vm, leases=leases, state=state))
             except:
                 continue
         return sorted(vms, key=lambda x: x['name'])
 
+    def _dhcp_leases(self):
+        leases = {}
+        for network in self.conn.listAllNetworks(VIR_CONNECT_LIST_NETWORKS_ACTIVE):
+            try:
+                networkleases = network.DHCPLeases()
+            except libvirtError:
+                continue
+            for lease in networkleases:
+                mac, ip = lease.get('mac'), lease.get('ipaddr')
+                if mac is None or ip is None:
+                    continue
+                leases.setdefault(mac, []).append({'addr': ip})
+        return leases
+
     def console(self, name, tunnel=False, web=False):
         conn = self.conn
         try:
@@ -1702,7 +1736,7 @@ class Kvirt(object):
                 error("No serial Console port found. Leaving...")
                 return
 
-    def info(self, name, vm=None, debug=False):
+    def info(self, name, vm=None, debug=False, leases=None, state=None):
         starts = {0: False, 1: True}
         conn = self.conn
         if vm is None:
@@ -1714,6 +1748,10 @@ class Kvirt(object):
                 return {}
         else:
             listinfo = True
+        if state is None:
+            active = vm.isActive()
+        else:
+            active = state not in [VIR_DOMAIN_NOSTATE, VIR_DOMAIN_SHUTOFF, VIR_DOMAIN_CRASHED]
         xml = vm.XMLDesc(0)
         root = ET.fromstring(xml)
         uuid = vm.UUIDString()
@@ -1767,18 +1805,6 @@ class Kvirt(object):
             yamlinfo['kubetype'] = kubetype
         if creationdate is not None:
             yamlinfo['creationdate'] = creationdate
-        agentfaces = {}
-        leasefaces = {}
-        ifaces = {}
-        if vm.isActive():
-            try:
-                agentfaces = vm.interfaceAddresses(vir_src_agent, 0)
-            except:
-                try:
-                    leasefaces = vm.interfaceAddresses(vir_src_lease, 0)
-                except:
-                    pass
-            ifaces = {**agentfaces, **leasefaces}
         interfaces = list(root.iter('interface'))
         macs = []
         for index, element in enumerate(interfaces):
@@ -1793,8 +1819,25 @@ class Kvirt(object):
             else:
                 network = element.find('source').get('network')
             yamlinfo['nets'].append({'device': device, 'mac': mac, 'net': network, 'type': networktype})
+        agentfaces = {}
+        leasefaces = {}
+        ifaces = {}
+        if active:
+            if leases is not None:
+                ifaces = {mac: {'hwaddr': mac, 'addrs': leases[mac]} for mac in macs if mac in leases}
+            if len(ifaces) < len(macs):
+                try:
+                    agentfaces = vm.interfaceAddresses(vir_src_agent, 0)
+                except:
+                    try:
+                        leasefaces = vm.interfaceAddresses(vir_src_lease, 0)
+                    except:
+                        pass
+                for x in {**agentfaces, **leasefaces}.values():
+                    if x['hwaddr'] not in ifaces:
+                        ifaces[x['hwaddr']] = x
         all_ips = [ip] if ip is not None else []
-        if vm.isActive() and ifaces:
+        if active and ifaces:
             ips = []
             for mac in macs:
                 for x in ifaces:
@@ -1828,7 +1871,7 @@ class Kvirt(object):
                 usernetinfo = {'device': f"eth{len(yamlinfo['nets'])}", 'mac': 'N/A', 'net': 'user', 'type': 'user'}
                 yamlinfo['nets'].append(usernetinfo)
         if listinfo:
-            state = vm.state()[0]
+            state = vm.state()[0] if state is None else state
             yamlinfo['status'] = states.get(state)
             return yamlinfo
         [state, maxmem, memory, numcpus, cputime] = vm.info()
@@ -1943,6 +1986,42 @@ class Kvirt(object):
                 return None
 
     def volumes(self, iso=False):
+        with self.volumes_lock:
+            if self.volumes_cache is None or 'images' not in self.volumes_cache:
+                inventory = self._volumes_inventory()
+                if self.volumes_cache is not None:
+                    self.volumes_cache.update(inventory)
+            else:
+                inventory = self.volumes_cache
+            volumes = inventory['isos'] if iso else inventory['images']
+            return sorted(volumes, key=lambda s: s.lower())
+
+    def cache_volumes(self, enabled=True):
+        with self.volumes_lock:
+            self.volumes_cache = {} if enabled else None
+
+    def invalidate_volumes(self):
+        with self.volumes_lock:
+            if self.volumes_cache is not None:
+                self.volumes_cache = {}
+
+    def _update_volumes(self, path, delete=False):
+        with self.volumes_lock:
+            if self.volumes_cache is None or 'images' not in self.volumes_cache:
+                return
+            volume = os.path.basename(path)
+            if volume.endswith('iso') or volume.endswith('fd'):
+                volumes = self.volumes_cache['isos']
+            elif volume.endswith('qcow2') or volume.endswith('qc2') or '.' not in volume:
+                volumes = self.volumes_cache['images']
+            else:
+                return
+            if delete and path in volumes:
+                volumes.remove(path)
+            elif not delete and path not in volumes:
+                volumes.append(path)
+
+    def _volumes_inventory(self):
         isos = []
         images = []
         conn = self.conn
@@ -1965,16 +2044,13 @@ class Kvirt(object):
                 thinpool = list(root.iter('product'))[0].get('name')
                 for volume in self.thinimages(poolpath, thinpool):
                     if volume.endswith('qcow2') or volume.endswith('qc2') or '.' not in volume:
-                        images.extend(f"{poolpath}/{volume}")
+                        images.append(f"{poolpath}/{volume}")
             for volume in pool.listVolumes():
                 if volume.endswith('iso') or volume.endswith('fd'):
                     isos.append(f"{poolpath}/{volume}")
                 elif volume.endswith('qcow2') or volume.endswith('qc2') or '.' not in volume:
                     images.append(f"{poolpath}/{volume}")
-        if iso:
-            return sorted(isos, key=lambda s: s.lower())
-        else:
-            return sorted(images, key=lambda s: s.lower())
+        return {'images': images, 'isos': isos}
 
     def dnsinfo(self, name):
         conn = self.conn
@@ -2307,45 +2383,46 @@ class Kvirt(object):
             elif networks[netname]['type'] == 'bridged':
                 warning(f"Skipping bridge {netname}")
                 continue
-            network = conn.networkLookupByName(netname)
-            oldnetxml = network.XMLDesc()
-            root = ET.fromstring(oldnetxml)
-            dhcplist = list(root.iter('dhcp'))
-            if not dhcplist:
-                warning(f"Skipping network {netname} as it doesnt have dhcp")
-                continue
-            dhcp = dhcplist[0]
-            for hostentry in list(dhcp.iter('host')):
-                currentip = hostentry.get('ip')
-                currentname = hostentry.get('name')
-                currentmac = hostentry.get('mac')
-                if currentip == ip:
-                    if currentname == name and currentmac is not None and currentmac == mac:
-                        warning(f"Skipping reserved ip existing entry for ip {ip} and mac {mac}")
-                        return
-                    else:
-                        warning(f"Removing old ip entry for ip {ip} and name {currentname}")
-                        hostentryxml = f"<host name='{currentname}' ip='{ip}'/>"
-                        network.update(2, 4, 0, hostentryxml, VIR_DOMAIN_AFFECT_LIVE | VIR_DOMAIN_AFFECT_CONFIG)
-            for ipentry in list(root.iter('ip')):
-                attributes = ipentry.attrib
-                firstip = attributes.get('address')
-                netmask = next(a for a in [attributes.get('netmask'), attributes.get('prefix')] if a is not None)
-                netip = ip_network(f'{firstip}/{netmask}', strict=False)
-                dhcp = list(root.iter('dhcp'))
-                if not dhcp:
-                    continue
-                if not ip_address(ip) in netip:
+            with self.network_locks.setdefault(netname, threading.Lock()):
+                network = conn.networkLookupByName(netname)
+                oldnetxml = network.XMLDesc()
+                root = ET.fromstring(oldnetxml)
+                dhcplist = list(root.iter('dhcp'))
+                if not dhcplist:
+                    warning(f"Skipping network {netname} as it doesnt have dhcp")
                     continue
-                pprint(f"Adding a reserved ip entry for ip {ip} and mac {mac}")
-                if ':' in ip:
-                    entry = f'<host id="00:03:00:01:{mac}" name="{name}" ip="{ip}" />'
-                else:
-                    entry = f'<host mac="{mac}" name="{name}" ip="{ip}" />'
-                try:
-                    network.update(4, 4, 0, entry, VIR_DOMAIN_AFFECT_LIVE | VIR_DOMAIN_AFFECT_CONFIG)
-                except Exception as e:
-                    warning(e)
+                dhcp = dhcplist[0]
+                for hostentry in list(dhcp.iter('host')):
+                    currentip = hostentry.get('ip')
+                    currentname = hostentry.get('name')
+                    currentmac = hostentry.get('mac')
+                    if currentip == ip:
+                        if currentname == name and currentmac is not None and currentmac == mac:
+                            warning(f"Skipping reserved ip existing entry for ip {ip} and mac {mac}")
+                            return
+                        else:
+                            warning(f"Removing old ip entry for ip {ip} and name {currentname}")
+                            hostentryxml = f"<host name='{currentname}' ip='{ip}'/>"
+                            network.update(2, 4, 0, hostentryxml, VIR_DOMAIN_AFFECT_LIVE | VIR_DOMAIN_AFFECT_CONFIG)
+                for ipentry in list(root.iter('ip')):
+                    attributes = ipentry.attrib
+                    firstip = attributes.get('address')
+                    netmask = next(a for a in [attributes.get('netmask'), attributes.get('prefix')] if a is not None)
+                    netip = ip_network(f'{firstip}/{netmask}', strict=False)
+                    dhcp = list(root.iter('dhcp'))
+                    if not dhcp:
+                        continue
+                    if not ip_address(ip) in netip:
+                        continue
+                    pprint(f"Adding a reserved ip entry for ip {ip} and mac {mac}")
+                    if ':' in ip:
+                        entry = f'<host id="00:03:00:01:{mac}" name="{name}" ip="{ip}" />'
+                    else:
+                        entry = f'<host mac="{mac}" name="{name}" ip="{ip}" />'
+                    try:
+                        network.update(4, 4, 0, entry, VIR_DOMAIN_AFFECT_LIVE | VIR_DOMAIN_AFFECT_CONFIG)
+                    except Exception as e:
+                        warning(e)
 
     def reserve_dns(self, name, nets=[], domain=None, ip=None, alias=[], force=False, primary=False):
         conn = self.conn
@@ -2364,7 +2441,7 @@ class Kvirt(object):
             else:
                 pprint(f"Creating dns entry for {name} in network {netname}")
             try:
-                network = conn.networkLookupByName(netname)
+                conn.networkLookupByName(netname)
             except:
                 if self.remotednsmasq:
                     bridged = True
@@ -2374,81 +2451,142 @@ class Kvirt(object):
             if ip is None:
                 if isinstance(net, dict):
                     ip = net.get('ip')
+                if ip is None and self._defer_reservation({'name': name, 'netname': netname, 'domain': domain,
+                                                           'alias': alias, 'force': force, 'host': bridged}):
+                    continue
                 if ip is None:
-                    counter = 0
-                    while counter != 300:
-                        ip = self.ip(name)
-                        if ip is None:
-                            time.sleep(5)
-                            pprint("Waiting 5 seconds to grab ip...")
-                            counter += 5
-                        else:
-                            break
+                    ip = self._wait_ips([name], timeout=300).get(name)
             if ip is None:
                 error(f"Couldn't assign dns entry {name} in net {netname}")
                 continue
             if bridged:
                 self._create_host_entry(name, ip, netname, domain)
             else:
-                oldnetxml = network.XMLDesc()
-                root = ET.fromstring(oldnetxml)
-                dns = list(root.iter('dns'))
-                if not dns:
-                    base = list(root.iter('network'))[0]
-                    dns = ET.Element("dns")
-                    base.append(dns)
-                    newxml = ET.tostring(root)
-                    conn.networkDefineXML(newxml.decode("utf-8"))
+                self._add_dns_entries(netname, [(name, domain, ip, alias, force)])
+
+    def _add_dns_entries(self, netname, entries):
+        conn = self.conn
+        with self.network_locks.setdefault(netname, threading.Lock()):
+            network = conn.networkLookupByName(netname)
+            root = ET.fromstring(network.XMLDesc())
+            dns = list(root.iter('dns'))
+            if dns:
+                dns = dns[0]
+            else:
+                base = list(root.iter('network'))[0]
+                dns = ET.Element("dns")
+                base.append(dns)
+                newxml = ET.tostring(root)
+                conn.networkDefineXML(newxml.decode("utf-8"))
+            for name, domain, ip, alias, force in entries:
                 fqdn = f"{name}.{domain}" if domain is not None and not name.endswith(domain) else name
                 hostnamexml = f'<hostname>{fqdn}</hostname>'
                 alias = [f"{entry}.{domain}" if domain is not None and
                          not entry.endswith(domain) else entry for entry in alias]
                 aliasxml = [f"<hostname>{entry}</hostname>" for entry in alias]
-                if dns:
-                    for hostentry in list(dns[0].iter('host')):
-                        currentip = hostentry.get('ip')
-                        if currentip == ip:
-                            currenthostnames = []
-                            for hostnameentry in list(hostentry.iter('hostname')):
-                                currenthostnames.append(hostnameentry.text)
-                            newalias = [a for a in alias if a not in currenthostnames]
-                            if fqdn not in currenthostnames or newalias:
-                                if fqdn not in currenthostnames:
-                                    hostentry.append((ET.fromstring(hostnamexml)))
-                                if newalias:
-                                    newaliasxml = [f"<hostname>{entry}</hostname>" for entry in newalias]
-                                    for entry in newaliasxml:
-                                        hostentry.append((ET.fromstring(entry)))
-                                newhostxml = ET.tostring(hostentry).decode("utf-8")
-                                network.update(2, 10, 0, newhostxml, 0)
-                                network.update(4, 10, 0, newhostxml, 0)
-                            else:
-                                pprint(f"Skipping existing entry for ip {ip} and name {fqdn}")
-                            return
+                hostentry = next((host for host in dns.iter('host') if host.get('ip') == ip), None)
+                if hostentry is not None:
+                    currenthostnames = [hostnameentry.text for hostnameentry in hostentry.iter('hostname')]
+                    newalias = [a for a in alias if a not in currenthostnames]
+                    if fqdn not in currenthostnames or newalias:
+                        if fqdn not in currenthostnames:
+                            hostentry.append((ET.fromstring(hostnamexml)))
+                        for entry in newalias:
+                            hostentry.append((ET.fromstring(f"<hostname>{entry}</hostname>")))
+                        newhostxml = ET.tostring(hostentry).decode("utf-8")
+                        network.update(2, 10, 0, newhostxml, 0)
+                        network.update(4, 10, 0, newhostxml, 0)
+                    else:
+                        pprint(f"Skipping existing entry for ip {ip} and name {fqdn}")
+                    continue
                 for entry in aliasxml:
                     hostnamexml += entry
                 dnsentry = f'<host ip="{ip}">{hostnamexml}</host>'
                 if force:
-                    for host in list(root.iter('host')):
+                    for host in list(dns.iter('host')):
                         iphost = host.get('ip')
-                        machost = host.get('mac')
-                        if machost is None:
-                            existing = []
-                            for hostname in list(host.iter('hostname')):
-                                existing.append(hostname.text)
-                            if fqdn in existing:
-                                if iphost == ip:
-                                    pprint(f"Skipping existing dns entry for {fqdn}")
-                                else:
-                                    oldentry = f'<host ip="{iphost}"></host>'
-                                    pprint(f"Removing old dns entry for ip {iphost}")
-                                    network.update(2, 10, 0, oldentry,
-                                                   VIR_DOMAIN_AFFECT_LIVE | VIR_DOMAIN_AFFECT_CONFIG)
+                        if host.get('mac') is not None:
+                            continue
+                        if fqdn in [hostname.text for hostname in host.iter('hostname')]:
+                            if iphost == ip:
+                                pprint(f"Skipping existing dns entry for {fqdn}")
+                            else:
+                                oldentry = f'<host ip="{iphost}"></host>'
+                                pprint(f"Removing old dns entry for ip {iphost}")
+                                network.update(2, 10, 0, oldentry, VIR_DOMAIN_AFFECT_LIVE | VIR_DOMAIN_AFFECT_CONFIG)
+                                dns.remove(host)
                 try:
                     network.update(4, 10, 0, dnsentry, VIR_DOMAIN_AFFECT_LIVE | VIR_DOMAIN_AFFECT_CONFIG)
+                    dns.append(ET.fromstring(dnsentry))
                 except Exception as e:
                     error(e)
 
+    def _wait_ips(self, names, timeout=300):
+        conn = self.conn
+        macs, bridged, ips = {}, [], {}
+        for name in names:
+            try:
+                interfaces = list(ET.fromstring(conn.lookupByName(name).XMLDesc(0)).iter('interface'))
+            except libvirtError:
+                continue
+            if interfaces:
+                macs[name] = interfaces[0].find('mac').get('address')
+                if interfaces[0].get('type') != 'network':
+                    bridged.append(name)
+        counter = 0
+        while True:
+            leases = self._dhcp_leases()
+            for name in names:
+                if name in ips:
+                    continue
+                addresses = [entry['addr'] for entry in leases.get(macs.get(name), [])]
+                ip = next((a for a in addresses if ':' not in a), addresses[0] if addresses else None)
+                if ip is None and name in bridged:
+                    ip = self.ip(name)
+                if ip is not None:
+                    ips[name] = ip
+            pending = [name for name in names if name not in ips]
+            if not pending or counter >= timeout:
+                return ips
+            pprint(f"Waiting 5 seconds to grab ip of {', '.join(pending)}...")
+            time.sleep(5)
+            counter += 5
+
+    def defer_reservations(self):
+        with self.reservations_lock:
+            if self.pending_reservations is None:
+                self.pending_reservations = []
+                return True
+            return False
+
+    def _defer_reservation(self, entry):
+        with self.reservations_lock:
+            if self.pending_reservations is None:
+                return False
+            self.pending_reservations.append(entry)
+            return True
+
+    def flush_reservations(self, wait=True, keep=False):
+        with self.reservations_lock:
+            pending = self.pending_reservations or []
+            if self.pending_reservations is not None:
+                self.pending_reservations = [] if keep else None
+        if not pending:
+            return
+        ips = self._wait_ips(list(dict.fromkeys(entry['name'] for entry in pending)), timeout=300 if wait else 0)
+        dnsentries = {}
+        for entry in pending:
+            name, netname, domain = entry['name'], entry['netname'], entry['domain']
+            ip = ips.get(name)
+            if ip is None:
+                error(f"Couldn't assign dns entry {name} in net {netname}")
+            elif entry['host']:
+                self._create_host_entry(name, ip, netname, domain)
+            else:
+                dnsentries.setdefault(netname, []).append((name, domain, ip, entry['alias'], entry['force']))
+        for netname in dnsentries:
+            self._add_dns_entries(netname, dnsentries[netname])
+
     def reserve_host(self, name, nets, domain):
         net = nets[0]
         ip = None
@@ -2457,16 +2595,10 @@ class Kvirt(object):
             netname = net.get('name')
         else:
             netname = net
+        if ip is None and self._defer_reservation({'name': name, 'netname': netname, 'domain': domain, 'host': True}):
+            return
         if ip is None:
-            counter = 0
-            while counter != 80:
-                ip = self.ip(name)
-                if ip is None:
-                    time.sleep(5)
-                    pprint("Waiting 5 seconds to grab ip and create /etc/host entry...")
-                    counter += 5
-                else:
-                    break
+            ip = self._wait_ips([name], timeout=80).get(name)
         if ip is None:
             error("Couldn't assign Host")
             return
@@ -2484,17 +2616,30 @@ class Kvirt(object):
             poolpath = element.text
             break
         imagepath = f"{poolpath}/{name}"
+        origin = f"{origin}/{name}"
         imagexml = self._xmlvolume(path=imagepath, size=size, diskformat='raw', pooltype=pooltype)
         try:
             pool.createXML(imagexml, 0)
         except libvirtError as e:
             warning(f"Got {e} when creating iso")
         imagevolume = conn.storageVolLookupByPath(imagepath)
-        stream = conn.newStream(0)
-        imagevolume.upload(stream, 0, 0)
-        with open(f"{origin}/{name}", 'rb') as ori:
-            stream.sendAll(self.handler, ori)
-            stream.finish()
+        start = time.time()
+        filesize = os.path.getsize(origin)
+        if self.host in ['localhost', '127.0.0.1'] and root.get('type') == 'dir' and os.access(imagepath, os.W_OK):
+            with open(origin, 'rb') as ori, open(imagepath, 'wb') as dest:
+                offset = 0
+                while offset < filesize:
+                    offset += os.sendfile(dest.fileno(), ori.fileno(), offset, filesize - offset)
+        else:
+            stream = conn.newStream(0)
+            imagevolume.upload(stream, 0, 0)
+            with open(origin, 'rb') as ori:
+                stream.sendAll(self.handler, ori)
+                stream.finish()
+        if self.debug:
+            elapsed = max(time.time() - start, 0.001)
+            rate = round(filesize / MiB / elapsed, 2)
+            pprint(f"Uploaded {name} ({filesize} bytes) in {round(elapsed, 2)}s ({rate}MB/s)")
 
     def update_metadata(self, name, metatype, metavalue, append=False):
         ET.register_namespace('kvirt', 'kvirt')
@@ -2803,6 +2948,7 @@ class Kvirt(object):
         volxml = self._xmlvolume(path=diskpath, size=size, pooltype=pooltype,
                                  diskformat=diskformat, backing=image)
         pool.createXML(volxml, 0)
+        self._update_volumes(diskpath)
         return diskpath
 
     def add_disk(self, name, size=1, pool=None, thin=True, image=None, shareable=False, existing=None,
@@ -3142,7 +3288,9 @@ class Kvirt(object):
                 return {'result': 'failure', 'reason': f'Pool {poolname} not found'}
             try:
                 volume = pool.storageVolLookupByName(shortname)
+                volumepath = volume.path()
                 volume.delete(0)
+                self._update_volumes(volumepath, delete=True)
                 return {'result': 'success'}
             except:
                 return {'result': 'failure', 'reason': f'Image {image} not found'}
@@ -3156,7 +3304,9 @@ class Kvirt(object):
                         warning(f"Hit {e} when refreshing pool {poolname}")
                         continue
                     volume = pool.storageVolLookupByName(shortname)
+                    volumepath = volume.path()
                     volume.delete(0)
+                    self._update_volumes(volumepath, delete=True)
                     return {'result': 'success'}
                 except:
                     continue
@@ -3188,7 +3338,19 @@ class Kvirt(object):
         if name in volumes:
             pprint(f"Image {name} already there.Leaving...")
             return {'result': 'success', 'found': True}
-        if self.host == 'localhost' or self.host == '127.0.0.1':
+        if self.imagecache:
+            try:
+                cachedimage = imagecache.get_image(url)
+            except Exception as e:
+                return {'result': 'failure', 'reason': f"Unable to download indicated image. Hit {e}"}
+            need_uncompress, full_name = False, name
+        if self.imagecache and (self.host == 'localhost' or self.host == '127.0.0.1'):
+            downloadcmd = f"cp --reflink=auto {cachedimage} {downloadpath}/{full_name}"
+        elif self.imagecache and self.protocol == 'ssh':
+            host = self.host.replace('[', '').replace(']', '')
+            downloadcmd = f"scp {self.identitycommand} -qP {self.port} {cachedimage} {self.user}@[{host}]:"
+            downloadcmd += f"{downloadpath}/{full_name}"
+        elif self.host == 'localhost' or self.host == '127.0.0.1':
             downloadcmd = f"curl -Lko {downloadpath}/{full_name} -f '{url}'"
         elif self.protocol == 'ssh':
             host = self.host.replace('[', '').replace(']', '')
@@ -3214,33 +3376,41 @@ class Kvirt(object):
             if self.host == 'localhost' or self.host == '127.0.0.1':
                 if which(executable) is not None:
                     uncompresscmd = f"{executable} -f {poolpath}/{full_name}"
-                    os.system(uncompresscmd)
                 else:
                     error(f"{executable} not found. Can't uncompress image")
                     return {'result': 'failure', 'reason': f"{executable} not found. Can't uncompress image"}
             elif self.protocol == 'ssh':
                 uncompresscmd = 'ssh %s -p %s %s@%s "%s -f %s/%s"' % (self.identitycommand, self.port, self.user,
                                                                       self.host, executable, poolpath, full_name)
-                os.system(uncompresscmd)
+            else:
+                uncompresscmd = None
+            if uncompresscmd is not None and run(uncompresscmd, shell=True).returncode != 0:
+                return {'result': 'failure', 'reason': f"Unable to uncompress {full_name}"}
         if cmd is not None:
             if self.host == 'localhost' or self.host == '127.0.0.1':
                 if which('virt-customize') is not None:
                     cmd = f"virt-customize -a {poolpath}/{name} --run-command '{cmd}'"
-                    os.system(cmd)
+                    if run(cmd, shell=True).returncode != 0:
+                        return {'result': 'failure', 'reason': f"Unable to customize {name}"}
             elif self.protocol == 'ssh':
                 cmd = 'ssh %s -p %s %s@%s "virt-customize -a %s/%s --run-command \'%s\'"' % (self.identitycommand,
                                                                                              self.port, self.user,
                                                                                              self.host, poolpath,
                                                                                              name, cmd)
-                os.system(cmd)
+                if run(cmd, shell=True).returncode != 0:
+                    return {'result': 'failure', 'reason': f"Unable to customize {name}"}
         if convert:
             name = name.replace('.raw', '')
             cmd = f"qemu-img convert -O qcow2 {poolpath}/{name}.raw {poolpath}/{name}"
             if self.host == 'localhost' or self.host == '127.0.0.1':
-                os.system(cmd)
+                code = run(cmd, shell=True).returncode
             elif self.protocol == 'ssh':
                 cmd = 'ssh %s -p %s %s@%s "%s"' % (self.identitycommand, self.port, self.user, self.host, cmd)
-                os.system(cmd)
+                code = run(cmd, shell=True).returncode
+            else:
+                code = 0
+            if code != 0:
+                return {'result': 'failure', 'reason': f"Unable to convert {name}.raw to qcow2"}
         if pooltype in ['logical', 'zfs']:
             product = list(root.iter('product'))
             if product:
@@ -3248,8 +3418,10 @@ class Kvirt(object):
             else:
                 thinpool = None
             self.add_image_to_deadpool(poolname, pooltype, poolpath, name, thinpool)
+            self._update_volumes(f"{poolpath}/{name}")
             return {'result': 'success'}
         pool.refresh()
+        self._update_volumes(f"{poolpath}/{name}")
         return {'result': 'success'}
 
     def create_network(self, name, cidr=None, dhcp=True, nat=True, domain=None, plan='kvirt', overrides={}):
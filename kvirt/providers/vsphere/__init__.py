@@ -29,6 +29,7 @@ from kvirt.providers.vsphere.helpers import find, collectproperties, findvm, cre
 from kvirt.providers.vsphere.helpers import createscsispec, creatediskspec, createdvsnicspec, createclonespec
 from kvirt.providers.vsphere.helpers import createnicspec, createisospec, deletedirectory, dssize, keep_lease_alive
 from kvirt.providers.vsphere.helpers import create_filter_spec, get_all_obj, convert_properties, findvm2, findvmdc
+from kvirt.providers.vsphere.helpers import dropsession, waittasks
 from uuid import UUID
 
 
@@ -90,6 +91,7 @@ class Ksphere:
             self.portgs = portgs
 
     def close(self):
+        dropsession(self.si)
         self.si.content.sessionManager.Logout()
 
     def exists(self, name):
@@ -241,7 +243,9 @@ class Ksphere:
                     extraconfig.append(guestopt)
             confspec.extraConfig = extraconfig
             t = imageobj.CloneVM_Task(folder=vmfolder, name=name, spec=clonespec)
-            waitForMe(t)
+            result = waitForMe(t)
+            if result['result'] != 'success':
+                return result
             if cloudinitiso is not None:
                 with TemporaryDirectory() as tmpdir:
                     if combustion:
@@ -261,7 +265,9 @@ class Ksphere:
                     self._uploadimage(isopool, cloudinitisofile, name, isofolder=isofolder)
                 vm = findvm(si, vmFolder, name)
                 c = changecd(self.si, vm, cloudinitiso)
-                waitForMe(c)
+                result = waitForMe(c)
+                if result['result'] != 'success':
+                    return result
         datastores = {}
         confspec = vim.vm.ConfigSpec()
         confspec.name = name
@@ -297,7 +303,9 @@ class Ksphere:
             confspec.extraConfig = [opt1, opt2]
         if image is None:
             t = vmfolder.CreateVM_Task(confspec, resourcepool)
-            waitForMe(t)
+            result = waitForMe(t)
+            if result['result'] != 'success':
+                return result
         vm = find(si, dc.vmFolder, vim.VirtualMachine, name)
         currentdevices = vm.config.hardware.device
         currentdisks = [d for d in currentdevices if isinstance(d, vim.vm.device.VirtualDisk)]
@@ -417,7 +425,9 @@ class Ksphere:
         if nested:
             confspec.nestedHVEnabled = True
         t = vm.Reconfigure(confspec)
-        waitForMe(t)
+        result = waitForMe(t)
+        if result['result'] != 'success':
+            return result
         if 'vmgroup' in overrides:
             vmgroup = overrides['vmgroup']
             vmgroups = {}
@@ -433,13 +443,17 @@ class Ksphere:
                 vmgroupspec = vim.cluster.GroupSpec(info=vmgroup, operation='edit')
                 groups_spec = vim.cluster.ConfigSpecEx(groupSpec=[vmgroupspec])
                 t = clu.ReconfigureEx(groups_spec, modify=True)
-                waitForMe(t)
+                result = waitForMe(t)
+                if result['result'] != 'success':
+                    return result
             else:
                 vmgroup = vim.cluster.VmGroup(name=vmgroup, vm=[vm])
                 vmgroupspec = vim.cluster.GroupSpec(info=vmgroup, operation='add')
                 groups_spec = vim.cluster.ConfigSpecEx(groupSpec=[vmgroupspec])
                 t = clu.ReconfigureEx(groups_spec, modify=True)
-                waitForMe(t)
+                result = waitForMe(t)
+                if result['result'] != 'success':
+                    return result
             if 'hostgroup' in overrides and 'hostrule' in overrides:
                 hostgroup = overrides['hostgroup']
                 hostrule = overrides['hostrule']
@@ -460,7 +474,9 @@ class Ksphere:
                         rulespec = vim.cluster.RuleSpec(info=rule_obj, operation='add')
                         groups_spec = vim.cluster.ConfigSpecEx(rulesSpec=[rulespec])
                         t = clu.ReconfigureEx(groups_spec, modify=True)
-                        waitForMe(t)
+                        result = waitForMe(t)
+                        if result['result'] != 'success':
+                            return result
         antipeers = overrides.get('antipeers', [])
         if antipeers and antipeers[-1] == name:
             antipeers_rule = '-'.join(antipeers)
@@ -477,10 +493,14 @@ class Ksphere:
                 rulespec = vim.cluster.RuleSpec(info=rule_obj, operation='add')
                 groups_spec = vim.cluster.ConfigSpecEx(rulesSpec=[rulespec])
                 t = clu.ReconfigureEx(groups_spec, modify=True)
-                waitForMe(t)
+                result = waitForMe(t)
+                if result['result'] != 'success':
+                    return result
         if start:
             t = vm.PowerOnVM_Task(None)
-            waitForMe(t)
+            result = waitForMe(t)
+            if result['result'] != 'success':
+                return result
         if tags:
             pprint("Assigning tags")
             from kvirt.providers.vsphere.tagging import KsphereTag
@@ -519,7 +539,7 @@ class Ksphere:
         runtime = info['runtime']
         if runtime.powerState == "poweredOff":
             t = vm.PowerOnVM_Task(None)
-            waitForMe(t)
+            return waitForMe(t)
         return {'result': 'success'}
 
     def stop(self, name, soft=False):
@@ -532,7 +552,7 @@ class Ksphere:
         runtime = info['runtime']
         if runtime.powerState == "poweredOn":
             t = vm.PowerOffVM_Task()
-            waitForMe(t)
+            return waitForMe(t)
         return {'result': 'success'}
 
     def restart(self, name):
@@ -578,16 +598,22 @@ class Ksphere:
                     kube = entry.value
         if runtime.powerState == "poweredOn":
             t = vm.PowerOffVM_Task()
-            waitForMe(t)
+            result = waitForMe(t)
+            if result['result'] != 'success':
+                return result
         t = vm.Destroy_Task()
-        waitForMe(t)
+        result = waitForMe(t)
+        if result['result'] != 'success':
+            return result
         if image is not None and 'coreos' not in image and 'rhcos' not in image and\
                 'fcos' not in image and vmpath.endswith(name):
             isopath = f"{self.isofolder}/{name}.ISO" if self.isofolder is not None else vmpath
             try:
-                deletedirectory(si, dc, isopath)
-            except:
-                pass
+                result = deletedirectory(si, dc, isopath)
+            except Exception as e:
+                result = {'result': 'failure', 'reason': str(e)}
+            if result['result'] != 'success':
+                warning(f"Couldn't delete {isopath}. Hit {result['reason']}")
         if kube is not None:
             clusterfolder = find(si, vmFolder, vim.Folder, kube)
             if clusterfolder is not None and len(clusterfolder.childEntity) == 0:
@@ -760,14 +786,13 @@ class Ksphere:
         if not all_vms:
             return vms
         prop_collector = content.propertyCollector
-        props = ['runtime', 'config', 'summary', 'guest']
+        props = ['name', 'runtime', 'config', 'summary', 'guest']
         filter_spec = create_filter_spec(all_vms, props)
         options = vmodl.query.PropertyCollector.RetrieveOptions()
         vmlist = prop_collector.RetrievePropertiesEx([filter_spec], options)
         for o in vmlist.objects:
-            obj = o.obj
-            vmname = obj.name
             vm = convert_properties(o)
+            vmname = vm.get('name')
             summary, config = vm.get('summary'), vm.get('config')
             if summary is None or config is None:
                 continue
@@ -813,7 +838,6 @@ class Ksphere:
         si = self.si
         clu = find(si, rootFolder, vim.ComputeResource, self.clu)
         isos = []
-        results = {}
         searchspec = vim.host.DatastoreBrowser.SearchSpec()
         filequery = [vim.host.DatastoreBrowser.IsoImageQuery(), vim.host.DatastoreBrowser.FolderQuery()]
         filequeryflags = vim.host.DatastoreBrowser.FileInfo.Details()
@@ -825,25 +849,30 @@ class Ksphere:
         searchspec.details = filequeryflags
         searchspec.sortFoldersFirst = True
         searchspec.searchCaseInsensitive = True
+        searches = []
         for dts in clu.datastore:
-            datastorename = dts.name
-            datastorepath = "[" + datastorename + "]"
-            browser = dts.browser
-            t = browser.SearchDatastore_Task(datastorepath, searchspec)
-            waitForMe(t)
-            result = t.info.result
-            fileinfo = result.file
-            for element in fileinfo:
+            datastorepath = "[" + dts.name + "]"
+            searches.append((dts.browser, datastorepath, dts.browser.SearchDatastore_Task(datastorepath, searchspec)))
+        results = waittasks([t for browser, datastorepath, t in searches])
+        subsearches = []
+        for (browser, datastorepath, t), result in zip(searches, results):
+            if result['result'] != 'success':
+                warning(f"Couldn't search isos in {datastorepath}. Hit {result['reason']}")
+                continue
+            for element in t.info.result.file:
                 folderpath = element.path
-                t = browser.SearchDatastoreSubFolders_Task(f"{datastorepath}{folderpath}", searchspec)
-                waitForMe(t)
-                results = t.info.result
-                for r in results:
-                    fileinfo = r.file
-                    for isofile in fileinfo:
-                        path = isofile.path
-                        if path.endswith('.iso'):
-                            isos.append(f"{datastorepath}/{folderpath}/{path}")
+                subtask = browser.SearchDatastoreSubFolders_Task(f"{datastorepath}{folderpath}", searchspec)
+                subsearches.append((datastorepath, folderpath, subtask))
+        results = waittasks([t for datastorepath, folderpath, t in subsearches])
+        for (datastorepath, folderpath, t), result in zip(subsearches, results):
+            if result['result'] != 'success':
+                warning(f"Couldn't search isos in {datastorepath}{folderpath}. Hit {result['reason']}")
+                continue
+            for r in t.info.result:
+                for isofile in r.file:
+                    path = isofile.path
+                    if path.endswith('.iso'):
+                        isos.append(f"{datastorepath}/{folderpath}/{path}")
         return isos
 
     def volumes(self, iso=False):
@@ -877,7 +906,7 @@ class Ksphere:
         opt.value = metavalue
         configspec.extraConfig = [opt]
         t = vm.ReconfigVM_Task(configspec)
-        waitForMe(t)
+        return waitForMe(t)
 
     def update_memory(self, name, memory):
         if memory % 1024 != 0:
@@ -891,7 +920,7 @@ class Ksphere:
         configspec = vim.vm.ConfigSpec()
         configspec.memoryMB = memory
         t = vm.ReconfigVM_Task(configspec)
-        waitForMe(t)
+        return waitForMe(t)
 
     def update_cpus(self, name, numcpus):
         si = self.si
@@ -903,7 +932,7 @@ class Ksphere:
         configspec = vim.vm.ConfigSpec()
         configspec.numCPUs = numcpus
         t = vm.ReconfigVM_Task(configspec)
-        waitForMe(t)
+        return waitForMe(t)
 
     def update_start(self, name, start=True):
         print("not implemented")
@@ -941,8 +970,7 @@ class Ksphere:
                     break
                 else:
                     time.sleep(5)
-        waitForMe(c)
-        return {'result': 'success'}
+        return waitForMe(c)
 
     def convert_to_template(self, name):
         si = self.si
@@ -1035,8 +1063,7 @@ class Ksphere:
         dev_changes = [disk_spec]
         spec.deviceChange = dev_changes
         t = vm.ReconfigVM_Task(spec=spec)
-        waitForMe(t)
-        return {'result': 'success'}
+        return waitForMe(t)
 
     def delete_disk(self, name=None, diskname=None, pool=None, novm=False):
         si = self.si
@@ -1056,8 +1083,7 @@ class Ksphere:
                 spec = vim.vm.ConfigSpec()
                 spec.deviceChange = [devspec]
                 t = vm.ReconfigVM_Task(spec=spec)
-                waitForMe(t)
-                return {'result': 'success'}
+                return waitForMe(t)
         msg = f"Disk {diskname} not found in {name}"
         error(msg)
         return {'result': 'failure', 'reason': error}
@@ -1079,8 +1105,7 @@ class Ksphere:
         nic_changes = [nicspec]
         spec.deviceChange = nic_changes
         t = vm.ReconfigVM_Task(spec=spec)
-        waitForMe(t)
-        return {'result': 'success'}
+        return waitForMe(t)
 
     def delete_nic(self, name, interface):
         si = self.si
@@ -1098,8 +1123,7 @@ class Ksphere:
                 spec = vim.vm.ConfigSpec()
                 spec.deviceChange = [devspec]
                 t = vm.ReconfigVM_Task(spec=spec)
-                waitForMe(t)
-                return {'result': 'success'}
+                return waitForMe(t)
         return {'result': 'failure', 'reason': f"Nic {interface} not found in {name}"}
 
     def list_networks(self):
@@ -1377,8 +1401,7 @@ class Ksphere:
             return {'result': 'failure', 'reason': f'Image {image} not found'}
         else:
             t = vm.Destroy_Task()
-            waitForMe(t)
-            return {'result': 'success'}
+            return waitForMe(t)
 
     def export(self, name, image=None):
         si = self.si
@@ -1389,7 +1412,9 @@ class Ksphere:
             return {'result': 'failure', 'reason': f"VM {name} not found"}
         if info['runtime'].powerState == "poweredOn":
             t = vm.PowerOffVM_Task()
-            waitForMe(t)
+            result = waitForMe(t)
+            if result['result'] != 'success':
+                return result
         vm.MarkAsTemplate()
         if image is not None:
             vm.Rename(image)
@@ -1480,8 +1505,7 @@ class Ksphere:
         clonespec.powerOn = start
         confspec.extraConfig = extraconfig
         t = imageobj.CloneVM_Task(folder=vmfolder, name=new, spec=clonespec)
-        waitForMe(t)
-        return {'result': 'success'}
+        return waitForMe(t)
 
     def create_snapshot(self, name, base):
         si = self.si
@@ -1494,8 +1518,7 @@ class Ksphere:
         dump_memory = False
         quiesce = False
         t = vm.CreateSnapshot(name, description, dump_memory, quiesce)
-        waitForMe(t)
-        return {'result': 'success'}
+        return waitForMe(t)
 
     def delete_snapshot(self, name, base):
         si = self.si
@@ -1508,8 +1531,7 @@ class Ksphere:
         for snapshot in snapshots:
             if snapshot.name == name:
                 t = snapshot.snapshot.RemoveSnapshot_Task(True)
-                waitForMe(t)
-                return {'result': 'success'}
+                return waitForMe(t)
         return {'result': 'failure', 'reason': f'Snapshot {name} not found'}
 
     def list_snapshots(self, base):
@@ -1533,8 +1555,7 @@ class Ksphere:
         for snapshot in snapshots:
             if snapshot.name == name:
                 t = snapshot.snapshot.RevertToSnapshot_Task()
-                waitForMe(t)
-                return {'result': 'success'}
+                return waitForMe(t)
         return {'result': 'failure', 'reason': f'Snapshot {name} not found'}
 
     def ip(self, name):
@@ -1,18 +1,125 @@
 from kvirt.common import error
 from math import ceil
 from pyVmomi import vim, vmodl
-import sys
+import threading
 import time
 import pyVmomi
 
+TRACKERS = {}
+TRACKERS_LOCK = threading.Lock()
+VMINDEXES = {}
+VMINDEXES_LOCK = threading.Lock()
+
+
+class TaskTracker(object):
+    """
+    Waits on any number of tasks of a session through a single property collector update stream.
+    Concurrent waiters share it, whoever is polling records the updates of every tracked task
+    """
+    def __init__(self, stub):
+        self.stub = stub
+        self.condition = threading.Condition()
+        self.polling = False
+        self.tasks = {}
+        self.filters = {}
+        self.results = {}
+        self._subscribe()
+
+    def _subscribe(self):
+        si = vim.ServiceInstance('ServiceInstance', self.stub)
+        self.collector = si.content.propertyCollector.CreatePropertyCollector()
+        self.version = ''
+
+    def _track(self, task):
+        objspec = vmodl.query.PropertyCollector.ObjectSpec(obj=task)
+        propertyspec = vmodl.query.PropertyCollector.PropertySpec(type=vim.Task, pathSet=['info.state', 'info.error'])
+        filterspec = vmodl.query.PropertyCollector.FilterSpec(objectSet=[objspec], propSet=[propertyspec])
+        self.filters[task._moId] = self.collector.CreateFilter(filterspec, True)
+
+    def _resubscribe(self):
+        with self.condition:
+            self._subscribe()
+            for moid in [moid for moid in self.tasks if moid not in self.results]:
+                self._track(self.tasks[moid])
+
+    def _poll(self):
+        options = vmodl.query.PropertyCollector.WaitOptions(maxWaitSeconds=30)
+        try:
+            update = self.collector.WaitForUpdatesEx(self.version, options)
+        except vmodl.fault.ManagedObjectNotFound:
+            return self._resubscribe()
+        if update is None:
+            return
+        with self.condition:
+            for filterset in update.filterSet:
+                for objectset in filterset.objectSet:
+                    moid = objectset.obj._moId
+                    changes = {change.name: change.val for change in objectset.changeSet}
+                    state = changes.get('info.state')
+                    if state == vim.TaskInfo.State.success:
+                        self.results[moid] = {'result': 'success'}
+                    elif state == vim.TaskInfo.State.error:
+                        fault = changes.get('info.error')
+                        reason = fault.msg if fault is not None and fault.msg else str(fault)
+                        self.results[moid] = {'result': 'failure', 'reason': reason}
+            self.version = update.version
+
+    def wait(self, tasks):
+        """
+        Returns a {'result': 'success'} or {'result': 'failure', 'reason': ...} dict per task, once all of them are done
+        """
+        moids = [task._moId for task in tasks]
+        with self.condition:
+            for task in tasks:
+                self.tasks[task._moId] = task
+                self._track(task)
+        while True:
+            with self.condition:
+                if not [moid for moid in moids if moid not in self.results]:
+                    break
+                elif self.polling:
+                    self.condition.wait()
+                    continue
+                self.polling = True
+            try:
+                self._poll()
+            finally:
+                with self.condition:
+                    self.polling = False
+                    self.condition.notify_all()
+        with self.condition:
+            for moid in moids:
+                self.tasks.pop(moid, None)
+                taskfilter = self.filters.pop(moid, None)
+                if taskfilter is not None:
+                    try:
+                        taskfilter.DestroyPropertyFilter()
+                    except vmodl.MethodFault:
+                        pass
+            return [self.results.pop(moid) for moid in moids]
+
+
+def tasktracker(stub):
+    key = id(stub)
+    with TRACKERS_LOCK:
+        tracker = TRACKERS.get(key)
+        if tracker is None or tracker.stub is not stub:
+            tracker = TaskTracker(stub)
+            TRACKERS[key] = tracker
+    return tracker
+
+
+def waittasks(tasks):
+    if not tasks:
+        return []
+    return tasktracker(tasks[0]._stub).wait(tasks)
+
 
 def waitForMe(t):
-    while t.info.state not in [vim.TaskInfo.State.success, vim.TaskInfo.State.error]:
-        time.sleep(1)
-    if t.info.state == vim.TaskInfo.State.error:
-        error(t.info.description)
-        error(t.info.error)
-        sys.exit(1)
+    result = waittasks([t])[0]
+    if result['result'] != 'success':
+        error(result['reason'])
+    return result
 
 
 def collectproperties(si, view, objtype, pathset=None, includemors=False):
@@ -65,36 +172,131 @@ def find(si, folder, vimtype, name):
     return element
 
 
+class VmIndex(object):
+    """
+    Name to VirtualMachine index of a folder, kept current through a dedicated property collector so that
+    each lookup only pulls the changes made since the previous one
+    """
+    def __init__(self, si, folder):
+        self.si = si
+        self.folder = folder
+        self.lock = threading.Lock()
+        self.collector, self.view = None, None
+        self._subscribe()
+
+    def _subscribe(self):
+        self.close()
+        content = self.si.content
+        self.collector = content.propertyCollector.CreatePropertyCollector()
+        self.view = view = content.viewManager.CreateContainerView(self.folder, [vim.VirtualMachine], True)
+        traversalspec = vmodl.query.PropertyCollector.TraversalSpec(name='traverseEntities', path='view', skip=False,
+                                                                    type=vim.view.ContainerView)
+        objspec = vmodl.query.PropertyCollector.ObjectSpec(obj=view, skip=True, selectSet=[traversalspec])
+        propertyspec = vmodl.query.PropertyCollector.PropertySpec(type=vim.VirtualMachine, pathSet=['name'])
+        filterspec = vmodl.query.PropertyCollector.FilterSpec(objectSet=[objspec], propSet=[propertyspec])
+        self.collector.CreateFilter(filterspec, True)
+        self.version = ''
+        self.names = {}
+        self.vms = {}
+
+    def close(self):
+        collector, view, self.collector, self.view = self.collector, self.view, None, None
+        if collector is not None:
+            try:
+                collector.DestroyPropertyCollector()
+            except Exception:
+                pass
+        if view is not None:
+            try:
+                view.DestroyView()
+            except Exception:
+                pass
+
+    def _forget(self, moid):
+        name = self.names.pop(moid, None)
+        if name is not None:
+            self.vms[name] = [vm for vm in self.vms[name] if vm._moId != moid]
+            if not self.vms[name]:
+                del self.vms[name]
+
+    def refresh(self):
+        options = vmodl.query.PropertyCollector.WaitOptions(maxWaitSeconds=0)
+        while True:
+            try:
+                update = self.collector.WaitForUpdatesEx(self.version, options)
+            except vmodl.fault.ManagedObjectNotFound:
+                self._subscribe()
+                continue
+            if update is None:
+                return
+            for filterset in update.filterSet:
+                for objectset in filterset.objectSet:
+                    vm, moid = objectset.obj, objectset.obj._moId
+                    if objectset.kind == 'leave':
+                        self._forget(moid)
+                        continue
+                    for change in objectset.changeSet:
+                        if change.name == 'name' and change.op == 'assign':
+                            self._forget(moid)
+                            self.names[moid] = change.val
+                            self.vms.setdefault(change.val, []).append(vm)
+            self.version = update.version
+            if not update.truncated:
+                return
+
+    def get(self, name):
+        with self.lock:
+            self.refresh()
+            return list(self.vms.get(name, []))
+
+
+def vmindex(si, folder):
+    key = (id(si), folder._moId)
+    with VMINDEXES_LOCK:
+        index = VMINDEXES.get(key)
+        if index is None or index.si is not si:
+            if index is not None:
+                index.close()
+            index = VmIndex(si, folder)
+            VMINDEXES[key] = index
+    return index
+
+
+def dropsession(si):
+    with VMINDEXES_LOCK:
+        for key in [key for key in VMINDEXES if VMINDEXES[key].si is si]:
+            VMINDEXES.pop(key).close()
+    with TRACKERS_LOCK:
+        TRACKERS.pop(id(si._stub), None)
+
+
 def findvm(si, folder, name):
-    view = si.content.viewManager.CreateContainerView(folder, [vim.VirtualMachine], True)
-    vmlist = collectproperties(si, view=view, objtype=vim.VirtualMachine, pathset=['name'], includemors=True)
-    vm = list(filter(lambda v: v['name'] == name, vmlist))
-    return vm[-1]['obj'] if len(vm) >= 1 else None
+    vms = vmindex(si, folder).get(name)
+    return vms[-1] if vms else None
 
 
 def findvm2(si, folder, name, props=['runtime', 'config', 'summary', 'guest']):
-    content = si.content
-    all_vms = get_all_obj(content, [vim.VirtualMachine], folder=folder)
-    if not all_vms:
+    vms = vmindex(si, folder).get(name)
+    if not vms:
         return None, None
-    prop_collector = content.propertyCollector
-    filter_spec = create_filter_spec(all_vms, props)
+    filter_spec = create_filter_spec(vms[:1], props)
     options = vmodl.query.PropertyCollector.RetrieveOptions()
-    vmlist = prop_collector.RetrievePropertiesEx([filter_spec], options)
-    vms = [o for o in vmlist.objects if o.obj.name == name]
-    return (vms[0].obj, convert_properties(vms[0])) if vms else (None, None)
+    try:
+        vmlist = si.content.propertyCollector.RetrievePropertiesEx([filter_spec], options)
+    except vmodl.fault.ManagedObjectNotFound:
+        return None, None
+    if vmlist is None or not vmlist.objects:
+        return None, None
+    return vmlist.objects[0].obj, convert_properties(vmlist.objects[0])
 
 
 def findvmdc(si, folder, name, datacenter):
-    view = si.content.viewManager.CreateContainerView(folder, [vim.VirtualMachine], True)
-    vmlist = collectproperties(si, view=view, objtype=vim.VirtualMachine, pathset=['name'], includemors=True)
-    vms = list(filter(lambda v: v['name'] == name, vmlist))
     result = None, None
-    for vm in vms:
-        obj = vm['obj'].parent
+    for vm in vmindex(si, folder).get(name):
+        obj = vm.parent
         while not isinstance(obj, vim.Datacenter):
             obj = obj.parent
-        result = vm['obj'], obj.name
+        result = vm, obj.name
         if obj.name == datacenter.name:
             return result
     return result
@@ -334,7 +536,7 @@ def deletefolder(si, parentfolder, folder):
 
 def deletedirectory(si, dc, path):
     d = si.content.fileManager.DeleteFile(path, dc)
-    waitForMe(d)
+    return waittasks([d])[0]
 
 
 def keep_lease_alive(lease):
@@ -357,12 +559,8 @@ def get_all_obj(content, vim_type, folder=None, recurse=True):
     if not folder:
         folder = content.rootFolder
 
-    obj = {}
     container = content.viewManager.CreateContainerView(folder, vim_type, recurse)
-
-    for managed_object_ref in container.view:
-        obj[managed_object_ref] = managed_object_ref.name
-
+    obj = list(container.view)
     container.Destroy()
     return obj
 
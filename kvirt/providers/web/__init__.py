@@ -1,16 +1,21 @@
 #!/usr/bin/env python
 # -*- coding: utf-8 -*-
 
+from http.client import HTTPConnection, HTTPSConnection, HTTPException, RemoteDisconnected
 from inspect import signature
 from kvirt import common
 from kvirt.common import pprint, error, success
 import os
 import json
 import ssl
-from urllib.request import urlopen, Request
+import threading
 from urllib.error import HTTPError
+from urllib.parse import urlparse
 import webbrowser
 
+ETAGS_SIZE = 256
+IDEMPOTENT_METHODS = ['GET', 'HEAD', 'PUT', 'DELETE', 'OPTIONS']
+
 
 class Kwebclient(object):
     def __init__(self, host='127.0.0.1', port=8000, debug=False, localkube=True):
@@ -22,14 +27,71 @@ class Kwebclient(object):
         self.context.check_hostname = False
         self.context.verify_mode = ssl.CERT_NONE
         self.localkube = localkube
+        self.bulk = True
+        self.local = threading.local()
+        self.etags = {}
+        self.etags_lock = threading.Lock()
+
+    def _connection(self):
+        p = urlparse(self.base)
+        if p.scheme == 'https':
+            return HTTPSConnection(p.netloc, context=self.context)
+        return HTTPConnection(p.netloc)
+
+    def _request(self, url, method='GET', data=None, raw=False):
+        """
+        Sends the request over the keep-alive connection of the current thread, revalidating
+        the last ETAGS_SIZE GET responses through their ETag. Only idempotent requests are resent when a
+        reused connection fails, other ones only when it was closed before the request got through
+        """
+        path = url[len(self.base):] or '/'
+        headers = self.headers.copy()
+        cached = None
+        if method == 'GET':
+            with self.etags_lock:
+                cached = self.etags.pop(path, None)
+                if cached is not None:
+                    self.etags[path] = cached
+        if cached is not None:
+            headers['If-None-Match'] = cached[0]
+        while True:
+            conn = getattr(self.local, 'conn', None)
+            reused = conn is not None
+            if conn is None:
+                conn = self.local.conn = self._connection()
+            try:
+                conn.request(method, path, body=data, headers=headers)
+                response = conn.getresponse()
+                content = response.read()
+                break
+            except (HTTPException, OSError) as e:
+                conn.close()
+                self.local.conn = None
+                stale = isinstance(e, (RemoteDisconnected, BrokenPipeError))
+                retriable = method in IDEMPOTENT_METHODS and isinstance(e, (ConnectionError, HTTPException))
+                if not reused or not (stale or retriable):
+                    raise
+        if response.status == 304 and cached is not None:
+            content = cached[1]
+        elif response.status >= 400:
+            raise HTTPError(url, response.status, response.reason, response.headers, None)
+        elif method == 'GET' and response.getheader('ETag') is not None:
+            with self.etags_lock:
+                self.etags.pop(path, None)
+                self.etags[path] = (response.getheader('ETag'), content)
+                if len(self.etags) > ETAGS_SIZE:
+                    del self.etags[next(iter(self.etags))]
+        return content if raw else json.loads(content)
 
     def close(self):
-        return
+        conn = getattr(self.local, 'conn', None)
+        if conn is not None:
+            conn.close()
+            self.local.conn = None
 
     def exists(self, name):
         url = f"{self.base}/vms/{name}"
-        request = Request(url, headers=self.headers)
-        result = json.loads(urlopen(request, context=self.context).read())
+        result = self._request(url)
         return bool(result)
 
     def net_exists(self, name):
@@ -58,53 +120,66 @@ class Kwebclient(object):
                              numamode, numa, pcidevices, tpm, rng, metadata, securitygroups, vmuser).arguments)
         del data['self']
         data = json.dumps(data).encode('utf-8')
-        request = Request(vms_url, data=data, headers=self.headers)
-        response = json.loads(urlopen(request, context=self.context).read())
+        response = self._request(vms_url, method='POST', data=data)
         return response
 
     def start(self, name):
         start_url = f"{self.base}/vms/{name}/start"
         data = json.dumps({}).encode('utf-8')
-        request = Request(start_url, data=data, headers=self.headers)
-        response = json.loads(urlopen(request, context=self.context).read())
+        response = self._request(start_url, method='POST', data=data)
         return response
 
     def stop(self, name, soft=False):
         stop_url = f"{self.base}/vms/{name}/stop"
         data = json.dumps({}).encode('utf-8')
-        request = Request(stop_url, data=data, headers=self.headers)
-        response = json.loads(urlopen(request, context=self.context).read())
+        response = self._request(stop_url, method='POST', data=data)
         return response
 
+    def info_vms(self, names):
+        url = f"{self.base}/vms/info"
+        data = json.dumps({'names': names}).encode('utf-8')
+        return self._request(url, method='POST', data=data)['vms']
+
+    def start_vms(self, names):
+        url = f"{self.base}/vms/start"
+        data = json.dumps({'names': names}).encode('utf-8')
+        return self._request(url, method='POST', data=data)['vms']
+
+    def stop_vms(self, names, soft=False):
+        url = f"{self.base}/vms/stop"
+        data = json.dumps({'names': names, 'soft': soft}).encode('utf-8')
+        return self._request(url, method='POST', data=data)['vms']
+
+    def delete_vms(self, names, snapshots=False):
+        url = f"{self.base}/vms/delete"
+        data = json.dumps({'names': names, 'snapshots': snapshots}).encode('utf-8')
+        return self._request(url, method='POST', data=data)['vms']
+
     def create_snapshot(self, name, base):
         snapshot_url = f"{self.base}/snapshots/{base}"
         data = {'snapshot': name}
         data = json.dumps(data).encode('utf-8')
-        request = Request(snapshot_url, data=data, headers=self.headers)
-        response = json.loads(urlopen(request, context=self.context).read())
+        response = self._request(snapshot_url, method='POST', data=data)
         return response
 
     def delete_snapshot(self, name, base):
         snapshot_url = f"{self.base}/snapshots/{base}"
         data = {'snapshot': name}
         data = json.dumps(data).encode('utf-8')
-        request = Request(snapshot_url, data=data, headers=self.headers, method='DELETE')
-        response = json.loads(urlopen(request, context=self.context).read())
+        response = self._request(snapshot_url, method='DELETE', data=data)
         return response
 
     def list_snapshots(self, base):
         if not self.exists(base):
             return {'result': 'failure', 'reason': f"VM {base} not found"}
         url = f"{self.base}/snapshots/{base}"
-        request = Request(url, headers=self.headers)
-        return json.loads(urlopen(request, context=self.context).read())['snapshots']
+        return self._request(url)['snapshots']
 
     def revert_snapshot(self, name, base):
         revert_url = f"{self.base}/snapshots/{base}/revert"
         data = {'snapshot': name}
         data = json.dumps(data).encode('utf-8')
-        request = Request(revert_url, data=data, headers=self.headers)
-        response = json.loads(urlopen(request, context=self.context).read())
+        response = self._request(revert_url, method='POST', data=data)
         return response
 
     def restart(self, name):
@@ -112,20 +187,17 @@ class Kwebclient(object):
 
     def info_host(self):
         info_url = f"{self.base}/host"
-        request = Request(info_url, headers=self.headers)
-        result = json.loads(urlopen(request, context=self.context).read())
+        result = self._request(info_url)
         return result
 
     def status(self, name):
         url = f"{self.base}/vms/{name}"
-        request = Request(url, headers=self.headers)
-        result = json.loads(urlopen(request, context=self.context).read())
+        result = self._request(url)
         return result.get('status')
 
     def list(self):
         url = f"{self.base}/vms"
-        request = Request(url, headers=self.headers)
-        response = json.loads(urlopen(request, context=self.context).read())
+        response = self._request(url)
         vms = response['vms']
         return vms
 
@@ -139,36 +211,31 @@ class Kwebclient(object):
 
     def info(self, name, output='plain', fields=[], values=False, vm=None, debug=False):
         url = f"{self.base}/vms/{name}"
-        request = Request(url, headers=self.headers)
-        result = json.loads(urlopen(request, context=self.context).read())
+        result = self._request(url)
         if not result:
             error(f"VM {name} not found")
         return result
 
     def ip(self, name):
         url = f"{self.base}/vms/{name}"
-        request = Request(url, headers=self.headers)
-        result = json.loads(urlopen(request, context=self.context).read())
+        result = self._request(url)
         return result.get('ip')
 
     def volumes(self, iso=False):
         _type = 'isos' if iso else 'images'
         url = f"{self.base}/{_type}"
-        request = Request(url, headers=self.headers)
-        response = json.loads(urlopen(request, context=self.context).read())
+        response = self._request(url)
         return response[_type]
 
     def delete(self, name, snapshots=False):
         vm_url = f"{self.base}/vms/{name}"
         data = json.dumps({'snapshots': snapshots}).encode('utf-8')
-        request = Request(vm_url, data=data, headers=self.headers, method='DELETE')
-        response = json.loads(urlopen(request, context=self.context).read())
+        response = self._request(vm_url, method='DELETE', data=data)
         return response
 
     def dnsinfo(self, name):
         url = f"{self.base}/vms/{name}"
-        request = Request(url, headers=self.headers)
-        result = json.loads(urlopen(request, context=self.context).read())
+        result = self._request(url)
         return result.get('dnsclient'), result.get('domain')
 
     def clone(self, old, new, full=False, start=False):
@@ -178,32 +245,28 @@ class Kwebclient(object):
         vm_url = f"{self.base}/vms/{name}"
         data = {metatype: metavalue}
         data = json.dumps(data).encode('utf-8')
-        request = Request(vm_url, data=data, headers=self.headers, method='UPDATE')
-        response = json.loads(urlopen(request, context=self.context).read())
+        response = self._request(vm_url, method='UPDATE', data=data)
         return response
 
     def update_memory(self, name, memory):
         vm_url = f"{self.base}/vms/{name}"
         data = {'memory': memory}
         data = json.dumps(data).encode('utf-8')
-        request = Request(vm_url, data=data, headers=self.headers, method='UPDATE')
-        response = json.loads(urlopen(request, context=self.context).read())
+        response = self._request(vm_url, method='UPDATE', data=data)
         return response
 
     def update_cpus(self, name, numcpus):
         vm_url = f"{self.base}/vms/{name}"
         data = {'numcpus': numcpus}
         data = json.dumps(data).encode('utf-8')
-        request = Request(vm_url, data=data, headers=self.headers, method='UPDATE')
-        response = json.loads(urlopen(request, context=self.context).read())
+        response = self._request(vm_url, method='UPDATE', data=data)
         return response
 
     def update_start(self, name, start=True):
         vm_url = f"{self.base}/vms/{name}"
         data = {'start': start}
         data = json.dumps(data).encode('utf-8')
-        request = Request(vm_url, data=data, headers=self.headers, method='UPDATE')
-        response = json.loads(urlopen(request, context=self.context).read())
+        response = self._request(vm_url, method='UPDATE', data=data)
         return response
 
     def update_information(self, name, information):
@@ -213,16 +276,14 @@ class Kwebclient(object):
         vm_url = f"{self.base}/vms/{name}"
         data = {'iso': iso}
         data = json.dumps(data).encode('utf-8')
-        request = Request(vm_url, data=data, headers=self.headers, method='UPDATE')
-        response = json.loads(urlopen(request, context=self.context).read())
+        response = self._request(vm_url, method='UPDATE', data=data)
         return response
 
     def update_flavor(self, name, flavor):
         vm_url = f"{self.base}/vms/{name}"
         data = {'flavor': flavor}
         data = json.dumps(data).encode('utf-8')
-        request = Request(vm_url, data=data, headers=self.headers, method='UPDATE')
-        response = json.loads(urlopen(request, context=self.context).read())
+        response = self._request(vm_url, method='UPDATE', data=data)
         return response
 
     def create_disk(self, name, size, pool=None, thin=True, image=None):
@@ -239,16 +300,14 @@ class Kwebclient(object):
         disk_url = f"{self.base}/disks/{name}"
         data = {'size': size, 'pool': pool}
         data = json.dumps(data).encode('utf-8')
-        request = Request(disk_url, data=data, headers=self.headers)
-        response = json.loads(urlopen(request, context=self.context).read())
+        response = self._request(disk_url, method='POST', data=data)
         return response
 
     def delete_disk(self, name, diskname, pool=None, novm=False):
         disk_url = f"{self.base}/disks/{name}"
         data = {'disk': diskname}
         data = json.dumps(data).encode('utf-8')
-        request = Request(disk_url, data=data, headers=self.headers, method='DELETE')
-        response = json.loads(urlopen(request, context=self.context).read())
+        response = self._request(disk_url, method='DELETE', data=data)
         return response
 
     def list_disks(self):
@@ -262,32 +321,28 @@ class Kwebclient(object):
         nic_url = f"{self.base}/nics/{name}"
         data = {'network': network, 'name': name}
         data = json.dumps(data).encode('utf-8')
-        request = Request(nic_url, data=data, headers=self.headers)
-        response = json.loads(urlopen(request, context=self.context).read())
+        response = self._request(nic_url, method='POST', data=data)
         return response
 
     def delete_nic(self, name, interface):
         nic_url = f"{self.base}/nics/{name}"
         data = {'nic': interface}
         data = json.dumps(data).encode('utf-8')
-        request = Request(nic_url, data=data, headers=self.headers, method='DELETE')
-        response = json.loads(urlopen(request, context=self.context).read())
+        response = self._request(nic_url, method='DELETE', data=data)
         return response
 
     def create_pool(self, name, poolpath, pooltype='dir', user='qemu', thinpool=None):
         pool_url = f"{self.base}/pools"
         data = {'pool': name, 'path': poolpath, 'type': pooltype}
         data = json.dumps(data).encode('utf-8')
-        request = Request(pool_url, data=data, headers=self.headers)
-        response = json.loads(urlopen(request, context=self.context).read())
+        response = self._request(pool_url, method='POST', data=data)
         return response
 
     def delete_image(self, image, pool=None):
         image_url = f"{self.base}/images/{os.path.basename(image)}"
         data = {'pool': pool} if pool is not None else {}
         data = json.dumps(data).encode('utf-8')
-        request = Request(image_url, data=data, headers=self.headers, method='DELETE')
-        response = json.loads(urlopen(request, context=self.context).read())
+        response = self._request(image_url, method='DELETE', data=data)
         return response
 
     def add_image(self, url, pool, short=None, cmd=None, name=None, size=None, convert=False):
@@ -300,8 +355,7 @@ class Kwebclient(object):
         if size is not None:
             data['size'] = size
         data = json.dumps(data).encode('utf-8')
-        request = Request(image_url, data=data, headers=self.headers)
-        response = json.loads(urlopen(request, context=self.context).read())
+        response = self._request(image_url, method='POST', data=data)
         return response
 
     def create_network(self, name, cidr=None, dhcp=True, nat=True, domain=None, plan='kvirt', overrides={}):
@@ -312,8 +366,7 @@ class Kwebclient(object):
         networks_url = f"{self.base}/networks"
         data = {'network': name, 'cidr': cidr, 'dhcp': dhcp, 'isolated': not nat}
         data = json.dumps(data).encode('utf-8')
-        request = Request(networks_url, data=data, headers=self.headers)
-        response = json.loads(urlopen(request, context=self.context).read())
+        response = self._request(networks_url, method='POST', data=data)
         return response
 
     def delete_network(self, name=None, cidr=None):
@@ -325,20 +378,17 @@ class Kwebclient(object):
             return {'result': 'failure', 'reason': f"Network {name} is being used by {machines}"}
         network_url = f"{self.base}/networks/{name}"
         data = json.dumps({}).encode('utf-8')
-        request = Request(network_url, data=data, headers=self.headers, method='DELETE')
-        response = json.loads(urlopen(request, context=self.context).read())
+        response = self._request(network_url, method='DELETE', data=data)
         return response
 
     def list_pools(self):
         url = f"{self.base}/pools"
-        request = Request(url, headers=self.headers)
-        response = json.loads(urlopen(request, context=self.context).read())
+        response = self._request(url)
         return [pool[0] for pool in response['pools']]
 
     def list_networks(self):
         url = f"{self.base}/networks"
-        request = Request(url, headers=self.headers)
-        response = json.loads(urlopen(request, context=self.context).read())
+        response = self._request(url)
         networks = response['networks']
         return networks
 
@@ -355,15 +405,13 @@ class Kwebclient(object):
     def delete_pool(self, name, full=False):
         pool_url = f"{self.base}/pools/{name}"
         data = json.dumps({}).encode('utf-8')
-        request = Request(pool_url, data=data, headers=self.headers, method='DELETE')
-        response = json.loads(urlopen(request, context=self.context).read())
+        response = self._request(pool_url, method='DELETE', data=data)
         return response
 
     def network_ports(self, name):
         machines = []
         url = f"{self.base}/vms"
-        request = Request(url, headers=self.headers)
-        response = json.loads(urlopen(request, context=self.context).read())
+        response = self._request(url)
         for vm in response['vms']:
             vm_name = vm['name']
             nets = vm.get('nets', [])
@@ -375,16 +423,14 @@ class Kwebclient(object):
     def vm_ports(self, name):
         networks = []
         url = f"{self.base}/vms/{name}"
-        request = Request(url, headers=self.headers)
-        vm = json.loads(urlopen(request, context=self.context).read())
+        vm = self._request(url)
         for net in vm.get('nets', []):
             networks.append(net['net'])
         return networks
 
     def get_pool_path(self, pool):
         url = f"{self.base}/pools"
-        request = Request(url, headers=self.headers)
-        response = json.loads(urlopen(request, context=self.context).read())
+        response = self._request(url)
         for p in response['pools']:
             if p[0] == pool:
                 return p[1]
@@ -425,8 +471,7 @@ class Kwebclient(object):
         vm_url = f"{self.base}/vms/{name}"
         data = {'index': index, 'network': network}
         data = json.dumps(data).encode('utf-8')
-        request = Request(vm_url, data=data, headers=self.headers, method='UPDATE')
-        response = json.loads(urlopen(request, context=self.context).read())
+        response = self._request(vm_url, method='UPDATE', data=data)
         return response
 
     def update_network(self, name, dhcp=None, nat=None, domain=None, plan=None, overrides={}):
@@ -443,8 +488,7 @@ class Kwebclient(object):
         if overrides:
             data['overrides'] = overrides
         data = json.dumps(data).encode('utf-8')
-        request = Request(network_url, data=data, headers=self.headers, method='UPDATE')
-        response = json.loads(urlopen(request, context=self.context).read())
+        response = self._request(network_url, method='UPDATE', data=data)
         return response
 
     def list_security_groups(self, network=None):
@@ -464,8 +508,7 @@ class Kwebclient(object):
         overrides['cluster'] = cluster
         overrides['kubetype'] = kubetype
         data = json.dumps(overrides).encode('utf-8')
-        request = Request(kubes_url, data=data, headers=self.headers)
-        response = json.loads(urlopen(request, context=self.context).read())
+        response = self._request(kubes_url, method='POST', data=data)
         if response['result'] != 'success':
             error("Hit {response['reason']}")
         return response
@@ -475,8 +518,7 @@ class Kwebclient(object):
         kubes_url = f"{self.base}/kubes/{cluster}"
         overrides['kubetype'] = kubetype
         data = json.dumps(overrides).encode('utf-8')
-        request = Request(kubes_url, data=data, headers=self.headers, method='DELETE')
-        response = json.loads(urlopen(request, context=self.context).read())
+        response = self._request(kubes_url, method='DELETE', data=data)
         if response['result'] == 'success':
             success(f"Cluster {cluster} deleted")
         else:
@@ -485,20 +527,17 @@ class Kwebclient(object):
 
     def list_kubes(self):
         kubes_url = f"{self.base}/kubes"
-        request = Request(kubes_url, headers=self.headers)
-        response = json.loads(urlopen(request, context=self.context).read())
+        response = self._request(kubes_url)
         return response['kubes']
 
     def download_kubeconfig(self, kube):
         kubeconfig_url = f"{self.base}/kubes/{kube}/kubeconfig"
-        request = Request(kubeconfig_url, headers=self.headers)
         try:
-            return urlopen(request, context=self.context).read()
+            return self._request(kubeconfig_url, raw=True)
         except HTTPError:
             return None
 
     def info_specific_kube(self, kube):
         kube_url = f"{self.base}/kubes/{kube}"
-        request = Request(kube_url, headers=self.headers)
-        response = json.loads(urlopen(request, context=self.context).read())
+        response = self._request(kube_url)
         return response
@@ -2,7 +2,12 @@
 # coding=utf-8
 
 from ast import literal_eval
+from concurrent.futures import ThreadPoolExecutor
+from copy import copy
 import functools
+from hashlib import sha256
+from io import BytesIO
+import json
 from kvirt.bottle import Bottle, request, static_file, jinja2_view, response, redirect
 from kvirt.config import Kconfig
 from kvirt.common import print_info, get_free_port, get_parameters
@@ -16,15 +21,92 @@ from kvirt import k3s
 from kvirt import kubeadm
 from kvirt import hypershift
 from kvirt import openshift
+import glob
 import os
 from shutil import which
+from socketserver import ThreadingMixIn
 from time import sleep
-from threading import Thread
+from threading import Lock, Thread, local
+from wsgiref.simple_server import ServerHandler, WSGIRequestHandler, WSGIServer
+
+
+class ThreadingWSGIServer(ThreadingMixIn, WSGIServer):
+    daemon_threads = True
+
+
+class KeepAliveServerHandler(ServerHandler):
+    http_version = '1.1'
+
+    def close(self):
+        if self.headers is None or 'Content-Length' not in self.headers:
+            self.request_handler.close_connection = True
+        super().close()
+
+
+class KeepAliveHandler(WSGIRequestHandler):
+    """
+    Serves requests over HTTP/1.1, keeping the connection open between them when the client allows it
+    """
+    protocol_version = 'HTTP/1.1'
+    timeout = 120
+
+    def address_string(self):
+        return self.client_address[0]
+
+    def handle(self):
+        self.close_connection = True
+        try:
+            self.handle_one()
+            while not self.close_connection:
+                self.handle_one()
+        except (ConnectionError, TimeoutError):
+            return
+
+    def handle_one(self):
+        self.raw_requestline = self.rfile.readline(65537)
+        if len(self.raw_requestline) > 65536:
+            self.send_error(414)
+            self.close_connection = True
+            return
+        elif not self.raw_requestline or not self.parse_request():
+            self.close_connection = True
+            return
+        if 'Transfer-Encoding' in self.headers:
+            body = self.rfile
+            self.close_connection = True
+        else:
+            body = BytesIO(self.rfile.read(int(self.headers.get('Content-Length') or 0)))
+        handler = KeepAliveServerHandler(body, self.wfile, self.get_stderr(), self.get_environ(), multithread=True)
+        handler.request_handler = self
+        handler.run(self.server.get_app())
+
+
+def etagged(func):
+    """
+    Tags listings with an ETag and answers 304 when it matches the one sent by the client
+    """
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        result = func(*args, **kwargs)
+        if not isinstance(result, dict):
+            return result
+        etag = '"%s"' % sha256(json.dumps(result, sort_keys=True, default=str).encode()).hexdigest()
+        response.set_header('ETag', etag)
+        if request.headers.get('If-None-Match') == etag:
+            response.status = 304
+            return ''
+        return result
+    return wrapper
 
 
 class Kweb():
 
     def __init__(self, readonly=False):
+        self.configs = {}
+        self.configs_lock = Lock()
+        self.users = {}
+        self.retired = []
+        self.local = local()
         app = Bottle()
 
         app = Bottle()
@@ -37,8 +119,9 @@ class Kweb():
 
         # VMS
         @app.route('/vms')
+        @etagged
         def vmslist():
-            config = Kconfig()
+            config = self.config()
             k = config.k
             vms = []
             for vm in k.list():
@@ -49,7 +132,7 @@ class Kweb():
         @app.route('/vmstable')
         @view('vmstable.html')
         def vmstable():
-            config = Kconfig()
+            config = self.config()
             k = config.k
             vms = []
             for vm in k.list():
@@ -61,13 +144,13 @@ class Kweb():
         @app.route('/vmsindex')
         @view('vms.html')
         def vms():
-            baseconfig = Kbaseconfig()
+            baseconfig = self.baseconfig()
             return {'title': 'Home', 'client': baseconfig.client, 'readonly': readonly}
 
         @app.route('/vmcreateform')
         @view('vmcreate.html')
         def vmcreateform():
-            config = Kconfig()
+            config = self.config()
             profiles = list(config.profiles.keys())
             profiles.extend([os.path.basename(v) for v in config.k.volumes()])
             disks = []
@@ -90,21 +173,21 @@ class Kweb():
 
         @app.route('/vmprofiles')
         def vmprofileslist():
-            baseconfig = Kbaseconfig()
+            baseconfig = self.baseconfig()
             profiles = baseconfig.list_profiles()
             return {'profiles': profiles}
 
         @app.route('/vmprofilestable')
         @view('vmprofilestable.html')
         def vmprofilestable():
-            baseconfig = Kbaseconfig()
+            baseconfig = self.baseconfig()
             profiles = baseconfig.list_profiles()
             return {'profiles': profiles, 'readonly': readonly}
 
         @app.route('/vmprofilesindex')
         @view('vmprofiles.html')
         def vmprofiles():
-            baseconfig = Kbaseconfig()
+            baseconfig = self.baseconfig()
             return {'title': 'VmProfiles', 'client': baseconfig.client}
 
         @app.route("/disks/<name>", method='POST')
@@ -116,7 +199,7 @@ class Kweb():
             if data is None:
                 response.status = 400
                 return 'Invalid data'
-            config = Kconfig()
+            config = self.config()
             k = config.k
             size = int(data['size'])
             pool = data['pool']
@@ -132,7 +215,7 @@ class Kweb():
             if data is None:
                 response.status = 400
                 return 'Invalid json'
-            config = Kconfig()
+            config = self.config()
             k = config.k
             diskname = data['disk']
             result = k.delete_disk(name, diskname)
@@ -150,7 +233,7 @@ class Kweb():
             if data is None:
                 response.status = 400
                 return 'Invalid data'
-            config = Kconfig()
+            config = self.config()
             k = config.k
             network = data['network']
             result = k.add_nic(name, network)
@@ -165,7 +248,7 @@ class Kweb():
             if data is None:
                 response.status = 400
                 return 'Invalid data'
-            config = Kconfig()
+            config = self.config()
             k = config.k
             nicname = data['nic']
             result = k.delete_nic(name, nicname)
@@ -177,7 +260,7 @@ class Kweb():
         @app.route('/containercreateform')
         @view('containercreate.html')
         def containercreateform():
-            baseconfig = Kbaseconfig()
+            baseconfig = self.baseconfig()
             profiles = baseconfig.list_containerprofiles()
             return {'title': 'CreateContainer', 'profiles': profiles, 'client': baseconfig.client}
 
@@ -186,7 +269,7 @@ class Kweb():
         @app.route('/poolcreateform')
         @view('poolcreate.html')
         def poolcreateform():
-            config = Kconfig()
+            config = self.config()
             return {'title': 'CreatePool', 'client': config.client}
 
         @app.route("/pools", method='POST')
@@ -198,7 +281,7 @@ class Kweb():
             if data is None:
                 response.status = 400
                 return 'Invalid data'
-            config = Kconfig()
+            config = self.config()
             k = config.k
             args = {'name': data['pool'], 'poolpath': data['path']}
             if 'type' in data:
@@ -211,7 +294,7 @@ class Kweb():
             if readonly:
                 response.status = 403
                 return {}
-            config = Kconfig()
+            config = self.config()
             k = config.k
             result = k.delete_pool(name=pool)
             return result
@@ -227,7 +310,7 @@ class Kweb():
             if data is None:
                 response.status = 400
                 return 'Invalid data'
-            config = Kconfig()
+            config = self.config()
             if 'repo' in data:
                 repo = data['repo']
                 url = data['url']
@@ -246,7 +329,7 @@ class Kweb():
             if readonly:
                 response.status = 403
                 return {}
-            config = Kconfig()
+            config = self.config()
             result = config.delete_repo(repo)
             response.status = 200
             return result
@@ -256,7 +339,7 @@ class Kweb():
             if readonly:
                 response.status = 403
                 return {}
-            config = Kconfig()
+            config = self.config()
             result = config.update_repo(repo)
             response.status = 200
             return result
@@ -266,7 +349,7 @@ class Kweb():
         @app.route('/networkcreateform')
         @view('networkcreate.html')
         def networkcreateform():
-            config = Kconfig()
+            config = self.config()
             return {'title': 'CreateNetwork', 'client': config.client}
 
         @app.route("/networks", method='POST')
@@ -278,7 +361,7 @@ class Kweb():
             if data is None:
                 response.status = 400
                 return 'Invalid data'
-            config = Kconfig()
+            config = self.config()
             k = config.k
             if 'network' in data:
                 network = data['network']
@@ -297,7 +380,7 @@ class Kweb():
             if readonly:
                 response.status = 403
                 return {}
-            config = Kconfig()
+            config = self.config()
             k = config.k
             result = k.delete_network(name=network)
             response.status = 200
@@ -325,7 +408,7 @@ class Kweb():
                 parameters['plan'] = data['plan']
             if 'overrides' in data:
                 parameters['overrides'] = data['overrides']
-            config = Kconfig()
+            config = self.config()
             k = config.k
             result = k.update_network(**parameters)
             response.status = 200
@@ -336,7 +419,7 @@ class Kweb():
         @app.route('/plancreateform')
         @view('plancreate.html')
         def plancreateform():
-            config = Kconfig()
+            config = self.config()
             return {'title': 'CreatePlan', 'client': config.client}
 
         @app.route("/vms/<name>/start", method='POST')
@@ -344,7 +427,7 @@ class Kweb():
             if readonly:
                 response.status = 403
                 return {}
-            config = Kconfig()
+            config = self.config()
             k = config.k
             result = k.start(name)
             response.status = 200
@@ -355,7 +438,7 @@ class Kweb():
             if readonly:
                 response.status = 403
                 return {}
-            config = Kconfig()
+            config = self.config()
             k = config.k
             result = k.stop(name)
             response.status = 200
@@ -370,7 +453,7 @@ class Kweb():
             if data is None:
                 response.status = 400
                 return 'Invalid data'
-            config = Kconfig()
+            config = self.config()
             if 'name' in data:
                 name = data['name']
                 profile = data['profile']
@@ -400,12 +483,62 @@ class Kweb():
                 response.status = 400
             return result
 
+        @app.route("/vms/info", method='POST')
+        def vmsinfo():
+            if readonly:
+                response.status = 403
+                return {}
+            data = request.json
+            if data is None or not isinstance(data.get('names'), list):
+                response.status = 400
+                return 'Invalid data'
+            k = self.config().k
+            return {'vms': self.bulk(data['names'], k.info)}
+
+        @app.route("/vms/start", method='POST')
+        def vmsstart():
+            if readonly:
+                response.status = 403
+                return {}
+            data = request.json
+            if data is None or not isinstance(data.get('names'), list):
+                response.status = 400
+                return 'Invalid data'
+            k = self.config().k
+            return {'vms': self.bulk(data['names'], k.start)}
+
+        @app.route("/vms/stop", method='POST')
+        def vmsstop():
+            if readonly:
+                response.status = 403
+                return {}
+            data = request.json
+            if data is None or not isinstance(data.get('names'), list):
+                response.status = 400
+                return 'Invalid data'
+            k = self.config().k
+            soft = bool(data.get('soft', False))
+            return {'vms': self.bulk(data['names'], lambda name: k.stop(name, soft=soft))}
+
+        @app.route("/vms/delete", method='POST')
+        def vmsdelete():
+            if readonly:
+                response.status = 403
+                return {}
+            data = request.json
+            if data is None or not isinstance(data.get('names'), list):
+                response.status = 400
+                return 'Invalid data'
+            k = self.config().k
+            snapshots = bool(data.get('snapshots', False))
+            return {'vms': self.bulk(data['names'], lambda name: k.delete(name, snapshots=snapshots))}
+
         @app.route("/vms/<name>", method='GET')
         def vminfo(name):
             if readonly:
                 response.status = 403
                 return {}
-            config = Kconfig()
+            config = self.config()
             k = config.k
             result = k.info(name)
             response.status = 200
@@ -416,7 +549,7 @@ class Kweb():
             if readonly:
                 response.status = 403
                 return {}
-            config = Kconfig()
+            config = self.config()
             k = config.k
             data = request.json or request.forms
             snapshots = True if data is not None and 'snapshots' in data and bool(data['snapshots']) else False
@@ -433,7 +566,7 @@ class Kweb():
             if data is None:
                 response.status = 400
                 return 'Invalid data'
-            config = Kconfig()
+            config = self.config()
             parameters = {}
             for p in data:
                 key = p
@@ -458,7 +591,7 @@ class Kweb():
             if readonly:
                 response.status = 403
                 return {}
-            baseconfig = Kbaseconfig()
+            baseconfig = self.baseconfig()
             result = baseconfig.enable_host(name)
             response.status = 200
             return result
@@ -468,7 +601,7 @@ class Kweb():
             if readonly:
                 response.status = 403
                 return {}
-            baseconfig = Kbaseconfig()
+            baseconfig = self.baseconfig()
             result = baseconfig.disable_host(name)
             response.status = 200
             return result
@@ -478,21 +611,21 @@ class Kweb():
             if readonly:
                 response.status = 403
                 return {}
-            baseconfig = Kbaseconfig()
+            baseconfig = self.baseconfig()
             result = baseconfig.switch_host(name)
             response.status = 200
             return result
 
         @app.route('/host')
         def hostinfo():
-            config = Kconfig()
+            config = self.config()
             k = config.k
             response.status = 200
             return k.info_host()
 
         @app.route("/snapshots/<name>")
         def snapshotlist(name):
-            config = Kconfig()
+            config = self.config()
             k = config.k
             snapshots = k.list_snapshots(name)
             result = {'snapshots': [snapshot for snapshot in snapshots]}
@@ -508,7 +641,7 @@ class Kweb():
             if data is None:
                 response.status = 400
                 return 'Invalid data'
-            config = Kconfig()
+            config = self.config()
             k = config.k
             if 'snapshot' in data:
                 snapshot = data['snapshot']
@@ -528,7 +661,7 @@ class Kweb():
             if data is None:
                 response.status = 400
                 return 'Invalid data'
-            config = Kconfig()
+            config = self.config()
             k = config.k
             if 'snapshot' in data:
                 snapshot = data['snapshot']
@@ -547,7 +680,7 @@ class Kweb():
             if data is None:
                 response.status = 400
                 return 'Invalid data'
-            config = Kconfig()
+            config = self.config()
             k = config.k
             if 'snapshot' in data:
                 snapshot = data['snapshot']
@@ -563,7 +696,7 @@ class Kweb():
             if readonly:
                 response.status = 403
                 return {}
-            config = Kconfig()
+            config = self.config()
             result = config.start_plan(plan)
             response.status = 200
             return result
@@ -577,7 +710,7 @@ class Kweb():
             if data is None:
                 response.status = 400
                 return 'Invalid data'
-            config = Kconfig()
+            config = self.config()
             plan = data['name']
             result = config.stop_plan(plan)
             response.status = 200
@@ -588,7 +721,7 @@ class Kweb():
             if readonly:
                 response.status = 403
                 return {}
-            config = Kconfig()
+            config = self.config()
             result = config.delete_plan(plan)
             response.status = 200
             return result
@@ -616,7 +749,7 @@ class Kweb():
 
         @app.route('/containers')
         def containerslist():
-            config = Kconfig()
+            config = self.config()
             cont = Kcontainerconfig(config).cont
             containers = cont.list_containers()
             return {'containers': containers}
@@ -624,7 +757,7 @@ class Kweb():
         @app.route('/containerstable')
         @view('containerstable.html')
         def containerstable():
-            config = Kconfig()
+            config = self.config()
             cont = Kcontainerconfig(config).cont
             containers = cont.list_containers()
             return {'containers': containers, 'readonly': readonly}
@@ -632,12 +765,13 @@ class Kweb():
         @app.route('/containersindex')
         @view('containers.html')
         def containersindex():
-            config = Kconfig()
+            config = self.config()
             return {'title': 'Containers', 'client': config.client}
 
         @app.route('/networks')
+        @etagged
         def networkslist():
-            config = Kconfig()
+            config = self.config()
             k = config.k
             networks = k.list_networks()
             return {'networks': networks}
@@ -645,7 +779,7 @@ class Kweb():
         @app.route('/networkstable')
         @view('networkstable.html')
         def networkstable():
-            config = Kconfig()
+            config = self.config()
             k = config.k
             networks = k.list_networks()
             return {'networks': networks, 'readonly': readonly}
@@ -653,12 +787,13 @@ class Kweb():
         @app.route('/networksindex')
         @view('networks.html')
         def networks():
-            config = Kconfig()
+            config = self.config()
             return {'title': 'Networks', 'client': config.client}
 
         @app.route('/pools')
+        @etagged
         def poolslist():
-            config = Kconfig()
+            config = self.config()
             k = config.k
             pools = []
             for pool in k.list_pools():
@@ -669,7 +804,7 @@ class Kweb():
         @app.route('/poolstable')
         @view('poolstable.html')
         def poolstable():
-            config = Kconfig()
+            config = self.config()
             k = config.k
             pools = []
             for pool in k.list_pools():
@@ -680,14 +815,14 @@ class Kweb():
         @app.route('/poolsindex')
         @view('pools.html')
         def pools():
-            config = Kconfig()
+            config = self.config()
             return {'title': 'Pools', 'client': config.client}
 
         # REPOS
 
         @app.route('/reposlist')
         def reposlist():
-            config = Kconfig()
+            config = self.config()
             repos = []
             repoinfo = config.list_repos()
             for repo in repoinfo:
@@ -698,7 +833,7 @@ class Kweb():
         @app.route('/repostable')
         @view('repostable.html')
         def repostable():
-            config = Kconfig()
+            config = self.config()
             repos = []
             repoinfo = config.list_repos()
             for repo in repoinfo:
@@ -709,20 +844,20 @@ class Kweb():
         @app.route('/repos')
         @view('repos.html')
         def repos():
-            config = Kconfig()
+            config = self.config()
             return {'title': 'Repos', 'client': config.client}
 
         @app.route('/repocreateform')
         @view('repocreate.html')
         def repocreateform():
-            config = Kconfig()
+            config = self.config()
             return {'title': 'CreateRepo', 'client': config.client}
 
         # PRODUCTS
 
         @app.route('/products')
         def productslist():
-            baseconfig = Kbaseconfig()
+            baseconfig = self.baseconfig()
             products = []
             for product in baseconfig.list_products():
                 repo = product['repo']
@@ -736,7 +871,7 @@ class Kweb():
         @app.route('/productstable')
         @view('productstable.html')
         def productstable():
-            baseconfig = Kbaseconfig()
+            baseconfig = self.baseconfig()
             products = []
             for product in baseconfig.list_products():
                 repo = product['repo']
@@ -750,13 +885,13 @@ class Kweb():
         @app.route('/productsindex')
         @view('products.html')
         def products():
-            baseconfig = Kbaseconfig()
+            baseconfig = self.baseconfig()
             return {'title': 'Products', 'client': baseconfig.client}
 
         @app.route('/productcreateform/<prod>')
         @view('productcreate.html')
         def productcreateform(prod):
-            config = Kbaseconfig()
+            config = self.baseconfig()
             productinfo = config.info_product(prod, web=True)
             parameters = productinfo.get('parameters', {})
             description = parameters.get('description', '')
@@ -802,7 +937,7 @@ class Kweb():
         @app.route('/kubecreateform/<_type>')
         @view('kubecreate.html')
         def kubecreateform(_type):
-            config = Kconfig()
+            config = self.config()
             if _type == 'generic':
                 plandir = os.path.dirname(kubeadm.create.__code__.co_filename)
                 inputfile = f'{plandir}/kcli_default.yml'
@@ -905,14 +1040,14 @@ class Kweb():
             if readonly:
                 response.status = 403
                 return {}
-            config = Kconfig()
+            config = self.config()
             result = config.delete_kube(kube)
             response.status = 200
             return result
 
         @app.route('/hosts')
         def hostslist():
-            baseconfig = Kbaseconfig()
+            baseconfig = self.baseconfig()
             clients = []
             for client in sorted(baseconfig.clients):
                 enabled = baseconfig.ini[client].get('enabled', True)
@@ -926,7 +1061,7 @@ class Kweb():
         @app.route('/hoststable')
         @view('hoststable.html')
         def hoststable():
-            baseconfig = Kbaseconfig()
+            baseconfig = self.baseconfig()
             clients = []
             for client in sorted(baseconfig.clients):
                 enabled = baseconfig.ini[client].get('enabled', True)
@@ -940,42 +1075,43 @@ class Kweb():
         @app.route('/hostsindex')
         @view('hosts.html')
         def hosts():
-            config = Kconfig()
+            config = self.config()
             return {'title': 'Hosts', 'client': config.client}
 
         @app.route('/plans')
         def planslist():
-            config = Kconfig()
+            config = self.config()
             return {'plans': config.list_plans()}
 
         @app.route('/planstable')
         @view('planstable.html')
         def planstable():
-            config = Kconfig()
+            config = self.config()
             return {'plans': config.list_plans(), 'readonly': readonly}
 
         @app.route('/plansindex')
         @view('plans.html')
         def plans():
-            config = Kconfig()
+            config = self.config()
             return {'title': 'Plans', 'client': config.client}
 
         @app.route('/kubes')
+        @etagged
         def kubeslist():
-            config = Kconfig()
+            config = self.config()
             kubes = config.list_kubes()
             return {'kubes': kubes}
 
         @app.route('/kubestable')
         @view('kubestable.html')
         def kubestable():
-            config = Kconfig()
+            config = self.config()
             kubes = config.list_kubes()
             return {'kubes': kubes, 'readonly': readonly}
 
         @app.route('/kubes/<kube>')
         def kubeinfo(kube):
-            config = Kconfig()
+            config = self.config()
             data = {}
             kubes = config.list_kubes()
             if kube in kubes:
@@ -1004,7 +1140,7 @@ class Kweb():
         @app.route('/kubeinfo/<kube>')
         @view('kubeinfo.html')
         def kubeinfoview(kube):
-            config = Kconfig()
+            config = self.config()
             data = {'kube': kube, 'readonly': readonly}
             if kube in config.list_kubes():
                 data.update(config.info_specific_kube(kube))
@@ -1013,12 +1149,12 @@ class Kweb():
         @app.route('/kubesindex')
         @view('kubes.html')
         def kubes():
-            config = Kconfig()
+            config = self.config()
             return {'title': 'Kubes', 'client': config.client}
 
         @app.route('/kubeprofiles/<profile>')
         def kubeprofileinfo(profile):
-            baseconfig = Kbaseconfig()
+            baseconfig = self.baseconfig()
             if profile not in baseconfig.clusterprofiles:
                 response.status = 404
                 result = {'result': 'failure', 'reason': "Clusterprofile {profile} not found"}
@@ -1028,21 +1164,21 @@ class Kweb():
 
         @app.route('/kubeprofiles')
         def kubeprofileslist():
-            baseconfig = Kbaseconfig()
+            baseconfig = self.baseconfig()
             profiles = baseconfig.list_clusterprofiles()
             return {'profiles': profiles}
 
         @app.route('/kubeprofilestable')
         @view('kubeprofilestable.html')
         def kubeprofilestable():
-            baseconfig = Kbaseconfig()
+            baseconfig = self.baseconfig()
             profiles = baseconfig.list_clusterprofiles()
             return {'profiles': profiles, 'readonly': readonly}
 
         @app.route('/kubeprofilesindex')
         @view('kubeprofiles.html')
         def kubeprofiles():
-            baseconfig = Kbaseconfig()
+            baseconfig = self.baseconfig()
             return {'title': 'KubeProfiles', 'client': baseconfig.client}
 
         @app.route("/container/<name>/start", method='POST')
@@ -1050,7 +1186,7 @@ class Kweb():
             if readonly:
                 response.status = 403
                 return {}
-            config = Kconfig()
+            config = self.config()
             cont = Kcontainerconfig(config).cont
             result = cont.start_container(name)
             response.status = 200
@@ -1061,7 +1197,7 @@ class Kweb():
             if readonly:
                 response.status = 403
                 return {}
-            config = Kconfig()
+            config = self.config()
             cont = Kcontainerconfig(config).cont
             result = cont.stop_container(name)
             response.status = 200
@@ -1072,7 +1208,7 @@ class Kweb():
             if readonly:
                 response.status = 403
                 return {}
-            config = Kconfig()
+            config = self.config()
             cont = Kcontainerconfig(config).cont
             result = cont.delete_container(name)
             response.status = 200
@@ -1087,7 +1223,7 @@ class Kweb():
             if data is None:
                 response.status = 400
                 return 'Invalid data'
-            config = Kconfig()
+            config = self.config()
             cont = Kcontainerconfig(config).cont
             k = config.k
             if 'name' in data:
@@ -1110,8 +1246,9 @@ class Kweb():
             return result
 
         @app.route('/images')
+        @etagged
         def imageslist():
-            config = Kconfig()
+            config = self.config()
             k = config.k
             images = k.volumes()
             return {'images': images}
@@ -1119,7 +1256,7 @@ class Kweb():
         @app.route('/imagestable')
         @view('imagestable.html')
         def imagestable():
-            config = Kconfig()
+            config = self.config()
             k = config.k
             images = k.volumes()
             return {'images': images, 'readonly': readonly}
@@ -1127,13 +1264,13 @@ class Kweb():
         @app.route('/imagesindex')
         @view('images.html')
         def images():
-            config = Kconfig()
+            config = self.config()
             return {'title': 'Images', 'client': config.client}
 
         @app.route('/imagecreateform')
         @view('imagecreate.html')
         def imagecreateform():
-            config = Kconfig()
+            config = self.config()
             k = config.k
             pools = k.list_pools()
             return {'title': 'CreateImage', 'pools': pools, 'images': sorted(IMAGES), 'client': config.client}
@@ -1147,7 +1284,7 @@ class Kweb():
             if data is None:
                 response.status = 400
                 return 'Invalid json'
-            config = Kconfig()
+            config = self.config()
             if 'pool' in data:
                 pool = data['pool']
                 if 'pool' in data and 'image' in data:
@@ -1174,7 +1311,7 @@ class Kweb():
             if readonly:
                 response.status = 403
                 return {}
-            config = Kconfig()
+            config = self.config()
             k = config.k
             data = request.json or request.forms
             pool = data.get('pool') or config.pool
@@ -1183,8 +1320,9 @@ class Kweb():
             return result
 
         @app.route('/isos')
+        @etagged
         def isoslist():
-            config = Kconfig()
+            config = self.config()
             k = config.k
             isos = k.volumes(iso=True)
             return {'isos': isos}
@@ -1192,7 +1330,7 @@ class Kweb():
         @app.route('/isostable')
         @view('isostable.html')
         def isostable():
-            config = Kconfig()
+            config = self.config()
             k = config.k
             isos = k.volumes(iso=True)
             return {'isos': isos, 'readonly': readonly}
@@ -1200,32 +1338,32 @@ class Kweb():
         @app.route('/isosindex')
         @view('isos.html')
         def isos():
-            config = Kconfig()
+            config = self.config()
             return {'title': 'Isos', 'client': config.client}
 
         @app.route('/containerprofiles')
         def containerprofiles():
-            baseconfig = Kbaseconfig()
+            baseconfig = self.baseconfig()
             profiles = baseconfig.list_containerprofiles()
             return {'profiles': profiles}
 
         @app.route('/containerprofilestable')
         @view('containerprofilestable.html')
         def containerprofilestable():
-            baseconfig = Kbaseconfig()
+            baseconfig = self.baseconfig()
             profiles = baseconfig.list_containerprofiles()
             return {'profiles': profiles, 'readonly': readonly}
 
         @app.route('/containerprofilesindex')
         @view('containerprofiles.html')
         def containerprofilesindexl():
-            baseconfig = Kbaseconfig()
+            baseconfig = self.baseconfig()
             return {'title': 'ContainerProfiles', 'client': baseconfig.client}
 
         @app.route('/vmconsole/<name>')
         @view('console.html')
         def vmconsole(name):
-            config = Kconfig()
+            config = self.config()
             k = config.k
             password = ''
             scheme = 'ws://'
@@ -1260,6 +1398,7 @@ class Kweb():
                 response.status = 404
                 return "consoleurl couldnt be evaluated"
 
+        app.add_hook('after_request', self.release)
         self.app = app
         self.port = os.environ.get('PORT', 8000)
         self.debug = 'KWEB_DEBUG' in os.environ
@@ -1268,5 +1407,92 @@ class Kweb():
         self.pull_secret = os.environ.get('PULL_SECRET')
 
     def run(self):
-        data = {'host': self.host, 'port': self.port, 'debug': self.debug}
+        data = {'host': self.host, 'port': self.port, 'debug': self.debug, 'server_class': ThreadingWSGIServer,
+                'handler_class': KeepAliveHandler}
         self.app.run(**data)
+
+    def bulk(self, names, action):
+        if not names:
+            return {}
+        with ThreadPoolExecutor(max_workers=min(len(names), 16)) as executor:
+            return dict(zip(names, executor.map(action, names)))
+
+    def config_mtimes(self):
+        paths = glob.glob(os.path.expanduser('~/.kcli/*.yml'))
+        if 'KCLI_CONFIG' in os.environ:
+            paths.append(os.path.expanduser(os.environ['KCLI_CONFIG']))
+        return {path: os.path.getmtime(path) for path in paths if os.path.exists(path)}
+
+    def config(self, client=None, base=False):
+        key = (client, base)
+        mtimes = self.config_mtimes()
+        with self.configs_lock:
+            config, previous_mtimes = self.configs.get(key, (None, None))
+            if config is not None:
+                self.acquire(config)
+        if config is not None:
+            if previous_mtimes == mtimes and (base or self.alive(config.k)):
+                return self.checkout(config)
+            self.release(config)
+        config = Kbaseconfig(client=client) if base else Kconfig(client=client, cache_ttl=0)
+        with self.configs_lock:
+            previous = self.configs.get(key, (None, None))[0]
+            self.configs[key] = (config, mtimes)
+            if previous is not None and not base:
+                self.retired.append(previous)
+            self.acquire(config)
+        self.sweep()
+        return self.checkout(config)
+
+    def checkout(self, config):
+        """Returns a copy of a pooled config sharing its provider connection but not its mutable state"""
+        clone = copy(config)
+        for key, value in vars(config).items():
+            if isinstance(value, (dict, list)):
+                setattr(clone, key, copy(value))
+        return clone
+
+    def acquire(self, config):
+        self.users[id(config)] = self.users.get(id(config), 0) + 1
+        if not hasattr(self.local, 'configs'):
+            self.local.configs = []
+        self.local.configs.append(config)
+
+    def release(self, config=None):
+        """Drops the configs used by the current request, or a single one, closing retired ones nobody uses anymore"""
+        configs = getattr(self.local, 'configs', [])
+        if config is not None:
+            configs.remove(config)
+            configs = [config]
+        else:
+            self.local.configs = []
+        with self.configs_lock:
+            for entry in configs:
+                self.users[id(entry)] -= 1
+                if not self.users[id(entry)]:
+                    del self.users[id(entry)]
+        self.sweep()
+
+    def sweep(self):
+        with self.configs_lock:
+            idle = [entry for entry in self.retired if id(entry) not in self.users]
+            self.retired = [entry for entry in self.retired if id(entry) in self.users]
+        for entry in idle:
+            try:
+                entry.k.close()
+            except Exception:
+                pass
+
+    def baseconfig(self, client=None):
+        return self.config(client=client, base=True)
+
+    def alive(self, k):
+        conn = getattr(k, 'conn', None)
+        if conn is None:
+            return False
+        if hasattr(conn, 'isAlive'):
+            try:
+                return conn.isAlive() == 1
+            except Exception:
+                return False
+        return True
@@ -0,0 +1,151 @@
+# coding=utf-8
+"""
+Benchmarks of kcli hot paths on top of the in memory provider.
+Run them with python tests/test_benchmarks.py [-s SCENARIO] [-n SIZES] [-l LATENCY], which prints one json document
+per scenario and size with wall time, provider calls and peak memory
+"""
+import argparse
+from contextlib import contextmanager, redirect_stdout
+import json
+import os
+import sys
+from tempfile import TemporaryDirectory
+import time
+import tracemalloc
+import yaml
+
+SIZES = [10, 100, 1000]
+IMAGES = ['centos9stream', 'rhcos414']
+
+
+def write_plan(path, size):
+    plan = {}
+    for index in range(size):
+        plan[f'vm{index}'] = {'image': IMAGES[index % 2], 'memory': 2048, 'numcpus': 2, 'disks': [20, 10],
+                              'nets': ['default'], 'cmds': ['echo {{ plan }} > /tmp/plan'],
+                              'files': [{'path': '/etc/motd', 'content': 'vm of {{ plan }}'}]}
+    with open(path, 'w') as f:
+        yaml.safe_dump(plan, f)
+
+
+@contextmanager
+def environment(latency=0):
+    home = TemporaryDirectory()
+    oldhome, oldcwd = os.environ.get('HOME'), os.getcwd()
+    os.makedirs(f'{home.name}/.kcli')
+    with open(f'{home.name}/.kcli/config.yml', 'w') as f:
+        bench = {'type': 'memory', 'latency': latency, 'images': IMAGES}
+        yaml.safe_dump({'default': {'client': 'bench'}, 'bench': bench}, f)
+    os.environ['HOME'] = home.name
+    os.chdir(home.name)
+    try:
+        yield home.name
+    finally:
+        os.chdir(oldcwd)
+        if oldhome is not None:
+            os.environ['HOME'] = oldhome
+        home.cleanup()
+
+
+def config():
+    from kvirt.config import Kconfig
+    return Kconfig()
+
+
+def plan_scenario(home, size):
+    write_plan(f'{home}/kcli_plan.yml', size)
+    c = config()
+    return c, lambda: c.plan('bench', inputfile=f'{home}/kcli_plan.yml')
+
+
+def plan_update_scenario(home, size):
+    c, deploy = plan_scenario(home, size)
+    deploy()
+    c.k.calls.clear()
+    return c, lambda: c.plan('bench', inputfile=f'{home}/kcli_plan.yml', update=True,
+                             overrides={'skip_files_remediation': True})
+
+
+def inputfile_scenario(home, size):
+    write_plan(f'{home}/kcli_plan.yml', size)
+    c = config()
+    return c, lambda: c.process_inputfile('bench', f'{home}/kcli_plan.yml', overrides={}, full=True)
+
+
+def profiles_scenario(home, size):
+    profiles = {f'profile{index}': {'image': IMAGES[index % 2], 'memory': 1024 * (index % 8 + 1), 'numcpus': 2}
+                for index in range(size * 10)}
+    with open(f'{home}/.kcli/profiles.yml', 'w') as f:
+        yaml.safe_dump(profiles, f)
+    c = config()
+    return c, lambda: [c.list_profiles() for index in range(10)]
+
+
+def ignition_scenario(home, size):
+    from kvirt import common
+    files = [{'path': f'/etc/kcli/file{index}', 'content': 'x' * 1024 * size} for index in range(100)]
+    cmds = [f'echo {index}' for index in range(size)]
+    return None, lambda: common.ignition('bench', keys=[], cmds=cmds, files=files, image='rhcos414',
+                                         overrides={'plan': 'bench'}, version='3.1.0')
+
+
+def cloudinit_scenario(home, size):
+    from kvirt import common
+    files = [{'path': f'/etc/kcli/file{index}', 'content': 'x' * 1024 * size} for index in range(100)]
+    cmds = [f'echo {index}' for index in range(size)]
+    return None, lambda: common.cloudinit('bench', keys=[], cmds=cmds, files=files, image='centos9stream',
+                                          overrides={'plan': 'bench'})
+
+
+SCENARIOS = {'plan': plan_scenario, 'plan_update': plan_update_scenario, 'inputfile': inputfile_scenario,
+             'profiles': profiles_scenario, 'ignition': ignition_scenario, 'cloudinit': cloudinit_scenario}
+
+
+def measure(scenario, size, latency=0):
+    result = {'scenario': scenario, 'size': size, 'latency': latency}
+    with open(os.devnull, 'w') as devnull, redirect_stdout(devnull):
+        with environment(latency) as home:
+            c, run = SCENARIOS[scenario](home, size)
+            start = time.perf_counter()
+            run()
+            result['wall'] = round(time.perf_counter() - start, 4)
+            if c is not None and hasattr(c.k, 'calls'):
+                result['calls'] = dict(c.k.calls)
+                result['total_calls'] = sum(c.k.calls.values())
+        with environment(latency) as home:
+            c, run = SCENARIOS[scenario](home, size)
+            tracemalloc.start()
+            run()
+            result['peak_memory'] = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+    return result
+
+
+class TestBenchmarks:
+    def test_plan(self):
+        result = measure('plan', 10)
+        assert result['calls']['create'] == 10
+        assert result['peak_memory'] > 0
+
+    def test_plan_update(self):
+        result = measure('plan_update', 10)
+        assert 'create' not in result['calls']
+        assert not [call for call in result['calls'] if call.startswith('update_')]
+
+    def test_scenarios(self):
+        for scenario in ['inputfile', 'profiles', 'ignition', 'cloudinit']:
+            assert measure(scenario, 10)['wall'] >= 0
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Benchmark kcli hot paths')
+    parser.add_argument('-s', '--scenario', action='append', choices=sorted(SCENARIOS),
+                        help='Scenario to run. Can be repeated. Defaults to all of them')
+    parser.add_argument('-n', '--sizes', default=','.join(str(size) for size in SIZES),
+                        help='Comma separated list of sizes (number of vms, profiles x10 or payload kilobytes)')
+    parser.add_argument('-l', '--latency', type=float, default=0, help='Seconds spent in each provider call')
+    args = parser.parse_args()
+    for scenario in args.scenario or SCENARIOS:
+        for size in [int(size) for size in args.sizes.split(',')]:
+            print(json.dumps(measure(scenario, size, latency=args.latency)))
+            sys.stdout.flush()
@@ -0,0 +1,47 @@
+# coding=utf-8
+from kvirt import common
+from kvirt.providers.cache import Kcache
+
+
+class Kkubevirt():
+    __module__ = 'kvirt.providers.kubevirt'
+
+    def __init__(self):
+        self.calls = []
+
+    def volumes(self, iso=False):
+        return []
+
+    def add_image(self, url, pool, name=None):
+        self.calls.append('add_image')
+
+    def patch_pvc(self, pvc, cmd, image=None, files=[]):
+        self.calls.append('patch_pvc')
+
+    def update_cdi_endpoint(self, pvc, endpoint):
+        self.calls.append('update_cdi_endpoint')
+
+    def get_pool_path(self, pool):
+        self.calls.append('get_pool_path')
+
+
+class TestCache:
+    def test_rhcos_iso_wrapped_provider(self):
+        k = Kkubevirt()
+        common.generate_rhcos_iso(Kcache(k), 'mycluster', 'default')
+        assert k.calls == ['add_image', 'patch_pvc', 'update_cdi_endpoint']
+
+    def test_invalidate_keyword_name(self):
+        class Kprovider():
+            def __init__(self):
+                self.status = 'up'
+
+            def info(self, name):
+                return {'name': name, 'status': self.status}
+
+            def stop(self, name):
+                self.status = 'down'
+        k = Kcache(Kprovider(), ttl=60)
+        assert k.info(name='vm1')['status'] == 'up'
+        k.stop('vm1')
+        assert k.info(name='vm1')['status'] == 'down'
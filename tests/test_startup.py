@@ -0,0 +1,30 @@
+# coding=utf-8
+import os
+import subprocess
+import sys
+import time
+
+import pytest
+
+BUDGET = float(os.environ['KCLI_STARTUP_BUDGET']) if 'KCLI_STARTUP_BUDGET' in os.environ else None
+HEAVY_MODULES = ['kvirt.config', 'kvirt.baseconfig', 'kvirt.cluster.openshift', 'kvirt.cluster.hypershift',
+                 'prettytable', 'distutils']
+
+
+def run(code, *args):
+    start = time.time()
+    subprocess.run([sys.executable, '-c', code, *args], check=True, stdout=subprocess.DEVNULL)
+    return time.time() - start
+
+
+class TestStartup:
+    def test_lazy_imports(self):
+        code = f"import sys; import kvirt.cli; print([m for m in {HEAVY_MODULES} if m in sys.modules])"
+        result = subprocess.run([sys.executable, '-c', code], check=True, stdout=subprocess.PIPE)
+        assert result.stdout.decode().strip() == '[]'
+
+    @pytest.mark.skipif(BUDGET is None, reason="benchmark, set KCLI_STARTUP_BUDGET to run it")
+    def test_help_budget(self):
+        code = "import sys; from kvirt.cli import cli; sys.argv = ['kcli', '--help']; cli()"
+        elapsed = min(run(code) for i in range(3))
+        assert elapsed < BUDGET, f"kcli --help took {elapsed:.2f}s, budget is {BUDGET}s"